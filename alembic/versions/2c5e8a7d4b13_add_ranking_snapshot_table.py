@@ -0,0 +1,50 @@
+"""Add ranking snapshot table
+
+Revision ID: 2c5e8a7d4b13
+Revises: 9b1f0c2d7e41
+Create Date: 2026-10-17 11:20:05.118342
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2c5e8a7d4b13"
+down_revision: Union[str, None] = "9b1f0c2d7e41"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "ranking_snapshot",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("date_created", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("post_ids", postgresql.ARRAY(sa.Integer()), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_ranking_snapshot_id"), "ranking_snapshot", ["id"], unique=False
+    )
+    op.create_index(
+        "ix_ranking_snapshot_key_date_created",
+        "ranking_snapshot",
+        ["key", "date_created"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_ranking_snapshot_key_date_created", table_name="ranking_snapshot"
+    )
+    op.drop_index(op.f("ix_ranking_snapshot_id"), table_name="ranking_snapshot")
+    op.drop_table("ranking_snapshot")
@@ -0,0 +1,53 @@
+"""Make reactions unique per user and target
+
+Revision ID: 4a7c3e9b2f60
+Revises: 8d4f2b6e1a95
+Create Date: 2026-10-17 15:12:09.774520
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4a7c3e9b2f60"
+down_revision: Union[str, None] = "8d4f2b6e1a95"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # block writes so no new duplicates appear before the index exists
+    op.execute("LOCK TABLE reaction IN SHARE ROW EXCLUSIVE MODE")
+    # keep the most recent reaction of each user on each target
+    op.execute(
+        """
+        DELETE FROM reaction r
+        USING reaction newer
+        WHERE r.user_id = newer.user_id
+          AND r.target_type = newer.target_type
+          AND r.target_id = newer.target_id
+          AND r.id < newer.id
+        """
+    )
+    op.create_index(
+        "uq_reaction_user_target",
+        "reaction",
+        ["user_id", "target_type", "target_id"],
+        unique=True,
+    )
+    op.drop_index("ix_user_type_id", table_name="reaction")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        "ix_user_type_id",
+        "reaction",
+        ["user_id", "target_type", "target_id"],
+        unique=False,
+    )
+    op.drop_index("uq_reaction_user_target", table_name="reaction")
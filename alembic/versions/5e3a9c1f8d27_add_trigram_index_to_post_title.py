@@ -0,0 +1,37 @@
+"""Add trigram index to post title
+
+Revision ID: 5e3a9c1f8d27
+Revises: 2c5e8a7d4b13
+Create Date: 2026-10-17 12:41:37.902215
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5e3a9c1f8d27"
+down_revision: Union[str, None] = "2c5e8a7d4b13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    # the index build covers every existing row, so no separate backfill
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_post_title_trgm
+            ON post USING gin (title gin_trgm_ops)
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_post_title_trgm")
@@ -0,0 +1,60 @@
+"""Add counter delta table
+
+Revision ID: 8d4f2b6e1a95
+Revises: 5e3a9c1f8d27
+Create Date: 2026-10-17 14:05:52.630419
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8d4f2b6e1a95"
+down_revision: Union[str, None] = "5e3a9c1f8d27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+counter_type_enum = sa.Enum(
+    "LIKES", "DISLIKES", "SAVES", "COMMENT_COUNT", name="countertype"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "counter_delta",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("date_created", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column(
+            "target_type",
+            postgresql.ENUM(name="targettype", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("target_id", sa.Integer(), nullable=False),
+        sa.Column("counter", counter_type_enum, nullable=False),
+        sa.Column("delta", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_counter_delta_id"), "counter_delta", ["id"], unique=False
+    )
+    op.create_index(
+        op.f("ix_counter_delta_date_created"),
+        "counter_delta",
+        ["date_created"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_counter_delta_date_created"), table_name="counter_delta")
+    op.drop_index(op.f("ix_counter_delta_id"), table_name="counter_delta")
+    op.drop_table("counter_delta")
+    counter_type_enum.drop(op.get_bind())
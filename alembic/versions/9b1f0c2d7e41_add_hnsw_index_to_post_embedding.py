@@ -0,0 +1,39 @@
+"""Add hnsw index to post embedding
+
+Revision ID: 9b1f0c2d7e41
+Revises: 14328d908c1e
+Create Date: 2026-10-17 10:02:41.530114
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9b1f0c2d7e41"
+down_revision: Union[str, None] = "14328d908c1e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY can not run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.execute(
+            f"""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_post_embedding_hnsw
+            ON post USING hnsw (embedding vector_cosine_ops)
+            WITH (m = {settings.HNSW_M}, ef_construction = {settings.HNSW_EF_CONSTRUCTION})
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_post_embedding_hnsw")
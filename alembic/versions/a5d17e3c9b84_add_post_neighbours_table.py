@@ -0,0 +1,71 @@
+"""Add post neighbours table
+
+Revision ID: a5d17e3c9b84
+Revises: f3a8c6d2e954
+Create Date: 2026-10-17 18:40:12.583117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a5d17e3c9b84"
+down_revision: Union[str, None] = "f3a8c6d2e954"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "post_neighbours",
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("date_created", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_used", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("ids", postgresql.ARRAY(sa.Integer()), nullable=False),
+        sa.Column("distances", postgresql.ARRAY(sa.Float()), nullable=False),
+        sa.ForeignKeyConstraint(["post_id"], ["post.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("post_id", "key"),
+    )
+    op.create_index(
+        op.f("ix_post_neighbours_last_used"),
+        "post_neighbours",
+        ["last_used"],
+        unique=False,
+    )
+    # catches every writer, including bulk UPDATEs that bypass the ORM
+    op.execute(
+        """
+        CREATE FUNCTION invalidate_post_neighbours() RETURNS trigger AS $$
+        BEGIN
+            DELETE FROM post_neighbours WHERE post_id = NEW.id;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER post_embedding_changed
+        AFTER UPDATE OF embedding ON post
+        FOR EACH ROW
+        WHEN (OLD.embedding IS DISTINCT FROM NEW.embedding)
+        EXECUTE FUNCTION invalidate_post_neighbours()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS post_embedding_changed ON post")
+    op.execute("DROP FUNCTION IF EXISTS invalidate_post_neighbours()")
+    op.drop_index(
+        op.f("ix_post_neighbours_last_used"), table_name="post_neighbours"
+    )
+    op.drop_table("post_neighbours")
@@ -0,0 +1,46 @@
+"""Top vaults due on embedding change
+
+Revision ID: a6c3e8f1d5b2
+Revises: d4b7e1a9c3f6
+Create Date: 2026-10-18 14:21:36.804517
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a6c3e8f1d5b2"
+down_revision: Union[str, None] = "d4b7e1a9c3f6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DUE_INDEX_SQL = """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON post (last_updated)
+    WHERE {where}
+"""
+
+DUE = "top_vaults_updated IS NULL OR top_vaults_updated < last_updated"
+
+
+def replace_due_index(where: str):
+    # CONCURRENTLY can not run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.execute(DUE_INDEX_SQL.format(name="ix_post_top_vaults_due_new", where=where))
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_post_top_vaults_due")
+        op.execute(
+            "ALTER INDEX ix_post_top_vaults_due_new RENAME TO ix_post_top_vaults_due"
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # rows with a NULL embedding_updated keep their current state
+    replace_due_index(f"{DUE} OR top_vaults_updated < embedding_updated")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    replace_due_index(DUE)
@@ -0,0 +1,158 @@
+"""Partition metric tables by month
+
+Revision ID: b5e9d3f1a7c4
+Revises: e7b3c5a1f9d8
+Create Date: 2026-10-18 09:12:47.385021
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b5e9d3f1a7c4"
+down_revision: Union[str, None] = "e7b3c5a1f9d8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# app.config.Settings.METRIC_PARTITIONS_AHEAD
+PARTITIONS_AHEAD = 3
+
+# table, columns after id, secondary indexes before and after
+TABLES = (
+    (
+        "post_metric",
+        """
+        date_created timestamp with time zone NOT NULL,
+        post_id integer NOT NULL REFERENCES post (id),
+        score double precision NOT NULL,
+        trend_score double precision NOT NULL
+        """,
+        ("ix_post_metric_id",),
+        ("ix_post_id_date_created", "post_id, date_created"),
+    ),
+    (
+        "vault_metric",
+        """
+        date_created timestamp with time zone NOT NULL,
+        vault_id integer NOT NULL REFERENCES vault (id),
+        score double precision NOT NULL
+        """,
+        ("ix_vault_metric_id",),
+        ("ix_vault_id_date_created", "vault_id, date_created"),
+    ),
+    (
+        "search_metric",
+        """
+        query varchar NOT NULL,
+        date_created timestamp with time zone NOT NULL,
+        score integer NOT NULL
+        """,
+        ("ix_search_metric_id", "ix_search_metric_query"),
+        ("ix_search_query_date_created", "query, date_created"),
+    ),
+)
+
+# one partition per month from the oldest row to PARTITIONS_AHEAD months
+# on, named like app.utils.partition.partition_name
+CREATE_PARTITIONS_SQL = """
+    DO $$
+    DECLARE
+        month timestamp;
+    BEGIN
+        FOR month IN
+            SELECT generate_series(
+                date_trunc('month', coalesce(
+                    (SELECT min(date_created) FROM {source}), now()
+                ) AT TIME ZONE 'UTC'),
+                date_trunc('month', now() AT TIME ZONE 'UTC')
+                    + interval '{ahead} months',
+                interval '1 month'
+            )
+        LOOP
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF {table} FOR VALUES FROM (%L) TO (%L)',
+                '{table}_p' || to_char(month, 'YYYY_MM'),
+                month AT TIME ZONE 'UTC',
+                (month + interval '1 month') AT TIME ZONE 'UTC'
+            );
+        END LOOP;
+    END
+    $$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "metric_summary",
+        sa.Column("metric", sa.String(), nullable=False),
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("metric", "key", "year"),
+    )
+
+    for table, columns, old_indexes, (index, index_columns) in TABLES:
+        old = f"{table}_unpartitioned"
+        op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+        # keep the id sequence, it is dropped with the table it belongs to
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE")
+        for name in (*old_indexes, index):
+            op.execute(f"DROP INDEX {name}")
+        op.execute(f"ALTER INDEX {table}_pkey RENAME TO {old}_pkey")
+
+        op.execute(
+            f"""
+            CREATE TABLE {table} (
+                id integer NOT NULL DEFAULT nextval('{table}_id_seq'),
+                {columns}
+            ) PARTITION BY RANGE (date_created)
+            """
+        )
+        op.execute(
+            CREATE_PARTITIONS_SQL.format(
+                table=table, source=old, ahead=PARTITIONS_AHEAD
+            )
+        )
+        op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+        op.execute(f"DROP TABLE {old}")
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+
+        # built once per partition after the copy
+        op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id, date_created)")
+        op.execute(f"CREATE INDEX {index} ON {table} ({index_columns})")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, columns, old_indexes, (index, index_columns) in TABLES:
+        partitioned = f"{table}_partitioned"
+        op.execute(f"ALTER TABLE {table} RENAME TO {partitioned}")
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE")
+        op.execute(f"DROP INDEX {index}")
+        op.execute(f"ALTER TABLE {partitioned} DROP CONSTRAINT {table}_pkey")
+
+        op.execute(
+            f"""
+            CREATE TABLE {table} (
+                id integer NOT NULL DEFAULT nextval('{table}_id_seq'),
+                {columns}
+            )
+            """
+        )
+        op.execute(f"INSERT INTO {table} SELECT * FROM {partitioned}")
+        op.execute(f"DROP TABLE {partitioned}")
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+
+        op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id)")
+        op.execute(f"CREATE INDEX {index} ON {table} ({index_columns})")
+        for name in old_indexes:
+            column = name.removeprefix(f"ix_{table}_")
+            op.execute(f"CREATE INDEX {name} ON {table} ({column})")
+
+    op.drop_table("metric_summary")
@@ -0,0 +1,37 @@
+"""Add pattern index to search query
+
+Revision ID: b7e2d4f91c38
+Revises: 4a7c3e9b2f60
+Create Date: 2026-10-17 16:02:11.417530
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e2d4f91c38"
+down_revision: Union[str, None] = "4a7c3e9b2f60"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # text_pattern_ops lets `query LIKE 'prefix%'` use the index regardless
+    # of the database collation
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_search_query_pattern
+            ON search (query text_pattern_ops)
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_search_query_pattern")
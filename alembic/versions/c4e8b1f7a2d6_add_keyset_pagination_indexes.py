@@ -0,0 +1,81 @@
+"""Add keyset pagination indexes
+
+Revision ID: c4e8b1f7a2d6
+Revises: a5d17e3c9b84
+Create Date: 2026-10-17 19:12:08.417352
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e8b1f7a2d6"
+down_revision: Union[str, None] = "a5d17e3c9b84"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCORES = ["score", "week_score", "month_score", "year_score", "trend_score"]
+
+# name, table, columns
+INDEXES = [
+    *[(f"ix_post_{score}_id", "post", f"{score} DESC, id DESC") for score in SCORES],
+    ("ix_post_date_created_id", "post", "date_created DESC, id DESC"),
+    *[
+        (f"ix_vault_{score}_id", "vault", f"{score} DESC, id DESC")
+        for score in SCORES
+    ],
+    ("ix_vault_date_created_id", "vault", "date_created DESC, id DESC"),
+    (
+        "ix_vault_user_id_ranking",
+        "vault",
+        "user_id, score DESC, post_count DESC, date_created DESC, id DESC",
+    ),
+    (
+        "ix_comment_post_id_date_created",
+        "comment",
+        "post_id, date_created DESC, id DESC",
+    ),
+    (
+        "ix_vault_post_vault_id_date_created",
+        "vault_post",
+        "vault_id, date_created DESC, id DESC",
+    ),
+    (
+        "ix_reaction_user_id_type_date_created",
+        "reaction",
+        "user_id, target_type, type, date_created DESC, id DESC",
+    ),
+]
+
+# single column indexes covered by the composite ones
+REPLACED = [
+    *[(f"ix_post_{score}", "post", score) for score in SCORES],
+    *[(f"ix_vault_{score}", "vault", score) for score in SCORES],
+    ("ix_vault_post_vault_id", "vault_post", "vault_id"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY can not run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON "{table}" ({columns})'
+            )
+        for name, _, _ in REPLACED:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, column in REPLACED:
+            op.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON "{table}" ({column})'
+            )
+        for name, _, _ in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,60 @@
+"""List vault entries by index
+
+Revision ID: c9a2f4e6b8d1
+Revises: b5e9d3f1a7c4
+Create Date: 2026-10-18 11:04:19.527310
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c9a2f4e6b8d1"
+down_revision: Union[str, None] = "b5e9d3f1a7c4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY can not run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_vault_post_listing_index
+            ON vault_post (vault_id, index, id)
+            INCLUDE (post_id, preview_url, sample_url, type)
+            """
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_vault_post_listing")
+        # the covering index has the same key columns
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_vault_post_vault_id_index")
+        op.execute(
+            "ALTER INDEX ix_vault_post_listing_index RENAME TO ix_vault_post_listing"
+        )
+        op.execute("VACUUM (ANALYZE) vault_post")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_vault_post_listing_date
+            ON vault_post (vault_id, date_created DESC, id DESC)
+            INCLUDE (post_id, index, preview_url, sample_url, type)
+            """
+        )
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_vault_post_vault_id_index
+            ON vault_post (vault_id, index, id)
+            """
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_vault_post_listing")
+        op.execute(
+            "ALTER INDEX ix_vault_post_listing_date RENAME TO ix_vault_post_listing"
+        )
@@ -0,0 +1,122 @@
+"""Denormalize vault post listing
+
+Revision ID: d2f6a9c4e1b7
+Revises: c4e8b1f7a2d6
+Create Date: 2026-10-17 19:48:51.209634
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d2f6a9c4e1b7"
+down_revision: Union[str, None] = "c4e8b1f7a2d6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    filetype = postgresql.ENUM("IMAGE", "VIDEO", name="filetype", create_type=False)
+    op.add_column("vault_post", sa.Column("preview_url", sa.String(), nullable=True))
+    op.add_column("vault_post", sa.Column("sample_url", sa.String(), nullable=True))
+    op.add_column("vault_post", sa.Column("type", filetype, nullable=True))
+
+    # catch every writer, including bulk INSERTs that bypass the ORM
+    op.execute(
+        """
+        CREATE FUNCTION copy_vault_post_preview() RETURNS trigger AS $$
+        BEGIN
+            SELECT preview_url, sample_url, type
+            INTO NEW.preview_url, NEW.sample_url, NEW.type
+            FROM post WHERE id = NEW.post_id;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER vault_post_preview
+        BEFORE INSERT OR UPDATE OF post_id ON vault_post
+        FOR EACH ROW
+        EXECUTE FUNCTION copy_vault_post_preview()
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION sync_vault_post_preview() RETURNS trigger AS $$
+        BEGIN
+            UPDATE vault_post
+            SET preview_url = NEW.preview_url,
+                sample_url = NEW.sample_url,
+                type = NEW.type
+            WHERE post_id = NEW.id;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER post_preview_changed
+        AFTER UPDATE OF preview_url, sample_url, type ON post
+        FOR EACH ROW
+        WHEN (
+            (OLD.preview_url, OLD.sample_url, OLD.type)
+            IS DISTINCT FROM (NEW.preview_url, NEW.sample_url, NEW.type)
+        )
+        EXECUTE FUNCTION sync_vault_post_preview()
+        """
+    )
+
+    op.execute(
+        """
+        UPDATE vault_post
+        SET preview_url = post.preview_url,
+            sample_url = post.sample_url,
+            type = post.type
+        FROM post
+        WHERE post.id = vault_post.post_id
+        """
+    )
+
+    # CONCURRENTLY can not run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_vault_post_listing
+            ON vault_post (vault_id, date_created DESC, id DESC)
+            INCLUDE (post_id, index, preview_url, sample_url, type)
+            """
+        )
+        op.execute(
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_vault_post_vault_id_date_created"
+        )
+        # index-only scans need the visibility map set for the new rows
+        op.execute("VACUUM (ANALYZE) vault_post")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS
+            ix_vault_post_vault_id_date_created
+            ON vault_post (vault_id, date_created DESC, id DESC)
+            """
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_vault_post_listing")
+    op.execute("DROP TRIGGER IF EXISTS post_preview_changed ON post")
+    op.execute("DROP FUNCTION IF EXISTS sync_vault_post_preview()")
+    op.execute("DROP TRIGGER IF EXISTS vault_post_preview ON vault_post")
+    op.execute("DROP FUNCTION IF EXISTS copy_vault_post_preview()")
+    op.drop_column("vault_post", "type")
+    op.drop_column("vault_post", "sample_url")
+    op.drop_column("vault_post", "preview_url")
@@ -0,0 +1,67 @@
+"""Track post embedding changes
+
+Revision ID: d4b7e1a9c3f6
+Revises: c9a2f4e6b8d1
+Create Date: 2026-10-18 11:47:03.218944
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d4b7e1a9c3f6"
+down_revision: Union[str, None] = "c9a2f4e6b8d1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing rows stay NULL, they are picked up by the next rebuild
+    op.add_column(
+        "post",
+        sa.Column("embedding_updated", sa.DateTime(timezone=True), nullable=True),
+    )
+    # catch every writer, including COPY ingestion and bulk UPDATEs
+    op.execute(
+        """
+        CREATE FUNCTION touch_embedding_updated() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' OR NEW.embedding IS DISTINCT FROM OLD.embedding
+            THEN
+                NEW.embedding_updated = now();
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER post_embedding_updated
+        BEFORE INSERT OR UPDATE OF embedding ON post
+        FOR EACH ROW
+        EXECUTE FUNCTION touch_embedding_updated()
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_post_embedding_updated
+            ON post (embedding_updated)
+            WHERE embedding_updated IS NOT NULL
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_post_embedding_updated")
+    op.execute("DROP TRIGGER IF EXISTS post_embedding_updated ON post")
+    op.execute("DROP FUNCTION IF EXISTS touch_embedding_updated()")
+    op.drop_column("post", "embedding_updated")
@@ -0,0 +1,50 @@
+"""Make post source_id unique
+
+Revision ID: e1c94a7b3d52
+Revises: b7e2d4f91c38
+Create Date: 2026-10-17 16:48:30.215904
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy.sql import text
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e1c94a7b3d52"
+down_revision: Union[str, None] = "b7e2d4f91c38"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # duplicates are whole posts with reactions and comments attached, so
+    # they have to be merged by hand rather than deleted here
+    duplicates = op.get_bind().execute(
+        text(
+            """
+            SELECT count(*) FROM (
+                SELECT source_id FROM post
+                WHERE source_id IS NOT NULL
+                GROUP BY source_id HAVING count(*) > 1
+            ) AS d
+            """
+        )
+    ).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f"{duplicates} source_id values are shared by several posts, "
+            "merge them before making source_id unique"
+        )
+
+    op.drop_index("ix_post_source_id", table_name="post")
+    op.create_index("ix_post_source_id", "post", ["source_id"], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_post_source_id", table_name="post")
+    op.create_index("ix_post_source_id", "post", ["source_id"], unique=False)
@@ -0,0 +1,55 @@
+"""Add next_index to vault
+
+Revision ID: e7b3c5a1f9d8
+Revises: d2f6a9c4e1b7
+Create Date: 2026-10-17 20:21:36.774910
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e7b3c5a1f9d8"
+down_revision: Union[str, None] = "d2f6a9c4e1b7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# app.utils.vault.INDEX_GAP
+INDEX_GAP = 1024
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "vault",
+        sa.Column("next_index", sa.Integer(), server_default="0", nullable=False),
+    )
+    # existing entries keep their dense indexes, new ones start past them
+    op.execute(
+        f"""
+        UPDATE vault SET next_index = entries.max_index + {INDEX_GAP}
+        FROM (
+            SELECT vault_id, max(index) AS max_index
+            FROM vault_post GROUP BY vault_id
+        ) AS entries
+        WHERE vault.id = entries.vault_id
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_vault_post_vault_id_index
+            ON vault_post (vault_id, index, id)
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_vault_post_vault_id_index")
+    op.drop_column("vault", "next_index")
@@ -0,0 +1,45 @@
+"""Add top_vaults_updated to post
+
+Revision ID: f3a8c6d2e954
+Revises: e1c94a7b3d52
+Create Date: 2026-10-17 17:25:43.660182
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3a8c6d2e954"
+down_revision: Union[str, None] = "e1c94a7b3d52"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "post",
+        sa.Column("top_vaults_updated", sa.DateTime(timezone=True), nullable=True),
+    )
+    # existing top_vaults were computed at the last view, so only posts
+    # viewed from now on become due
+    op.execute("UPDATE post SET top_vaults_updated = last_updated")
+    op.create_index(
+        "ix_post_top_vaults_due",
+        "post",
+        ["last_updated"],
+        unique=False,
+        postgresql_where=sa.text(
+            "top_vaults_updated IS NULL OR top_vaults_updated < last_updated"
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_post_top_vaults_due", table_name="post")
+    op.drop_column("post", "top_vaults_updated")
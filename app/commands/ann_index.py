@@ -0,0 +1,165 @@
+"""Manage the HNSW index on post.embedding.
+
+Usage:
+    python -m app.commands.ann_index build [--m 16] [--ef-construction 64]
+    python -m app.commands.ann_index rebuild [--m 24] [--ef-construction 128]
+    python -m app.commands.ann_index drop
+    python -m app.commands.ann_index status
+"""
+
+import argparse
+import threading
+import time
+
+from sqlalchemy.sql import text
+
+from app.config import settings
+from app.db import engine
+
+INDEX_NAME = "ix_post_embedding_hnsw"
+
+
+def create_index_sql(name: str, m: int, ef_construction: int):
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+        "ON post USING hnsw (embedding vector_cosine_ops) "
+        f"WITH (m = {int(m)}, ef_construction = {int(ef_construction)})"
+    )
+
+
+def report_progress(stop: threading.Event, interval: float):
+    """Print pg_stat_progress_create_index until `stop` is set."""
+    stmt = text(
+        """
+        SELECT phase, blocks_done, blocks_total, tuples_done, tuples_total
+        FROM pg_stat_progress_create_index
+        WHERE relid = 'post'::regclass
+        """
+    )
+    with engine.connect() as conn:
+        while not stop.wait(interval):
+            row = conn.execute(stmt).first()
+            conn.rollback()
+            if not row:
+                continue
+
+            if row.tuples_total:
+                done = f"{row.tuples_done}/{row.tuples_total} tuples"
+                percent = row.tuples_done / row.tuples_total * 100
+            elif row.blocks_total:
+                done = f"{row.blocks_done}/{row.blocks_total} blocks"
+                percent = row.blocks_done / row.blocks_total * 100
+            else:
+                done, percent = "", 0
+            print(f"[{percent:5.1f}%] {row.phase} {done}", flush=True)
+
+
+def run_concurrently(
+    statements: list[str],
+    maintenance_work_mem: str = None,
+    workers: int = None,
+    interval: float = 5,
+):
+    stop = threading.Event()
+    reporter = threading.Thread(
+        target=report_progress, args=(stop, interval), daemon=True
+    )
+    start = time.perf_counter()
+    reporter.start()
+    try:
+        with engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as conn:
+            if maintenance_work_mem:
+                conn.execute(
+                    text("SELECT set_config('maintenance_work_mem', :v, false)"),
+                    {"v": maintenance_work_mem},
+                )
+            if workers is not None:
+                conn.execute(
+                    text(
+                        "SELECT set_config('max_parallel_maintenance_workers', :v, false)"
+                    ),
+                    {"v": str(workers)},
+                )
+            for statement in statements:
+                conn.execute(text(statement))
+    finally:
+        stop.set()
+        reporter.join()
+    print(f"done in {time.perf_counter() - start:.1f}s")
+
+
+def build(args):
+    run_concurrently(
+        [create_index_sql(INDEX_NAME, args.m, args.ef_construction)],
+        args.maintenance_work_mem,
+        args.workers,
+        args.interval,
+    )
+
+
+def rebuild(args):
+    """Build a replacement index next to the old one, then swap them."""
+    new_name = f"{INDEX_NAME}_new"
+    run_concurrently(
+        [
+            f"DROP INDEX CONCURRENTLY IF EXISTS {new_name}",
+            create_index_sql(new_name, args.m, args.ef_construction),
+            f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}",
+            f"ALTER INDEX {new_name} RENAME TO {INDEX_NAME}",
+        ],
+        args.maintenance_work_mem,
+        args.workers,
+        args.interval,
+    )
+
+
+def drop(args):
+    run_concurrently([f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}"])
+
+
+def status(args):
+    stmt = text(
+        """
+        SELECT c.relname AS name,
+               i.indisvalid AS valid,
+               pg_size_pretty(pg_relation_size(c.oid)) AS size,
+               c.reloptions AS options
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = 'post'::regclass AND c.relname LIKE :name
+        """
+    )
+    with engine.connect() as conn:
+        rows = conn.execute(stmt, {"name": f"{INDEX_NAME}%"}).all()
+    if not rows:
+        print("no hnsw index on post.embedding")
+    for row in rows:
+        print(f"{row.name} valid={row.valid} size={row.size} {row.options}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name, func in (("build", build), ("rebuild", rebuild)):
+        sub = subparsers.add_parser(name)
+        sub.add_argument("--m", type=int, default=settings.HNSW_M)
+        sub.add_argument(
+            "--ef-construction", type=int, default=settings.HNSW_EF_CONSTRUCTION
+        )
+        sub.add_argument("--maintenance-work-mem", default=None)
+        sub.add_argument("--workers", type=int, default=None)
+        sub.add_argument("--interval", type=float, default=5)
+        sub.set_defaults(func=func)
+
+    subparsers.add_parser("drop").set_defaults(func=drop)
+    subparsers.add_parser("status").set_defaults(func=status)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
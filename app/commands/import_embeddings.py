@@ -0,0 +1,167 @@
+"""Import post embeddings from a float32 .npy file and an id manifest.
+
+Row i of the vectors file is the embedding of the post whose id (or
+source_id with --by-source) is entry i of the manifest, either a .npy
+integer array or a text file with one id per line. Vectors are memory
+mapped and written in chunks as binary COPY built straight from numpy
+buffers, then applied with one UPDATE per chunk. Progress is checkpointed
+after every committed chunk, so rerunning the same command resumes.
+
+For a full backfill drop the HNSW index first and rebuild it afterwards:
+    python -m app.commands.ann_index drop
+    python -m app.commands.import_embeddings vectors.npy ids.npy
+    python -m app.commands.ann_index build
+
+Usage:
+    python -m app.commands.import_embeddings VECTORS MANIFEST
+        [--by-source] [--chunk 20000] [--checkpoint PATH] [--restart]
+"""
+
+import argparse
+import io
+from pathlib import Path
+import struct
+import time
+
+import numpy
+
+from app.db import engine
+
+EMBEDDING_DIM = 512
+
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+COPY_TRAILER = struct.pack(">h", -1)
+
+STAGING_SQL = """
+    CREATE TEMP TABLE embedding_import (
+        id bigint,
+        embedding vector(512)
+    ) ON COMMIT DROP
+"""
+
+COPY_SQL = "COPY embedding_import (id, embedding) FROM STDIN (FORMAT BINARY)"
+
+UPDATE_SQL = """
+    UPDATE post SET embedding = i.embedding
+    FROM embedding_import i
+    WHERE post.{column} = i.id
+"""
+
+
+def row_dtype(dim: int):
+    """One binary COPY tuple: field count, then length-prefixed id and vector."""
+    return numpy.dtype(
+        [
+            ("fields", ">i2"),
+            ("id_size", ">i4"),
+            ("id", ">i8"),
+            ("vector_size", ">i4"),
+            ("dim", ">u2"),
+            ("unused", ">u2"),
+            ("vector", ">f4", (dim,)),
+        ]
+    )
+
+
+def copy_payload(ids: numpy.ndarray, vectors: numpy.ndarray):
+    """Encode a chunk as a binary COPY stream without per-value objects."""
+    dim = vectors.shape[1]
+    rows = numpy.empty(len(ids), dtype=row_dtype(dim))
+    rows["fields"] = 2
+    rows["id_size"] = 8
+    rows["id"] = ids
+    rows["vector_size"] = 4 + 4 * dim
+    rows["dim"] = dim
+    rows["unused"] = 0
+    rows["vector"] = vectors
+    return COPY_HEADER + rows.tobytes() + COPY_TRAILER
+
+
+def load_manifest(path: Path):
+    if path.suffix == ".npy":
+        return numpy.load(path, mmap_mode="r")
+    return numpy.loadtxt(path, dtype=numpy.int64, ndmin=1)
+
+
+def read_checkpoint(path: Path):
+    if not path.exists():
+        return 0
+    return int(path.read_text().strip() or 0)
+
+
+def write_checkpoint(path: Path, position: int):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(str(position))
+    tmp.replace(path)
+
+
+def import_chunk(conn, column: str, ids, vectors):
+    payload = copy_payload(ids, vectors)
+    with conn.cursor() as cur:
+        cur.execute(STAGING_SQL)
+        cur.copy_expert(COPY_SQL, io.BytesIO(payload))
+        cur.execute(UPDATE_SQL.format(column=column))
+        updated = cur.rowcount
+    conn.commit()
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("vectors", type=Path)
+    parser.add_argument("manifest", type=Path)
+    parser.add_argument(
+        "--by-source",
+        action="store_true",
+        help="manifest holds source_id values instead of post ids",
+    )
+    parser.add_argument("--chunk", type=int, default=20000)
+    parser.add_argument("--checkpoint", type=Path)
+    parser.add_argument("--restart", action="store_true")
+    args = parser.parse_args()
+
+    vectors = numpy.load(args.vectors, mmap_mode="r")
+    ids = load_manifest(args.manifest)
+    if vectors.ndim != 2 or vectors.shape[1] != EMBEDDING_DIM:
+        parser.error(f"expected an (n, {EMBEDDING_DIM}) array, got {vectors.shape}")
+    if vectors.dtype != numpy.float32:
+        parser.error(f"expected float32 vectors, got {vectors.dtype}")
+    if len(ids) != len(vectors):
+        parser.error(f"{len(ids)} ids for {len(vectors)} vectors")
+
+    checkpoint = args.checkpoint or args.vectors.with_suffix(".progress")
+    position = 0 if args.restart else read_checkpoint(checkpoint)
+    if position:
+        print(f"resuming at row {position}/{len(vectors)}")
+
+    column = "source_id" if args.by_source else "id"
+    total = len(vectors)
+    imported = updated = 0
+    start = time.perf_counter()
+
+    conn = engine.raw_connection()
+    try:
+        while position < total:
+            end = min(position + args.chunk, total)
+            updated += import_chunk(
+                conn, column, ids[position:end], vectors[position:end]
+            )
+            imported += end - position
+            position = end
+            write_checkpoint(checkpoint, position)
+
+            elapsed = time.perf_counter() - start
+            print(
+                f"[{position / total * 100:5.1f}%] {position}/{total} "
+                f"updated={updated} {imported / elapsed:.0f} rows/s",
+                flush=True,
+            )
+    finally:
+        conn.close()
+
+    missing = imported - updated
+    print(f"done, {updated} posts updated, {missing} ids without a post")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Create upcoming and drop expired monthly metric partitions.
+
+Usage:
+    python -m app.commands.metric_partitions [--table post vault search]
+        [--ahead 3] [--retention-days 400] [--no-rollup]
+"""
+
+import argparse
+
+from app.config import settings
+from app.db import SessionLocal
+from app.utils.metric import METRIC_TABLES
+from app.utils.partition import create_partitions, drop_partitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--table",
+        nargs="+",
+        choices=list(METRIC_TABLES),
+        default=list(METRIC_TABLES),
+    )
+    parser.add_argument("--ahead", type=int, default=settings.METRIC_PARTITIONS_AHEAD)
+    parser.add_argument(
+        "--retention-days", type=int, default=settings.METRIC_RETENTION_DAYS
+    )
+    parser.add_argument("--no-rollup", action="store_true")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        for name in args.table:
+            table = METRIC_TABLES[name]
+            created = create_partitions(db, table.metric, ahead=args.ahead)
+            dropped = drop_partitions(
+                db,
+                table,
+                retention_days=args.retention_days,
+                rollup=not args.no_rollup,
+            )
+            db.commit()
+            print(
+                f"{name:<7} created={', '.join(created) or '-'} "
+                f"dropped={', '.join(dropped) or '-'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Write a fresh set of feed ranking snapshots.
+
+Skipped when the ranking-snapshots worker of a running app, or another
+run of this command, is refreshing at the same time.
+
+Usage:
+    python -m app.commands.ranking_snapshots [--depth 10000]
+"""
+
+import argparse
+import sys
+import time
+
+from sqlalchemy import func, Select
+
+from app.config import settings
+from app.db import SessionLocal
+from app.utils.ranking import refresh_snapshots, REFRESH_LOCK_ID
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=settings.RANKING_SNAPSHOT_DEPTH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        stmt = Select(func.pg_try_advisory_xact_lock(REFRESH_LOCK_ID))
+        if not db.execute(stmt).scalar():
+            sys.exit("another process is refreshing the snapshots")
+        refresh_snapshots(db, args.depth)
+    print(f"done in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
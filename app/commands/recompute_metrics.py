@@ -0,0 +1,38 @@
+"""Recompute trend/week/month/year scores for posts, vaults and searches.
+
+Usage:
+    python -m app.commands.recompute_metrics [--table post vault search]
+"""
+
+import argparse
+import time
+
+from app.db import SessionLocal
+from app.utils.metric import METRIC_TABLES, recompute_metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--table",
+        nargs="+",
+        choices=list(METRIC_TABLES),
+        default=list(METRIC_TABLES),
+    )
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        for name in args.table:
+            start = time.perf_counter()
+            logged, updated = recompute_metrics(db, METRIC_TABLES[name])
+            db.commit()
+            elapsed = time.perf_counter() - start
+            rate = logged / elapsed if elapsed else 0
+            print(
+                f"{name:<7} logged={logged} updated={updated} "
+                f"{elapsed:.1f}s {rate:.0f} rows/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
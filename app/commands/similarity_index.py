@@ -0,0 +1,48 @@
+"""Manage the memory-mapped embedding matrix used by the numpy engine.
+
+The periodic refresh applies embeddings added, changed or deleted since
+its last run. A rebuild writes a compact new generation and swaps it in
+while workers keep serving.
+
+Usage:
+    python -m app.commands.similarity_index refresh
+    python -m app.commands.similarity_index rebuild
+    python -m app.commands.similarity_index status
+"""
+
+import argparse
+import time
+
+from app.db import SessionLocal
+from app.utils.similarity import engines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("action", choices=["refresh", "rebuild", "status"])
+    args = parser.parse_args()
+
+    engine = engines["numpy"]
+    if args.action == "status":
+        meta = engine.read_meta()
+        live = meta["count"] - meta["deleted"]
+        size = meta["count"] * (4 * 512 + 8 + 1) / 1024**2
+        print(
+            f"{engine.path / meta['directory']}: generation {meta['generation']}, "
+            f"{live} posts up to id {meta['max_id']}, {meta['deleted']} deleted rows"
+        )
+        print(f"{size:.1f} MiB on disk, synced at {meta['synced_at']}")
+        return
+
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        if args.action == "rebuild":
+            written = engine.rebuild(db)
+        else:
+            written = engine.refresh(db)
+    elapsed = time.perf_counter() - start
+    print(f"{args.action}: {written} rows written in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
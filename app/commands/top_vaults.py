@@ -0,0 +1,51 @@
+"""Refresh post.top_vaults for every due post.
+
+Posts are due once a view moves last_updated or a changed embedding
+moves embedding_updated past their last refresh; --all marks every post
+with an embedding as due first.
+
+Usage:
+    python -m app.commands.top_vaults [--batch-size 200] [--all]
+"""
+
+import argparse
+import time
+
+from sqlalchemy.sql import text
+
+from app.config import settings
+from app.db import SessionLocal
+from app.utils.post import refresh_top_vaults
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.TOP_VAULTS_BATCH_SIZE
+    )
+    parser.add_argument("--all", action="store_true")
+    args = parser.parse_args()
+
+    total = 0
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        if args.all:
+            db.execute(
+                text(
+                    "UPDATE post SET top_vaults_updated = NULL "
+                    "WHERE embedding IS NOT NULL"
+                )
+            )
+            db.commit()
+
+        while refreshed := refresh_top_vaults(db, args.batch_size):
+            db.commit()
+            total += refreshed
+            elapsed = time.perf_counter() - start
+            print(f"{total} posts {total / elapsed:.0f} posts/s", flush=True)
+
+    print(f"done, {total} posts in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,8 @@ class Settings(BaseSettings):
     ORIGINS: list
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL: int = 60
 
     # db
     POSTGRES_USER: str
@@ -14,11 +16,105 @@ class Settings(BaseSettings):
     POSTGRES_DB: str
     POSTGRES_HOST: str
     POSTGRES_PORT: int
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    ASYNC_DB: bool = False
+
+    # bulk post ingestion
+    POST_INGEST_BATCH_SIZE: int = 1000
+
+    # vector index
+    HNSW_M: int = 16
+    HNSW_EF_CONSTRUCTION: int = 64
+    HNSW_EF_SEARCH: int = 800
+    # "strict_order" keeps distance cursors exact, "off" before pgvector 0.8
+    HNSW_ITERATIVE_SCAN: str = "strict_order"
+    # together these bound how deep filtered nearest neighbour feeds can
+    # page, see app/utils/ann.py
+    HNSW_MAX_SCAN_TUPLES: int = 20000
+    ANN_MAX_WIDENING: int = 2
+    # with an iterative scan only pages filtered by a title query fall back
+    ANN_EXACT_FALLBACK: bool = True
+
+    # per post neighbour lists for /posts/{post_id}/recommend
+    NEIGHBOUR_CACHE: bool = True
+    NEIGHBOUR_CACHE_DEPTH: int = 500
+    NEIGHBOUR_CACHE_SIZE: int = 2000
+    NEIGHBOUR_CACHE_TTL: int = 300
+    NEIGHBOUR_CACHE_MAX_ROWS: int = 500000
+    # lists are recomputed after this many seconds so newer posts show up
+    NEIGHBOUR_CACHE_MAX_AGE: int = 86400
+    NEIGHBOUR_CACHE_EVICT_INTERVAL: int = 600
+
+    # similar post engine, "pgvector" or "numpy" (in-memory, exact)
+    SIMILARITY_ENGINE: str = "pgvector"
+    SIMILARITY_INDEX_DIR: str = "data/similarity"
+    SIMILARITY_REFRESH_INTERVAL: float = 60
+    SIMILARITY_DEPTH: int = 1000
+    # changed embeddings are re-read this far back, to catch long writes
+    SIMILARITY_SYNC_SLACK: int = 600
+    # how often the index is checked for posts that were deleted
+    SIMILARITY_RECONCILE_INTERVAL: int = 3600
+
+    # feed ranking snapshots
+    RANKING_SNAPSHOTS: bool = True
+    RANKING_SNAPSHOT_INTERVAL: int = 300
+    RANKING_SNAPSHOT_RETENTION: int = 3600
+    RANKING_SNAPSHOT_DEPTH: int = 10000
+
+    # write-behind counters (likes, dislikes, saves, comment_count)
+    COUNTER_BUFFER: bool = True
+    COUNTER_FLUSH_INTERVAL: float = 1
+    COUNTER_FLUSH_SIZE: int = 500
+    COUNTER_MAX_STALENESS: float = 5
+    COUNTER_ORPHAN_AGE: int = 300
+
+    # response cache for anonymous reads, in-process unless a redis url is set
+    RESPONSE_CACHE: bool = True
+    RESPONSE_CACHE_SIZE: int = 1000
+    # redis:// URL, or local:// for an in-process stand-in of the redis client
+    RESPONSE_CACHE_URL: str | None = None
+
+    # search autocomplete, served from a per-worker prefix index
+    AUTOCOMPLETE: bool = True
+    AUTOCOMPLETE_SIZE: int = 200000
+    AUTOCOMPLETE_PREFIX_DEPTH: int = 3
+    AUTOCOMPLETE_REFRESH_INTERVAL: float = 10
+    AUTOCOMPLETE_REBUILD_INTERVAL: int = 300
+
+    # search counts from GET /posts, queued and upserted in batches
+    SEARCH_QUEUE: bool = True
+    SEARCH_QUEUE_SIZE: int = 10000
+    SEARCH_FLUSH_INTERVAL: float = 1
+    # log queue depth, drops and high-water mark, 0 disables
+    SEARCH_QUEUE_STATS_INTERVAL: float = 60
+
+    # post top_vaults, refreshed in the background for recently viewed posts
+    TOP_VAULTS_INTERVAL: float = 30
+    TOP_VAULTS_BATCH_SIZE: int = 200
+
+    # vault entries, most entries added, removed or moved in one request
+    VAULT_BATCH_SIZE: int = 500
+
+    # metrics, recomputed in the background; set 0 only when
+    # app.commands.recompute_metrics is scheduled instead
+    METRICS_RECOMPUTE_INTERVAL: int = 3600
+    # monthly metric partitions, created this many months ahead; partitions
+    # that ended more than METRIC_RETENTION_DAYS ago (never less than the
+    # 365 day score window) are rolled up into metric_summary and dropped
+    METRIC_PARTITION_INTERVAL: int = 3600
+    METRIC_PARTITIONS_AHEAD: int = 3
+    METRIC_RETENTION_DAYS: int = 400
+    METRIC_ROLLUP: bool = True
 
     @property
     def DATABASE_URL(self) -> str:
         return f"postgresql+psycopg2://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return f"postgresql+psycopg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -1,6 +1,11 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.sql import text
 
 from app.config import settings
@@ -8,24 +13,53 @@ from app.config import settings
 engine = create_engine(
     url=settings.DATABASE_URL,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
     pool_timeout=30,
     pool_recycle=1800,
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = create_async_engine(
+    url=settings.ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=30,
+    pool_recycle=1800,
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+ef_search_stmt = text("SELECT set_config('hnsw.ef_search', :ef_search, true)")
+
 
 def get_db():
     db = SessionLocal()
-    db.execute(text("SET hnsw.ef_search = 800"))
     try:
         yield db
     finally:
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def set_ef_search(db: Session, ef_search: int = settings.HNSW_EF_SEARCH):
+    """Set hnsw.ef_search for the current transaction only."""
+    db.execute(ef_search_stmt, {"ef_search": str(ef_search)})
+
+
+async def set_ef_search_async(
+    db: AsyncSession, ef_search: int = settings.HNSW_EF_SEARCH
+):
+    await db.execute(ef_search_stmt, {"ef_search": str(ef_search)})
+
+
 """ # neo4j setup
 driver = GraphDatabase.driver(
     settings.NEO4J_URI, auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
@@ -1,18 +1,154 @@
+from contextlib import asynccontextmanager
+import logging
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_pagination import add_pagination
 
 from app.config import settings
 from app.routers import auth, comment, post, user, vault, search
+from app.utils.autocomplete import refresh_search_index
+from app.utils.counter import drain_counters, flush_counters
+from app.utils.metric import recompute_all_metrics
+from app.utils.neighbours import evict_neighbours
+from app.utils.partition import maintain_partitions
+from app.utils.post import refresh_due_top_vaults
+from app.utils.ranking import refresh_stale_snapshots
+from app.utils.response_cache import ResponseCacheMiddleware
+from app.utils.search_queue import (
+    drain_searches,
+    flush_searches,
+    log_search_queue_stats,
+)
+from app.utils.similarity import refresh_similarity_index
+from app.utils.worker import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+workers = []
+if settings.COUNTER_BUFFER:
+    workers.append(
+        PeriodicWorker(
+            "counters",
+            settings.COUNTER_FLUSH_INTERVAL,
+            flush_counters,
+            on_stop=drain_counters,
+        )
+    )
+if settings.SEARCH_QUEUE:
+    workers.append(
+        PeriodicWorker(
+            "searches",
+            settings.SEARCH_FLUSH_INTERVAL,
+            flush_searches,
+            on_stop=drain_searches,
+        )
+    )
+    if settings.SEARCH_QUEUE_STATS_INTERVAL:
+        workers.append(
+            PeriodicWorker(
+                "search-queue-stats",
+                settings.SEARCH_QUEUE_STATS_INTERVAL,
+                log_search_queue_stats,
+            )
+        )
+if settings.RANKING_SNAPSHOTS:
+    workers.append(
+        PeriodicWorker(
+            "ranking-snapshots",
+            settings.RANKING_SNAPSHOT_INTERVAL / 5,
+            refresh_stale_snapshots,
+        )
+    )
+if settings.AUTOCOMPLETE:
+    workers.append(
+        PeriodicWorker(
+            "autocomplete",
+            settings.AUTOCOMPLETE_REFRESH_INTERVAL,
+            refresh_search_index,
+        )
+    )
+if settings.SIMILARITY_ENGINE == "numpy":
+    workers.append(
+        PeriodicWorker(
+            "similarity-index",
+            settings.SIMILARITY_REFRESH_INTERVAL,
+            refresh_similarity_index,
+        )
+    )
+if settings.NEIGHBOUR_CACHE:
+    workers.append(
+        PeriodicWorker(
+            "neighbour-cache",
+            settings.NEIGHBOUR_CACHE_EVICT_INTERVAL,
+            evict_neighbours,
+        )
+    )
+if settings.TOP_VAULTS_INTERVAL:
+    workers.append(
+        PeriodicWorker(
+            "top-vaults",
+            settings.TOP_VAULTS_INTERVAL,
+            refresh_due_top_vaults,
+        )
+    )
+if settings.METRICS_RECOMPUTE_INTERVAL:
+    workers.append(
+        PeriodicWorker(
+            "metrics",
+            settings.METRICS_RECOMPUTE_INTERVAL,
+            recompute_all_metrics,
+        )
+    )
+if settings.METRIC_PARTITION_INTERVAL:
+    workers.append(
+        PeriodicWorker(
+            "metric-partitions",
+            settings.METRIC_PARTITION_INTERVAL,
+            maintain_partitions,
+        )
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not settings.METRICS_RECOMPUTE_INTERVAL:
+        logger.warning(
+            "METRICS_RECOMPUTE_INTERVAL is 0, trend/week/month/year scores "
+            "only change when app.commands.recompute_metrics runs"
+        )
+    for worker in workers:
+        worker.start()
+    yield
+    for worker in workers:
+        worker.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+sync_routers = [
+    post.router,
+    search.router,
+    comment.router,
+    vault.router,
+    user.router,
+    auth.router,
+]
+
+if settings.ASYNC_DB:
+    # the async endpoints replace the sync ones with the same path and
+    # method, which are left out instead of registered twice
+    from app.routers import aio
+
+    for router in aio.routers:
+        app.include_router(router)
+    sync_routers = [aio.without_replaced(router) for router in sync_routers]
 
+for router in sync_routers:
+    app.include_router(router)
 
-app = FastAPI()
-app.include_router(post.router)
-app.include_router(search.router)
-app.include_router(comment.router)
-app.include_router(vault.router)
-app.include_router(user.router)
-app.include_router(auth.router)
+if settings.RESPONSE_CACHE:
+    app.add_middleware(ResponseCacheMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -11,12 +11,15 @@ from sqlalchemy import (
     Integer,
     String,
     Boolean,
+    text,
 )
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.orm import deferred, relationship
 
+from app.config import settings
 from app.db import Base
 from app.types import (
+    CounterType,
     PrivacyType,
     ReactionType,
     TargetType,
@@ -51,16 +54,34 @@ class VaultPost(Base):
         default=datetime.now(timezone.utc),
         nullable=False,
     )
+    # position in the vault, entries are listed by (index, id)
     index = Column(Integer, default=0, nullable=False)
-    vault_id = Column(
-        Integer, ForeignKey("vault.id"), nullable=False, index=True
-    )
+    vault_id = Column(Integer, ForeignKey("vault.id"), nullable=False)
     post_id = Column(Integer, ForeignKey("post.id"), nullable=False)
+    # copied from the post by triggers so entry pages never join post
+    preview_url = Column(String)
+    sample_url = Column(String)
+    type = Column(Enum(FileType))
 
     vault = relationship("Vault", back_populates="vault_posts")
     post = relationship("Post", backref="vault_post")
 
-    __table_args__ = (Index("ix_vault_post", "post_id", "vault_id"),)
+    __table_args__ = (
+        Index("ix_vault_post", "post_id", "vault_id"),
+        # covers entry pages, so they are served by an index-only scan
+        Index(
+            "ix_vault_post_listing",
+            vault_id,
+            index,
+            id,
+            postgresql_include=[
+                "post_id",
+                "preview_url",
+                "sample_url",
+                "type",
+            ],
+        ),
+    )
 
 
 class Post(Base):
@@ -80,31 +101,74 @@ class Post(Base):
         Enum(RatingType), nullable=False, default=RatingType.EXPLICIT
     )
     type = Column(Enum(FileType), nullable=False, default=FileType.IMAGE)
-    tags = Column(String)
-    top_tags = Column(JSONB, nullable=False, default=[])
-    top_vaults = Column(JSONB, nullable=False, default=[])
-    source_id = Column(Integer, index=True)
+    # heavy columns are only loaded when a query asks for them
+    tags = deferred(Column(String), group="heavy")
+    top_tags = deferred(Column(JSONB, nullable=False, default=[]), group="heavy")
+    top_vaults = deferred(Column(JSONB, nullable=False, default=[]), group="heavy")
+    top_vaults_updated = Column(DateTime(timezone=True))
+    source_id = Column(Integer, index=True, unique=True)
     source = Column(String)
     likes = Column(Integer, default=0, nullable=False)
     dislikes = Column(Integer, default=0, nullable=False)
     saves = Column(Integer, default=0, nullable=False)
     comment_count = Column(Integer, default=0, nullable=False)
     ai_generated = Column(Boolean, default=False, nullable=False)
-    embedding = Column(Vector(512))
+    embedding = deferred(Column(Vector(512)), group="heavy")
+    # set by a trigger whenever embedding is written or changed
+    embedding_updated = Column(DateTime(timezone=True))
     last_updated = Column(
         DateTime(timezone=True),
         default=datetime.now(timezone.utc),
         nullable=False,
     )
 
-    score = Column(Float, nullable=False, default=0, index=True)
-    week_score = Column(Float, nullable=False, default=0, index=True)
-    month_score = Column(Float, nullable=False, default=0, index=True)
-    year_score = Column(Float, nullable=False, default=0, index=True)
-    trend_score = Column(Float, nullable=False, default=0, index=True)
+    score = Column(Float, nullable=False, default=0)
+    week_score = Column(Float, nullable=False, default=0)
+    month_score = Column(Float, nullable=False, default=0)
+    year_score = Column(Float, nullable=False, default=0)
+    trend_score = Column(Float, nullable=False, default=0)
 
     comments = relationship("Comment", back_populates="post", lazy="dynamic")
 
+    __table_args__ = (
+        # feeds page by (rank, id), see app.utils.keyset
+        Index("ix_post_score_id", score.desc(), id.desc()),
+        Index("ix_post_week_score_id", week_score.desc(), id.desc()),
+        Index("ix_post_month_score_id", month_score.desc(), id.desc()),
+        Index("ix_post_year_score_id", year_score.desc(), id.desc()),
+        Index("ix_post_trend_score_id", trend_score.desc(), id.desc()),
+        Index("ix_post_date_created_id", date_created.desc(), id.desc()),
+        Index(
+            "ix_post_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={
+                "m": settings.HNSW_M,
+                "ef_construction": settings.HNSW_EF_CONSTRUCTION,
+            },
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+        Index(
+            "ix_post_embedding_updated",
+            "embedding_updated",
+            postgresql_where=text("embedding_updated IS NOT NULL"),
+        ),
+        Index(
+            "ix_post_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_post_top_vaults_due",
+            "last_updated",
+            postgresql_where=text(
+                "top_vaults_updated IS NULL OR top_vaults_updated < last_updated "
+                "OR top_vaults_updated < embedding_updated"
+            ),
+        ),
+    )
+
 
 class Vault(Base):
     __tablename__ = "vault"
@@ -120,6 +184,8 @@ class Vault(Base):
     description = Column(String)
     previews = Column(JSONB, nullable=False, default=[])
     post_count = Column(Integer, default=0, nullable=False)
+    # next free VaultPost.index, reserved with UPDATE ... RETURNING
+    next_index = Column(Integer, default=0, nullable=False)
     likes = Column(Integer, default=0, nullable=False)
     dislikes = Column(Integer, default=0, nullable=False)
     layout = Column(
@@ -134,17 +200,34 @@ class Vault(Base):
         nullable=False,
     )
 
-    score = Column(Float, default=0, index=True, nullable=False)
-    week_score = Column(Float, default=0, index=True, nullable=False)
-    month_score = Column(Float, default=0, index=True, nullable=False)
-    year_score = Column(Float, default=0, index=True, nullable=False)
-    trend_score = Column(Float, default=0, index=True, nullable=False)
+    score = Column(Float, default=0, nullable=False)
+    week_score = Column(Float, default=0, nullable=False)
+    month_score = Column(Float, default=0, nullable=False)
+    year_score = Column(Float, default=0, nullable=False)
+    trend_score = Column(Float, default=0, nullable=False)
 
     user = relationship("User", back_populates="vaults")
     vault_posts = relationship(
         "VaultPost", back_populates="vault", cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        Index("ix_vault_score_id", score.desc(), id.desc()),
+        Index("ix_vault_week_score_id", week_score.desc(), id.desc()),
+        Index("ix_vault_month_score_id", month_score.desc(), id.desc()),
+        Index("ix_vault_year_score_id", year_score.desc(), id.desc()),
+        Index("ix_vault_trend_score_id", trend_score.desc(), id.desc()),
+        Index("ix_vault_date_created_id", date_created.desc(), id.desc()),
+        Index(
+            "ix_vault_user_id_ranking",
+            user_id,
+            score.desc(),
+            post_count.desc(),
+            date_created.desc(),
+            id.desc(),
+        ),
+    )
+
 
 class Comment(Base):
     __tablename__ = "comment"
@@ -164,6 +247,15 @@ class Comment(Base):
     post = relationship("Post", back_populates="comments")
     user = relationship("User", back_populates="comments")
 
+    __table_args__ = (
+        Index(
+            "ix_comment_post_id_date_created",
+            post_id,
+            date_created.desc(),
+            id.desc(),
+        ),
+    )
+
 
 class Reaction(Base):
     __tablename__ = "reaction"
@@ -180,13 +272,27 @@ class Reaction(Base):
     type = Column(Enum(ReactionType), nullable=False)
 
     __table_args__ = (
-        Index("ix_user_type_id", "user_id", "target_type", "target_id"),
+        Index(
+            "uq_reaction_user_target",
+            "user_id",
+            "target_type",
+            "target_id",
+            unique=True,
+        ),
         Index(
             "ix_date_created_type_id",
             "date_created",
             "target_type",
             "target_id",
         ),
+        Index(
+            "ix_reaction_user_id_type_date_created",
+            user_id,
+            target_type,
+            type,
+            date_created.desc(),
+            id.desc(),
+        ),
     )
 
 
@@ -204,46 +310,58 @@ class Search(Base):
     year_score = Column(Integer, default=1, index=True, nullable=False)
     trend_score = Column(Integer, default=0, index=True, nullable=False)
 
+    __table_args__ = (
+        Index(
+            "ix_search_query_pattern",
+            "query",
+            postgresql_ops={"query": "text_pattern_ops"},
+        ),
+    )
+
 
+# metric tables are range partitioned by month on date_created, which is
+# part of their primary key, see app.utils.partition
 class SearchMetric(Base):
     __tablename__ = "search_metric"
-    id = Column(Integer, primary_key=True, index=True)
-    query = Column(String, index=True, nullable=False)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    query = Column(String, nullable=False)
     date_created = Column(
         DateTime(timezone=True),
-        default=datetime.now(timezone.utc),
-        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        primary_key=True,
     )
     score = Column(Integer, default=1, nullable=False)
 
     __table_args__ = (
         Index("ix_search_query_date_created", "query", "date_created"),
+        {"postgresql_partition_by": "RANGE (date_created)"},
     )
 
 
 class VaultMetric(Base):
     __tablename__ = "vault_metric"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     date_created = Column(
         DateTime(timezone=True),
-        default=datetime.now(timezone.utc),
-        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        primary_key=True,
     )
     vault_id = Column(Integer, ForeignKey("vault.id"), nullable=False)
     score = Column(Float, default=0, nullable=False)
 
     __table_args__ = (
         Index("ix_vault_id_date_created", "vault_id", "date_created"),
+        {"postgresql_partition_by": "RANGE (date_created)"},
     )
 
 
 class PostMetric(Base):
     __tablename__ = "post_metric"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     date_created = Column(
         DateTime(timezone=True),
-        default=datetime.now(timezone.utc),
-        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        primary_key=True,
     )
     post_id = Column(Integer, ForeignKey("post.id"), nullable=False)
     score = Column(Float, default=0, nullable=False)
@@ -251,7 +369,78 @@ class PostMetric(Base):
 
     __table_args__ = (
         Index("ix_post_id_date_created", "post_id", "date_created"),
+        {"postgresql_partition_by": "RANGE (date_created)"},
+    )
+
+
+class MetricSummary(Base):
+    """Yearly totals of metric rows whose partition has been dropped."""
+
+    __tablename__ = "metric_summary"
+    metric = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    year = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+
+
+class RankingSnapshot(Base):
+    __tablename__ = "ranking_snapshot"
+    id = Column(Integer, primary_key=True, index=True)
+    date_created = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+    key = Column(String, nullable=False)
+    post_ids = Column(ARRAY(Integer), nullable=False)
+
+    __table_args__ = (
+        Index("ix_ranking_snapshot_key_date_created", "key", "date_created"),
+    )
+
+
+class CounterDelta(Base):
+    __tablename__ = "counter_delta"
+    id = Column(Integer, primary_key=True, index=True)
+    date_created = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+        index=True,
+    )
+    user_id = Column(Integer)
+    target_type = Column(Enum(TargetType), nullable=False)
+    target_id = Column(Integer, nullable=False)
+    counter = Column(Enum(CounterType), nullable=False)
+    delta = Column(Integer, nullable=False)
+
+
+class PostNeighbours(Base):
+    """Cached nearest neighbours of a post for one filter combination.
+
+    Rows are dropped by a trigger when the post's embedding changes and
+    recomputed once older than NEIGHBOUR_CACHE_MAX_AGE.
+    """
+
+    __tablename__ = "post_neighbours"
+    post_id = Column(
+        Integer, ForeignKey("post.id", ondelete="CASCADE"), primary_key=True
+    )
+    key = Column(String, primary_key=True)
+    date_created = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+    last_used = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+        index=True,
     )
+    ids = Column(ARRAY(Integer), nullable=False)
+    distances = Column(ARRAY(Float), nullable=False)
 
 
 """ Index("ix_post_top_tags", Post.top_tags, postgresql_using="gin") """
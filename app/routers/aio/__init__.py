@@ -0,0 +1,30 @@
+from fastapi import APIRouter
+
+from . import comment, post, search, user, vault
+
+routers = [
+    post.router,
+    search.router,
+    comment.router,
+    vault.router,
+    user.router,
+]
+
+
+def route_keys(route):
+    return {(route.path, method) for method in getattr(route, "methods", None) or ()}
+
+
+# (path, method) of every sync endpoint replaced by an async one
+replaced = set().union(
+    *(route_keys(route) for router in routers for route in router.routes)
+)
+
+
+def without_replaced(router: APIRouter):
+    """Copy of a sync router without the endpoints the async routers replace."""
+    kept = APIRouter()
+    kept.routes.extend(
+        route for route in router.routes if not route_keys(route) & replaced
+    )
+    return kept
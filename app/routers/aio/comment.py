@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi_pagination import resolve_params
+from fastapi_pagination.cursor import CursorPage
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_async_db
+from app.routers.comment import comments_keys, comments_stmt, user_reactions_stmt
+from app.schemas.comment import CommentResponse
+from app.types import TargetType
+from app.utils.auth import get_user_id
+from app.utils.counter import apply_pending
+from app.utils.keyset import paginate_keyset
+from app.utils.post import post_exists_stmt
+
+router = APIRouter(tags=["Comment"])
+
+
+@router.get("/posts/{post_id}/comments", response_model=CursorPage[CommentResponse])
+async def get_comments(
+    post_id: int,
+    user_id: int | None = Depends(get_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if not (await db.execute(post_exists_stmt(post_id))).scalar():
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    params = resolve_params()
+    stmt = comments_stmt(post_id)
+    paginated_comments = await db.run_sync(
+        paginate_keyset, params, stmt, *comments_keys
+    )
+    for comment in paginated_comments.items:
+        apply_pending(comment, TargetType.COMMENT)
+
+    if user_id:
+        comment_ids = [comment.id for comment in paginated_comments.items]
+        stmt = user_reactions_stmt(comment_ids, user_id)
+        reactions = (await db.execute(stmt)).all()
+
+        reactions_map = {reaction.target_id: reaction.type for reaction in reactions}
+        for comment in paginated_comments.items:
+            if reactions_map.get(comment.id):
+                comment.user_reaction = reactions_map.get(comment.id)
+    return paginated_comments
@@ -0,0 +1,101 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi_pagination import resolve_params
+from fastapi_pagination.cursor import CursorPage
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import get_async_db
+from app.models import Post
+from app.routers.post import (
+    post_detail_stmt,
+    recommendation_keys,
+    recommendation_stmt,
+    top_vaults_stmt,
+    user_reaction_stmt,
+)
+from app.schemas.post import PostBase, PostResponse
+from app.schemas.vault import VaultBase
+import app.types as ta
+from app.utils.ann import paginate_nearest
+from app.utils.auth import get_user_id
+from app.utils.counter import apply_pending
+from app.utils.keyset import paginate_keyset
+from app.utils.neighbours import paginate_neighbours
+from app.utils.similarity import paginate_similar
+
+router = APIRouter(tags=["Post"])
+
+
+@router.get("/posts/recommend", response_model=CursorPage[PostBase])
+async def get_recommendation(db: AsyncSession = Depends(get_async_db)):
+    params = resolve_params()
+    return await db.run_sync(
+        paginate_keyset, params, recommendation_stmt, *recommendation_keys
+    )
+
+
+@router.get("/posts/{post_id}", response_model=PostResponse)
+async def get_post(
+    post_id: int,
+    user_id: int | None = Depends(get_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    post = (await db.execute(post_detail_stmt(post_id))).scalar_one_or_none()
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    apply_pending(post, ta.TargetType.POST)
+
+    if user_id:
+        stmt = user_reaction_stmt(post_id, user_id)
+        result = (await db.execute(stmt)).scalar_one_or_none()
+        if result:
+            post.user_reaction = result
+    return post
+
+
+@router.get("/posts/{post_id}/recommend", response_model=CursorPage[PostBase])
+async def get_post_recommendation(
+    post_id: int,
+    query: Annotated[str | None, Query(min_length=1, max_length=50)] = None,
+    type: ta.FileType = None,
+    rating: ta.RatingType = ta.RatingType.EXPLICIT,
+    filter_ai: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    stmt = Select(Post.embedding).where(Post.id == post_id)
+    embedding = (await db.execute(stmt)).scalar_one_or_none()
+    if embedding is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    params = resolve_params()
+    if not query and settings.NEIGHBOUR_CACHE:
+        page = await db.run_sync(
+            paginate_neighbours, params, post_id, embedding, rating, type, filter_ai
+        )
+        if page is not None:
+            return page
+    elif not query and settings.SIMILARITY_ENGINE != "pgvector":
+        page = await db.run_sync(
+            paginate_similar, params, embedding, rating, type, filter_ai
+        )
+        if page is not None:
+            return page
+
+    return await db.run_sync(
+        paginate_nearest, params, embedding, query, type, rating, filter_ai
+    )
+
+
+@router.get("/posts/{post_id}/recommend/vaults", response_model=list[VaultBase])
+async def get_post_vault_recommendation(
+    post_id: int, db: AsyncSession = Depends(get_async_db)
+):
+    vaults = []
+    stmt = Select(Post.top_vaults).where(Post.id == post_id)
+    top_vaults = (await db.execute(stmt)).scalar_one_or_none()
+    if top_vaults:
+        vaults = (await db.execute(top_vaults_stmt(top_vaults))).scalars().all()
+    return vaults
@@ -0,0 +1,81 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+from fastapi_pagination import resolve_params
+from fastapi_pagination.cursor import CursorPage
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import get_async_db
+from app.routers.search import (
+    record_search,
+    searches_stmt,
+    vault_feed_keys,
+    vault_feed_stmt,
+)
+from app.schemas.post import PostBase
+from app.schemas.search import SearchBase
+from app.schemas.vault import VaultBase
+from app.types import OrderType, RatingType, FileType
+from app.utils.autocomplete import search_index
+from app.utils.keyset import paginate_keyset
+from app.utils.ranking import paginate_snapshot
+from app.utils.search import post_feed_keys, post_feed_stmt
+from app.utils.search_queue import search_queue
+
+router = APIRouter(tags=["Search"])
+
+
+@router.get("/posts", response_model=CursorPage[PostBase])
+async def search_posts(
+    query: Annotated[str | None, Query(min_length=1, max_length=50)] = None,
+    rating: RatingType = RatingType.EXPLICIT,
+    order: OrderType = OrderType.TRENDING,
+    type: FileType = None,
+    filter_ai: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    params = resolve_params()
+    if query:
+        if settings.SEARCH_QUEUE:
+            search_queue.push(query)
+        else:
+            await db.run_sync(record_search, query)
+    elif settings.RANKING_SNAPSHOTS:
+        page = await db.run_sync(
+            paginate_snapshot, params, order, rating, type, filter_ai
+        )
+        if page is not None:
+            return page
+
+    posts = post_feed_stmt(query, rating, order, type, filter_ai)
+    return await db.run_sync(
+        paginate_keyset, params, posts, *post_feed_keys(order)
+    )
+
+
+@router.get("/vaults", response_model=CursorPage[VaultBase])
+async def get_vaults(
+    query: Annotated[str | None, Query(min_length=1, max_length=50)] = None,
+    order: OrderType = OrderType.POPULAR,
+    db: AsyncSession = Depends(get_async_db),
+):
+    params = resolve_params()
+    vaults = vault_feed_stmt(query, order)
+    return await db.run_sync(
+        paginate_keyset, params, vaults, *vault_feed_keys(order)
+    )
+
+
+@router.get("/searches", response_model=list[SearchBase])
+async def get_searches(
+    query: Annotated[str | None, Query(min_length=1, max_length=50)] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    if settings.AUTOCOMPLETE:
+        searches = search_index.lookup(query)
+        if searches is not None:
+            return searches
+
+    result = await db.execute(searches_stmt(query))
+    return [dict(row._mapping) for row in result.all()]
@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi_pagination import resolve_params
+from fastapi_pagination.cursor import CursorPage
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_async_db
+from app.models import User
+from app.routers.user import (
+    user_reaction_keys,
+    user_reaction_posts_stmt,
+    user_vaults_keys,
+    user_vaults_stmt,
+)
+from app.schemas.user import UserResponse
+from app.schemas.vault import VaultBase
+from app.schemas.post import PostBase
+from app.types import ReactionType
+from app.utils.auth import verify_token
+from app.utils.keyset import paginate_keyset
+
+router = APIRouter(tags=["User"])
+
+
+@router.get("/users/{user_id}", response_model=UserResponse)
+async def get_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+
+@router.get("/users/{user_id}/vaults", response_model=CursorPage[VaultBase])
+async def get_user_vaults(
+    user_id: int,
+    user: dict = Depends(verify_token),
+    db: AsyncSession = Depends(get_async_db),
+):
+    query_user = await db.get(User, user_id)
+    if not query_user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    params = resolve_params()
+    public_only = not user or user.get("id") != query_user.id
+    vaults = user_vaults_stmt(query_user.id, public_only)
+    return await db.run_sync(paginate_keyset, params, vaults, *user_vaults_keys)
+
+
+@router.get("/users/{user_id}/reactions", response_model=CursorPage[PostBase])
+async def get_user_reaction(
+    user_id: int,
+    type: ReactionType = ReactionType.LIKE,
+    db: AsyncSession = Depends(get_async_db),
+):
+    params = resolve_params()
+    posts = user_reaction_posts_stmt(user_id, type)
+    return await db.run_sync(paginate_keyset, params, posts, *user_reaction_keys)
@@ -0,0 +1,82 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi_pagination import resolve_params
+from fastapi_pagination.cursor import CursorPage
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.db import get_async_db
+from app.models import Vault
+from app.routers.vault import (
+    entry_previews,
+    user_reaction_stmt,
+    vault_posts_keys,
+    vault_posts_stmt,
+    vault_recommendation_keys,
+    vault_recommendation_stmt,
+)
+from app.schemas.vault import EntryPreview, VaultResponse, VaultBase
+from app.types import PrivacyType, TargetType
+from app.utils.auth import get_user_id
+from app.utils.counter import apply_pending
+from app.utils.keyset import paginate_keyset
+
+router = APIRouter(tags=["Vault"])
+
+
+@router.get("/vaults/recommend", response_model=CursorPage[VaultBase])
+async def get_vault_recommendation(db: AsyncSession = Depends(get_async_db)):
+    params = resolve_params()
+    return await db.run_sync(
+        paginate_keyset,
+        params,
+        vault_recommendation_stmt,
+        *vault_recommendation_keys,
+    )
+
+
+@router.get("/vaults/{vault_id}", response_model=VaultResponse)
+async def get_vault(
+    vault_id: int,
+    user_id: int | None = Depends(get_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    vault = await db.get(Vault, vault_id, options=[selectinload(Vault.user)])
+    if not vault:
+        raise HTTPException(status_code=404, detail="Vault not found")
+
+    if vault.privacy == PrivacyType.PRIVATE:
+        if not user_id or user_id != vault.user_id:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+    apply_pending(vault, TargetType.VAULT)
+    if user_id:
+        stmt = user_reaction_stmt(vault_id, user_id)
+        result = (await db.execute(stmt)).scalar_one_or_none()
+        if result:
+            vault.user_reaction = result
+    return vault
+
+
+@router.get("/vaults/{vault_id}/posts", response_model=CursorPage[EntryPreview])
+async def get_vault_posts(
+    vault_id: int,
+    user_id: int | None = Depends(get_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    vault = await db.get(Vault, vault_id)
+    if not vault:
+        raise HTTPException(status_code=404, detail="Vault not found")
+
+    if vault.privacy == PrivacyType.PRIVATE:
+        if not user_id or user_id != vault.user_id:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+
+    params = resolve_params()
+    stmt = vault_posts_stmt(vault.id)
+    return await db.run_sync(
+        paginate_keyset,
+        params,
+        stmt,
+        *vault_posts_keys,
+        ascending=True,
+        transformer=entry_previews,
+    )
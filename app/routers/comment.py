@@ -1,43 +1,65 @@
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy import desc, Select
-from sqlalchemy.orm import Session
+from fastapi_pagination import resolve_params
+from fastapi_pagination.cursor import CursorPage
+from sqlalchemy import Select
+from sqlalchemy.orm import joinedload, Session
 
 from app.db import get_db
-from app.models import Comment, Post, Reaction
+from app.models import Comment, Reaction, User
 from app.schemas.comment import CommentCreate, CommentResponse
 from app.schemas.reaction import ReactionCreate
-from app.types import ReactionType, TargetType
-from app.utils import update_reaction_count
-from app.utils.auth import get_user
+from app.types import CounterType, TargetType
+from app.utils.auth import get_user, get_user_id
+from app.utils.counter import apply_pending, record_counters
+from app.utils.keyset import keyset_order, paginate_keyset
+from app.utils.post import post_exists_stmt
+from app.utils.reaction import upsert_reaction
 
 router = APIRouter(tags=["Comment"])
 
 
-@router.get("/posts/{post_id}/comments", response_model=Page[CommentResponse])
+comments_keys = (Comment.date_created, Comment.id)
+
+
+def comments_stmt(post_id: int):
+    return (
+        Select(Comment)
+        .where(Comment.post_id == post_id)
+        .options(
+            joinedload(Comment.user, innerjoin=True).load_only(
+                User.id, User.username
+            )
+        )
+        .order_by(*keyset_order(*comments_keys))
+    )
+
+
+def user_reactions_stmt(comment_ids: list[int], user_id: int):
+    return Select(Reaction.target_id, Reaction.type).where(
+        Reaction.user_id == user_id,
+        Reaction.target_type == TargetType.COMMENT,
+        Reaction.target_id.in_(comment_ids),
+    )
+
+
+@router.get("/posts/{post_id}/comments", response_model=CursorPage[CommentResponse])
 def get_comments(
     post_id: int,
-    user: dict = Depends(get_user),
+    user_id: int | None = Depends(get_user_id),
     db: Session = Depends(get_db),
 ):
-    db_post = db.get(Post, post_id)
-    if not db_post:
+    if not db.execute(post_exists_stmt(post_id)).scalar():
         raise HTTPException(status_code=404, detail="Post not found")
 
-    paginated_comments = paginate(db_post.comments.order_by(desc(Comment.date_created)))
+    params = resolve_params()
+    stmt = comments_stmt(post_id)
+    paginated_comments = paginate_keyset(db, params, stmt, *comments_keys)
+    for comment in paginated_comments.items:
+        apply_pending(comment, TargetType.COMMENT)
 
-    if user:
+    if user_id:
         comment_ids = [comment.id for comment in paginated_comments.items]
-        reactions = (
-            db.query(Reaction)
-            .filter(
-                Reaction.user_id == user.id,
-                Reaction.target_type == TargetType.COMMENT,
-                Reaction.target_id.in_(comment_ids),
-            )
-            .all()
-        )
+        reactions = db.execute(user_reactions_stmt(comment_ids, user_id)).all()
 
         reactions_map = {reaction.target_id: reaction.type for reaction in reactions}
         for comment in paginated_comments.items:
@@ -56,14 +78,15 @@ def create_comment(
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    post = db.get(Post, post_id)
-    if not post:
+    if not db.execute(post_exists_stmt(post_id)).scalar():
         raise HTTPException(status_code=404, detail="Post not found")
 
-    post.comment_count += 1
-    new_comment = Comment(user_id=user.id, post_id=post.id, content=comment.content)
+    new_comment = Comment(user_id=user.id, post_id=post_id, content=comment.content)
 
     try:
+        record_counters(
+            db, TargetType.POST, [post_id], CounterType.COMMENT_COUNT, 1, user.id
+        )
         db.add(new_comment)
         db.commit()
     except Exception:
@@ -94,8 +117,15 @@ def delete_comment(
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
 
-    comment.post.comment_count -= 1
     try:
+        record_counters(
+            db,
+            TargetType.POST,
+            [comment.post_id],
+            CounterType.COMMENT_COUNT,
+            -1,
+            user.id,
+        )
         db.delete(comment)
         db.commit()
     except Exception:
@@ -112,38 +142,22 @@ def react_to_comment(
     user: dict = Depends(get_user),
     db: Session = Depends(get_db),
 ):
-    comment = db.get(Comment, comment_id)
-    if not comment:
-        raise HTTPException(status_code=404, detail="Comment not found")
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
 
-    stmt = Select(Reaction).where(
-        Reaction.target_type == TargetType.COMMENT,
-        Reaction.target_id == comment_id,
-        Reaction.user_id == user.id,
+    result = upsert_reaction(
+        db, TargetType.COMMENT, comment_id, user.id, reaction.type
     )
-
-    prev_reaction = ReactionType.NONE
-    db_reaction = db.execute(stmt).scalar_one_or_none()
-    if not db_reaction:
-        new_reaction = Reaction(
-            target_type=TargetType.COMMENT,
-            target_id=comment_id,
-            user_id=user.id,
-            type=reaction.type,
-        )
-        db.add(new_reaction)
-    else:
-        prev_reaction = db_reaction.type
-        db_reaction.type = reaction.type
+    if not result:
+        raise HTTPException(status_code=404, detail="Comment not found")
 
     try:
-        update_reaction_count(comment, prev_reaction, reaction.type)
         db.commit()
     except Exception:
         db.rollback()
         raise HTTPException(status_code=500, detail="Internal error")
     return {
-        "likes": comment.likes,
-        "dislikes": comment.dislikes,
+        "likes": result.likes,
+        "dislikes": result.dislikes,
         "type": reaction.type,
     }
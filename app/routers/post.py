@@ -1,12 +1,12 @@
 from typing import Annotated
 from datetime import datetime, timezone, timedelta
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi_pagination.ext.sqlalchemy import paginate
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi_pagination import resolve_params
 from fastapi_pagination.cursor import CursorPage
-import numpy
-from sqlalchemy import desc, Select, and_
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, update
+from sqlalchemy.orm import load_only, raiseload, Session
 
+from app.config import settings
 from app.db import get_db
 
 """ from app.db.neo4j import (
@@ -19,10 +19,14 @@ from app.schemas.post import PostBase, PostResponse
 from app.schemas.reaction import ReactionCreate
 from app.schemas.vault import VaultBase
 import app.types as ta
-from app.utils import update_reaction_count, normalize_text
-from app.utils.auth import get_user, get_search_id
-from app.utils.post import log_post_metric, update_top_vaults
-from app.utils.search import create_post_title_filter
+from app.utils.ann import paginate_nearest
+from app.utils.auth import get_user, get_user_id, get_search_id
+from app.utils.counter import apply_pending
+from app.utils.ingest import ingest_posts
+from app.utils.keyset import keyset_order, paginate_keyset
+from app.utils.neighbours import paginate_neighbours
+from app.utils.reaction import upsert_reaction
+from app.utils.similarity import paginate_similar
 
 router = APIRouter(tags=["Post"])
 
@@ -105,32 +109,92 @@ def create_post(
     return {"detail": "Added posts"} """
 
 
+@router.post("/posts/bulk")
+async def ingest_post_batch(
+    request: Request,
+    batch_size: Annotated[
+        int, Query(ge=1, le=10000)
+    ] = settings.POST_INGEST_BATCH_SIZE,
+    user: dict = Depends(get_user),
+):
+    """Load an NDJSON stream of PostCreate objects, one per line."""
+    if not user or user.role != ta.UserRole.ADMIN:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return await ingest_posts(request.stream(), batch_size)
+
+
+recommendation_keys = (Post.week_score, Post.id)
+recommendation_stmt = Select(
+    Post.id, Post.sample_url, Post.preview_url, Post.type
+).order_by(*keyset_order(*recommendation_keys))
+
+
+# every PostResponse field plus the counters apply_pending may adjust
+post_detail_columns = (
+    Post.id,
+    Post.date_created,
+    Post.preview_url,
+    Post.sample_url,
+    Post.file_url,
+    Post.source,
+    Post.title,
+    Post.top_tags,
+    Post.rating,
+    Post.type,
+    Post.likes,
+    Post.dislikes,
+    Post.saves,
+    Post.comment_count,
+    Post.last_updated,
+)
+
+
+def post_detail_stmt(post_id: int):
+    return (
+        Select(Post)
+        .where(Post.id == post_id)
+        .options(load_only(*post_detail_columns, raiseload=True), raiseload("*"))
+    )
+
+
+def user_reaction_stmt(post_id: int, user_id: int):
+    return Select(Reaction.type).where(
+        Reaction.target_type == ta.TargetType.POST,
+        Reaction.target_id == post_id,
+        Reaction.user_id == user_id,
+    )
+
+
+def top_vaults_stmt(top_vaults: list):
+    ids = [int(id) for id in top_vaults]
+    return (
+        Select(Vault)
+        .where(Vault.id.in_(ids), Vault.privacy == ta.PrivacyType.PUBLIC)
+        .limit(4)
+    )
+
+
 @router.get("/posts/recommend", response_model=CursorPage[PostBase])
 def get_recommendation(
     db: Session = Depends(get_db),
 ):
-    posts = db.query(Post.id, Post.sample_url, Post.preview_url, Post.type).order_by(
-        desc(Post.week_score)
-    )
-    return paginate(posts)
+    params = resolve_params()
+    return paginate_keyset(db, params, recommendation_stmt, *recommendation_keys)
 
 
 @router.get("/posts/{post_id}", response_model=PostResponse)
 def get_post(
     post_id: int,
-    user: dict = Depends(get_user),
+    user_id: int | None = Depends(get_user_id),
     db: Session = Depends(get_db),
 ):
-    post = db.get(Post, post_id)
+    post = db.execute(post_detail_stmt(post_id)).scalar_one_or_none()
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
+    apply_pending(post, ta.TargetType.POST)
 
-    if user:
-        stmt = Select(Reaction.type).where(
-            Reaction.target_type == ta.TargetType.POST,
-            Reaction.target_id == post_id,
-            Reaction.user_id == user.id,
-        )
+    if user_id:
+        stmt = user_reaction_stmt(post_id, user_id)
         result = db.execute(stmt).scalar_one_or_none()
         if result:
             post.user_reaction = result
@@ -145,19 +209,20 @@ def update_post(
     db: Session = Depends(get_db),
 ):
     now = datetime.now(timezone.utc)
-    post = db.get(Post, post_id)
-    if not post:
+    stmt = Select(Post.last_updated).where(Post.id == post_id)
+    last_updated = db.execute(stmt).scalar_one_or_none()
+    if last_updated is None:
         raise HTTPException(status_code=404, detail="Post not found")
 
     # update every time
     if user:
         """log_search_click_(search_id, post_id)"""
 
-    # update only if enough time as elapsed since last update
-    if post.last_updated + timedelta(days=1) < now:
-        post.last_updated = now
-        log_post_metric(db, post, now)
-        update_top_vaults(db, post)
+    # update only if enough time as elapsed since last update, scores are
+    # recomputed by the metrics worker and top_vaults by the top-vaults one
+    if last_updated + timedelta(days=1) < now:
+        stmt = update(Post).where(Post.id == post_id).values(last_updated=now)
+        db.execute(stmt)
         """ update_top_tags(post) """
 
     try:
@@ -181,30 +246,20 @@ def get_post_recommendation(
     if embedding is None:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    filters = []
-    vector = numpy.array(embedding).tolist()
-
-    if query:
-        normalized_query = normalize_text(query)
-        title_filters = create_post_title_filter(normalized_query)
-        for filter in title_filters:
-            filters.append(filter)
-
-    if type:
-        filters.append(Post.type == type)
-
-    if rating == ta.RatingType.QUESTIONABLE:
-        filters.append(Post.rating == ta.RatingType.QUESTIONABLE)
-
-    if filter_ai:
-        filters.append(Post.ai_generated.is_(False))
+    params = resolve_params()
+    # title queries need the database, the other filters work in any engine
+    if not query and settings.NEIGHBOUR_CACHE:
+        page = paginate_neighbours(
+            db, params, post_id, embedding, rating, type, filter_ai
+        )
+        if page is not None:
+            return page
+    elif not query and settings.SIMILARITY_ENGINE != "pgvector":
+        page = paginate_similar(db, params, embedding, rating, type, filter_ai)
+        if page is not None:
+            return page
 
-    posts = (
-        Select(Post.id, Post.sample_url, Post.preview_url, Post.type)
-        .where(and_(*filters))
-        .order_by(Post.embedding.cosine_distance(vector))
-    )
-    return paginate(db, posts)
+    return paginate_nearest(db, params, embedding, query, type, rating, filter_ai)
 
 
 @router.get("/posts/{post_id}/recommend/vaults", response_model=list[VaultBase])
@@ -212,13 +267,7 @@ def get_post_vault_recommendation(post_id: int, db: Session = Depends(get_db)):
     vaults = []
     top_vaults = db.query(Post.top_vaults).filter(Post.id == post_id).first()
     if top_vaults[0]:
-        ids = [int(id) for id in top_vaults[0]]
-        vaults = (
-            db.query(Vault)
-            .filter(Vault.id.in_(ids), Vault.privacy == ta.PrivacyType.PUBLIC)
-            .limit(4)
-            .all()
-        )
+        vaults = db.execute(top_vaults_stmt(top_vaults[0])).scalars().all()
     return vaults
 
 
@@ -232,32 +281,11 @@ def react_to_post(
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    post = db.get(Post, post_id)
-    if not post:
+    result = upsert_reaction(db, ta.TargetType.POST, post_id, user.id, reaction.type)
+    if not result:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    stmt = Select(Reaction).where(
-        Reaction.target_type == ta.TargetType.POST,
-        Reaction.target_id == post_id,
-        Reaction.user_id == user.id,
-    )
-
-    prev_reaction = ta.ReactionType.NONE
-    db_reaction = db.execute(stmt).scalar_one_or_none()
-    if not db_reaction:
-        new_reaction = Reaction(
-            target_type=ta.TargetType.POST,
-            target_id=post_id,
-            user_id=user.id,
-            type=reaction.type,
-        )
-        db.add(new_reaction)
-    else:
-        prev_reaction = db_reaction.type
-        db_reaction.type = reaction.type
-
     try:
-        update_reaction_count(post, prev_reaction, reaction.type)
         """ with driver.session() as session:
             session.execute_write(
                 react_to_post_,
@@ -2,58 +2,98 @@ from datetime import datetime, timezone, timedelta
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi_pagination import Page
+from fastapi_pagination import resolve_params
 from fastapi_pagination.cursor import CursorPage
-from fastapi_pagination.ext.sqlalchemy import paginate
 from sqlalchemy import and_, desc, Select
 from sqlalchemy.orm import Session
 
+from app.config import settings
 from app.db import get_db
 
 """ from app.db.neo4j import log_search_ """
-from app.models import Post, Search, Vault
+from app.models import Search, Vault
 from app.schemas.post import PostBase
 from app.schemas.search import SearchBase
 from app.schemas.vault import VaultBase
 from app.types import OrderType, RatingType, FileType, PrivacyType
 from app.utils import normalize_text
-from app.utils.search import log_search_metric, create_post_title_filter
+from app.utils.autocomplete import search_index
+from app.utils.keyset import keyset_order, paginate_keyset
+from app.utils.ranking import paginate_snapshot
+from app.utils.search import post_feed_keys, post_feed_stmt
+from app.utils.search_queue import search_queue
+from app.utils.vault import vault_base_options
 
 router = APIRouter(tags=["Search"])
 
 
-def get_post_order(order: OrderType):
+def get_vault_rank(order: OrderType):
     if order == OrderType.TRENDING:
-        return desc(Post.trend_score)
+        return Vault.trend_score
     elif order == OrderType.POPULAR:
-        return desc(Post.score)
+        return Vault.score
     elif order == OrderType.POPULAR_WEEK:
-        return desc(Post.week_score)
+        return Vault.week_score
     elif order == OrderType.POPULAR_MONTH:
-        return desc(Post.month_score)
+        return Vault.month_score
     elif order == OrderType.POPULAR_YEAR:
-        return desc(Post.year_score)
+        return Vault.year_score
     elif order == OrderType.NEWEST:
-        return desc(Post.date_created)
+        return Vault.date_created
     else:
-        return desc(Post.trend_score)
+        return Vault.trend_score
 
 
-def get_vault_order(order: OrderType):
-    if order == OrderType.TRENDING:
-        return desc(Vault.trend_score)
-    elif order == OrderType.POPULAR:
-        return desc(Vault.score)
-    elif order == OrderType.POPULAR_WEEK:
-        return desc(Vault.week_score)
-    elif order == OrderType.POPULAR_MONTH:
-        return desc(Vault.month_score)
-    elif order == OrderType.POPULAR_YEAR:
-        return desc(Vault.year_score)
-    elif order == OrderType.NEWEST:
-        return desc(Vault.date_created)
+def vault_feed_keys(order: OrderType):
+    return get_vault_rank(order), Vault.id
+
+
+def record_search(db: Session, query: str):
+    now = datetime.now(timezone.utc)
+    normalized_query = normalize_text(query)
+    search = db.get(Search, normalized_query)
+
+    if not search:
+        search = Search(query=normalized_query, last_updated=now)
+        db.add(search)
     else:
-        return desc(Vault.trend_score)
+        search.score += 1
+        if search.last_updated + timedelta(days=1) < now:
+            search.last_updated = now
+
+    try:
+        db.commit()
+    except Exception:
+        raise HTTPException(status_code=500, detail="Internal error")
+
+
+def vault_feed_stmt(query: str | None, order: OrderType):
+    filters = []
+    filters.append(Vault.privacy == PrivacyType.PUBLIC)
+
+    if query:
+        normalized_query = normalize_text(query)
+        words = normalized_query.split()
+        for word in words:
+            filters.append(Vault.title.ilike(f"%{word}%"))
+
+    return (
+        Select(Vault)
+        .where(and_(*filters))
+        .options(*vault_base_options)
+        .order_by(*keyset_order(*vault_feed_keys(order)))
+    )
+
+
+def searches_stmt(query: str | None):
+    stmt = Select(Search.query, Search.score).order_by(desc(Search.score))
+
+    if query:
+        normalized_query = normalize_text(query)
+        # queries are stored normalized, so a prefix LIKE can use the
+        # text_pattern_ops index
+        stmt = stmt.where(Search.query.startswith(normalized_query, autoescape=True))
+    return stmt.limit(8)
 
 
 @router.get("/posts", response_model=CursorPage[PostBase])
@@ -65,67 +105,30 @@ def search_posts(
     filter_ai: bool = False,
     db: Session = Depends(get_db),
 ):
-    now = datetime.now(timezone.utc)
-    filters = []
-    order_by = get_post_order(order)
-
-    if rating == RatingType.QUESTIONABLE:
-        filters.append(Post.rating == RatingType.QUESTIONABLE)
-
-    if type:
-        filters.append(Post.type == type)
-
-    if filter_ai:
-        filters.append(Post.ai_generated.is_(False))
-
+    params = resolve_params()
     if query:
-        normalized_query = normalize_text(query)
-        title_filters = create_post_title_filter(query)
-        for filter in title_filters:
-            filters.append(filter)
-
-        search = db.get(Search, normalized_query)
-
-        if not search:
-            search = Search(query=normalized_query, last_updated=now)
-            db.add(search)
+        if settings.SEARCH_QUEUE:
+            search_queue.push(query)
         else:
-            search.score += 1
-            if search.last_updated + timedelta(days=1) < now:
-                search.last_updated = now
-                log_search_metric(db, search, now)
-
-        try:
-            db.commit()
-        except Exception:
-            raise HTTPException(status_code=500, detail="Internal error")
-
-    posts = (
-        Select(Post.id, Post.sample_url, Post.preview_url, Post.type)
-        .where(and_(*filters))
-        .order_by(order_by)
-    )
-    return paginate(db, posts)
+            record_search(db, query)
+    elif settings.RANKING_SNAPSHOTS:
+        page = paginate_snapshot(db, params, order, rating, type, filter_ai)
+        if page is not None:
+            return page
 
+    posts = post_feed_stmt(query, rating, order, type, filter_ai)
+    return paginate_keyset(db, params, posts, *post_feed_keys(order))
 
-@router.get("/vaults", response_model=Page[VaultBase])
+
+@router.get("/vaults", response_model=CursorPage[VaultBase])
 def get_vaults(
     query: Annotated[str | None, Query(min_length=1, max_length=50)] = None,
     order: OrderType = OrderType.POPULAR,
     db: Session = Depends(get_db),
 ):
-    filters = []
-    filters.append(Vault.privacy == PrivacyType.PUBLIC)
-    order_by = get_vault_order(order)
-
-    if query:
-        normalized_query = normalize_text(query)
-        words = normalized_query.split()
-        for word in words:
-            filters.append(Vault.title.ilike(f"%{word}%"))
-
-    vaults = Select(Vault).where(and_(*filters)).order_by(order_by)
-    return paginate(db, vaults)
+    params = resolve_params()
+    vaults = vault_feed_stmt(query, order)
+    return paginate_keyset(db, params, vaults, *vault_feed_keys(order))
 
 
 @router.get("/searches", response_model=list[SearchBase])
@@ -133,11 +136,10 @@ def get_searches(
     query: Annotated[str | None, Query(min_length=1, max_length=50)] = None,
     db: Session = Depends(get_db),
 ):
-    stmt = Select(Search.query, Search.score).order_by(desc(Search.score))
+    if settings.AUTOCOMPLETE:
+        searches = search_index.lookup(query)
+        if searches is not None:
+            return searches
 
-    if query:
-        normalized_query = normalize_text(query)
-        stmt = stmt.where(Search.query.ilike(f"{normalized_query}%"))
-    stmt = stmt.limit(8)
-    result = db.execute(stmt)
+    result = db.execute(searches_stmt(query))
     return [dict(row._mapping) for row in result.all()]
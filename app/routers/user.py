@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy import desc
+from fastapi_pagination import resolve_params
+from fastapi_pagination.cursor import CursorPage
+from sqlalchemy import Select
 from sqlalchemy.orm import Session
 
 """ from app.db.neo4j import create_user_ """
@@ -12,10 +12,43 @@ from app.schemas.vault import VaultBase
 from app.schemas.post import PostBase
 from app.types import PrivacyType, ReactionType, TargetType
 from app.utils.auth import verify_token
+from app.utils.keyset import keyset_order, paginate_keyset
+from app.utils.vault import vault_base_options
 
 router = APIRouter(tags=["User"])
 
 
+user_vaults_keys = (Vault.score, Vault.post_count, Vault.date_created, Vault.id)
+
+
+def user_vaults_stmt(user_id: int, public_only: bool):
+    stmt = (
+        Select(Vault)
+        .where(Vault.user_id == user_id)
+        .options(*vault_base_options)
+        .order_by(*keyset_order(*user_vaults_keys))
+    )
+    if public_only:
+        stmt = stmt.where(Vault.privacy == PrivacyType.PUBLIC)
+    return stmt
+
+
+user_reaction_keys = (Reaction.date_created, Reaction.id)
+
+
+def user_reaction_posts_stmt(user_id: int, type: ReactionType):
+    return (
+        Select(Post.id, Post.sample_url, Post.preview_url, Post.type)
+        .join(Reaction, Reaction.target_id == Post.id)
+        .where(
+            Reaction.user_id == user_id,
+            Reaction.target_type == TargetType.POST,
+            Reaction.type == type,
+        )
+        .order_by(*keyset_order(*user_reaction_keys))
+    )
+
+
 @router.get("/users/{user_id}", response_model=UserResponse)
 def get_user(user_id: int, db: Session = Depends(get_db)):
     user = db.get(User, user_id)
@@ -24,7 +57,7 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
     return user
 
 
-@router.get("/users/{user_id}/vaults", response_model=Page[VaultBase])
+@router.get("/users/{user_id}/vaults", response_model=CursorPage[VaultBase])
 def get_user_vaults(
     user_id: int,
     user: dict = Depends(verify_token),
@@ -34,41 +67,21 @@ def get_user_vaults(
     if not query_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    vaults = (
-        db.query(Vault)
-        .filter(Vault.user_id == query_user.id)
-        .order_by(desc(Vault.score), desc(Vault.post_count), desc(Vault.date_created))
-    )
-
-    if not user or user.get("id") != query_user.id:
-        vaults = vaults.filter(Vault.privacy == PrivacyType.PUBLIC)
-
-    paginated_vaults = paginate(vaults)
-    return paginated_vaults
+    params = resolve_params()
+    public_only = not user or user.get("id") != query_user.id
+    vaults = user_vaults_stmt(query_user.id, public_only)
+    return paginate_keyset(db, params, vaults, *user_vaults_keys)
 
 
-@router.get("/users/{user_id}/reactions", response_model=Page[PostBase])
+@router.get("/users/{user_id}/reactions", response_model=CursorPage[PostBase])
 def get_user_reaction(
     user_id: int,
     type: ReactionType = ReactionType.LIKE,
     db: Session = Depends(get_db),
 ):
-    reactions = (
-        db.query(Reaction.target_id)
-        .filter(
-            Reaction.user_id == user_id,
-            Reaction.target_type == TargetType.POST,
-            Reaction.type == type,
-        )
-        .limit(1000)
-        .all()
-    )
-
-    post_ids = [id for (id,) in reactions]
-    posts = db.query(Post.id, Post.sample_url, Post.preview_url, Post.type).filter(
-        Post.id.in_(post_ids)
-    )
-    return paginate(posts)
+    params = resolve_params()
+    posts = user_reaction_posts_stmt(user_id, type)
+    return paginate_keyset(db, params, posts, *user_reaction_keys)
 
 
 """ @router.post("/users/{user_id}/followers")
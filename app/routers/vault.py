@@ -1,22 +1,35 @@
 from datetime import datetime, timezone, timedelta
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi_pagination import Page
+from fastapi_pagination import resolve_params
 from fastapi_pagination.cursor import CursorPage
-from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy import desc, func, Select
+from sqlalchemy import any_, func, Integer, literal, Select
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Session
-from sqlalchemy.orm.attributes import flag_modified
 
 from app.db import get_db
 
 """ from app.db.neo4j import * """
-from app.models import Post, Vault, VaultPost, Reaction
-from app.schemas.vault import VaultCreate, EntryPreview, VaultResponse, VaultBase
+from app.models import Vault, VaultPost, Reaction
+from app.schemas.vault import (
+    EntryChanges,
+    EntryPreview,
+    VaultBase,
+    VaultCreate,
+    VaultPostBatch,
+    VaultResponse,
+)
 from app.schemas.reaction import ReactionCreate
-from app.types import PrivacyType, TargetType, ReactionType
-from app.utils import update_reaction_count
-from app.utils.auth import get_user
-from app.utils.vault import log_vault_metric
+from app.types import PrivacyType, TargetType
+from app.utils.auth import get_user, get_user_id
+from app.utils.counter import apply_pending
+from app.utils.keyset import keyset_order, paginate_keyset
+from app.utils.reaction import upsert_reaction
+from app.utils.vault import (
+    add_entries,
+    move_entry,
+    remove_entries,
+    vault_base_options,
+)
 
 router = APIRouter(tags=["Vault"])
 
@@ -52,20 +65,76 @@ def create_vault(
     return new_vault
 
 
-@router.get("/vaults/recommend", response_model=Page[VaultBase])
+vault_recommendation_keys = (Vault.score, Vault.id)
+vault_recommendation_stmt = (
+    Select(Vault)
+    .where(Vault.privacy == PrivacyType.PUBLIC)
+    .options(*vault_base_options)
+    .order_by(*keyset_order(*vault_recommendation_keys))
+)
+
+# entries are listed in their user defined order, see app.utils.vault
+vault_posts_keys = (VaultPost.index, VaultPost.id)
+
+
+def vault_posts_stmt(vault_id: int):
+    """Entry pages read only vault_post columns in ix_vault_post_listing."""
+    return (
+        Select(
+            VaultPost.id,
+            VaultPost.vault_id,
+            VaultPost.index,
+            VaultPost.post_id,
+            VaultPost.sample_url,
+            VaultPost.preview_url,
+            VaultPost.type,
+        )
+        .where(VaultPost.vault_id == vault_id)
+        .order_by(*keyset_order(*vault_posts_keys, ascending=True))
+    )
+
+
+def entry_previews(rows):
+    return [
+        {
+            "id": row["id"],
+            "vault_id": row["vault_id"],
+            "index": row["index"],
+            "post": {
+                "id": row["post_id"],
+                "sample_url": row["sample_url"],
+                "preview_url": row["preview_url"],
+                "type": row["type"],
+            },
+        }
+        for row in rows
+    ]
+
+
+def owned_vault_stmt(vault_id: int, user_id: int):
+    return Select(Vault.id).where(Vault.id == vault_id, Vault.user_id == user_id)
+
+
+def user_reaction_stmt(vault_id: int, user_id: int):
+    return Select(Reaction.type).where(
+        Reaction.target_type == TargetType.VAULT,
+        Reaction.target_id == vault_id,
+        Reaction.user_id == user_id,
+    )
+
+
+@router.get("/vaults/recommend", response_model=CursorPage[VaultBase])
 def get_vault_recommendation(db: Session = Depends(get_db)):
-    vaults = (
-        db.query(Vault)
-        .order_by(desc(Vault.score))
-        .filter(Vault.privacy == PrivacyType.PUBLIC)
+    params = resolve_params()
+    return paginate_keyset(
+        db, params, vault_recommendation_stmt, *vault_recommendation_keys
     )
-    return paginate(vaults)
 
 
 @router.get("/vaults/{vault_id}", response_model=VaultResponse)
 def get_vault(
     vault_id: int,
-    user: dict = Depends(get_user),
+    user_id: int | None = Depends(get_user_id),
     db: Session = Depends(get_db),
 ):
     vault = db.get(Vault, vault_id)
@@ -73,14 +142,11 @@ def get_vault(
         raise HTTPException(status_code=404, detail="Vault not found")
 
     if vault.privacy == PrivacyType.PRIVATE:
-        if not user or user.id != vault.user_id:
+        if not user_id or user_id != vault.user_id:
             raise HTTPException(status_code=401, detail="Not authenticated")
-    if user:
-        stmt = Select(Reaction.type).where(
-            Reaction.target_type == TargetType.VAULT,
-            Reaction.target_id == vault_id,
-            Reaction.user_id == user.id,
-        )
+    apply_pending(vault, TargetType.VAULT)
+    if user_id:
+        stmt = user_reaction_stmt(vault_id, user_id)
         result = db.execute(stmt).scalar_one_or_none()
         if result:
             vault.user_reaction = result
@@ -157,7 +223,6 @@ def update_vault_log(vault_id: int, db: Session = Depends(get_db)):
 
     if vault.last_updated and vault.last_updated + timedelta(days=1) < now:
         vault.last_updated = now
-        log_vault_metric(db, vault, now)
 
     try:
         db.commit()
@@ -176,35 +241,14 @@ def react_to_vault(
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    vault = db.get(Vault, vault_id)
-    if not vault:
+    result = upsert_reaction(db, TargetType.VAULT, vault_id, user.id, reaction.type)
+    if not result:
         raise HTTPException(status_code=404, detail="Vault not found")
 
-    stmt = Select(Reaction).where(
-        Reaction.target_type == TargetType.VAULT,
-        Reaction.target_id == vault_id,
-        Reaction.user_id == user.id,
-    )
-
-    prev_reaction = ReactionType.NONE
-    db_reaction = db.execute(stmt).scalar_one_or_none()
-    if not db_reaction:
-        new_reaction = Reaction(
-            target_type=TargetType.VAULT,
-            target_id=vault_id,
-            user_id=user.id,
-            type=reaction.type,
-        )
-        db.add(new_reaction)
-    else:
-        prev_reaction = db_reaction.type
-        db_reaction.type = reaction.type
-
     try:
-        update_reaction_count(vault, prev_reaction, reaction.type)
         """ with driver.session() as session:
             session.execute_write(
-                react_to_vault_, user.id, vault.id, reaction.type.value
+                react_to_vault_, user.id, vault_id, reaction.type.value
             ) """
 
         db.commit()
@@ -216,7 +260,7 @@ def react_to_vault(
 @router.get("/vaults/{vault_id}/posts", response_model=CursorPage[EntryPreview])
 def get_vault_posts(
     vault_id: int,
-    user: dict = Depends(get_user),
+    user_id: int | None = Depends(get_user_id),
     db: Session = Depends(get_db),
 ):
     vault = db.get(Vault, vault_id)
@@ -224,18 +268,20 @@ def get_vault_posts(
         raise HTTPException(status_code=404, detail="Vault not found")
 
     if vault.privacy == PrivacyType.PRIVATE:
-        if not user or user.id != vault.user_id:
+        if not user_id or user_id != vault.user_id:
             raise HTTPException(status_code=401, detail="Not authenticated")
 
-    posts = (
-        db.query(VaultPost)
-        .order_by(desc(VaultPost.date_created))
-        .filter(VaultPost.vault_id == vault.id)
+    params = resolve_params()
+    stmt = vault_posts_stmt(vault.id)
+    return paginate_keyset(
+        db,
+        params,
+        stmt,
+        *vault_posts_keys,
+        ascending=True,
+        transformer=entry_previews,
     )
 
-    paginated_posts = paginate(posts)
-    return paginated_posts
-
 
 @router.post("/vaults/{vault_id}/posts/{post_id}")
 def add_post_to_vault(
@@ -247,46 +293,117 @@ def add_post_to_vault(
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    vault = (
-        db.query(Vault).filter(Vault.id == vault_id, Vault.user_id == user.id).first()
-    )
-    if not vault:
+    if db.execute(owned_vault_stmt(vault_id, user.id)).scalar() is None:
         raise HTTPException(status_code=404, detail="Vault not found")
 
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
+    try:
+        added = add_entries(db, vault_id, [post_id], user.id)
+        if added is not None:
+            """ with driver.session() as session:
+                session.execute_write(add_post_, vault_id, post_id) """
+
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Internal error")
+    if added is None:
+        db.rollback()
         raise HTTPException(status_code=404, detail="Post not found")
+    return {"detail": "Added post to vault"}
 
-    index = 0
-    previous_index = (
-        db.query(func.max(VaultPost.index))
-        .filter(VaultPost.vault_id == vault.id)
-        .scalar()
-    )
-    if previous_index is not None:
-        index = previous_index + 1
 
-    new_entry = VaultPost(vault_id=vault.id, post_id=post.id, index=index)
-    post.saves += 1
-    vault.post_count += 1
+@router.post("/vaults/{vault_id}/posts")
+def add_posts_to_vault(
+    vault_id: int,
+    batch: VaultPostBatch,
+    user: dict = Depends(get_user),
+    db: Session = Depends(get_db),
+):
+    """Append up to VAULT_BATCH_SIZE posts with a handful of statements."""
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
 
-    # update previews
-    previews = vault.previews or []
-    previews.append(post.preview_url)
-    vault.previews = previews[-3:]  # limit to 3
-    flag_modified(vault, "previews")
+    if db.execute(owned_vault_stmt(vault_id, user.id)).scalar() is None:
+        raise HTTPException(status_code=404, detail="Vault not found")
 
     try:
-        db.add(new_entry)
+        added = add_entries(db, vault_id, batch.post_ids, user.id)
+        if added is not None:
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Internal error")
+    if added is None:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Post not found")
+    return {"detail": "Added posts to vault", "added": added}
 
-        """ with driver.session() as session:
-            session.execute_write(add_post_, vault.id, post.id) """
 
+@router.delete("/vaults/{vault_id}/posts")
+def remove_posts_from_vault(
+    vault_id: int,
+    batch: VaultPostBatch,
+    user: dict = Depends(get_user),
+    db: Session = Depends(get_db),
+):
+    """Remove every entry of the given posts from the vault."""
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    if db.execute(owned_vault_stmt(vault_id, user.id)).scalar() is None:
+        raise HTTPException(status_code=404, detail="Vault not found")
+
+    post_ids = literal(batch.post_ids, ARRAY(Integer))
+    try:
+        removed = remove_entries(
+            db, vault_id, user.id, VaultPost.post_id == any_(post_ids)
+        )
         db.commit()
     except Exception:
         db.rollback()
         raise HTTPException(status_code=500, detail="Internal error")
-    return {"detail": "Added post to vault"}
+    return {"detail": "Removed posts from vault", "removed": removed}
+
+
+@router.patch("/vaults/{vault_id}/entries")
+def update_vault_entries(
+    vault_id: int,
+    changes: EntryChanges,
+    user: dict = Depends(get_user),
+    db: Session = Depends(get_db),
+):
+    """Remove, add and then move entries in one transaction."""
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    if db.execute(owned_vault_stmt(vault_id, user.id)).scalar() is None:
+        raise HTTPException(status_code=404, detail="Vault not found")
+
+    removed_ids = set(changes.remove)
+    moved_ids = {move.entry_id for move in changes.move}
+    moved_ids |= {move.before_id for move in changes.move if move.before_id}
+    entry_ids = removed_ids | moved_ids
+    stmt = Select(func.count()).where(
+        VaultPost.vault_id == vault_id, VaultPost.id.in_(entry_ids)
+    )
+    if moved_ids & removed_ids or db.execute(stmt).scalar() != len(entry_ids):
+        raise HTTPException(status_code=404, detail="Entry not found")
+
+    try:
+        if removed_ids:
+            remove_entries(db, vault_id, user.id, VaultPost.id.in_(removed_ids))
+        added = add_entries(db, vault_id, changes.add, user.id)
+        if added is not None:
+            for move in changes.move:
+                move_entry(db, vault_id, move.entry_id, move.before_id)
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Internal error")
+    if added is None:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Post not found")
+    return {"detail": "Updated vault entries"}
 
 
 @router.delete("/vaults/{vault_id}/entries/{entry_id}")
@@ -299,25 +416,19 @@ def remove_post_from_vault(
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    vault = (
-        db.query(Vault).filter(Vault.id == vault_id, Vault.user_id == user.id).first()
-    )
-    if not vault:
+    if db.execute(owned_vault_stmt(vault_id, user.id)).scalar() is None:
         raise HTTPException(status_code=404, detail="Vault not found")
 
-    vault_post = db.get(VaultPost, entry_id)
-    if not vault_post:
-        raise HTTPException(status_code=404, detail="Entry not found")
-
     try:
         """with driver.session() as session:
-        session.execute_write(remove_post_, vault.id, vault_post.post_id)"""
+        session.execute_write(remove_post_, vault_id, post_id)"""
 
-        vault_post.post.saves -= 1
-        vault.post_count -= 1
-        db.delete(vault_post)
-        db.commit()
+        removed = remove_entries(db, vault_id, user.id, VaultPost.id == entry_id)
+        if removed:
+            db.commit()
     except Exception:
         db.rollback()
         raise HTTPException(status_code=500, detail="Internal error")
+    if not removed:
+        raise HTTPException(status_code=404, detail="Entry not found")
     return {"detail": "Removed entry from vault"}
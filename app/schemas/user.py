@@ -2,6 +2,8 @@ from datetime import datetime
 
 from pydantic import BaseModel, Field
 
+from app.types import UserRole
+
 
 class UserBase(BaseModel):
     id: int
@@ -18,3 +20,9 @@ class UserResponse(BaseModel):
     id: int
     username: str
     date_created: datetime
+
+
+class CurrentUser(BaseModel):
+    id: int
+    username: str
+    role: UserRole
@@ -2,6 +2,7 @@ from datetime import datetime
 
 from pydantic import BaseModel, Field
 
+from app.config import settings
 from app.schemas.post import PostBase
 from app.schemas.user import UserBase
 from app.types import PrivacyType, ReactionType, LayoutType
@@ -14,6 +15,24 @@ class EntryPreview(BaseModel):
     post: PostBase
 
 
+class EntryMove(BaseModel):
+    entry_id: int
+    # place the entry right before this one, or at the end when None
+    before_id: int | None = None
+
+
+class EntryChanges(BaseModel):
+    add: list[int] = Field(default=[], max_length=settings.VAULT_BATCH_SIZE)
+    remove: list[int] = Field(default=[], max_length=settings.VAULT_BATCH_SIZE)
+    move: list[EntryMove] = Field(default=[], max_length=settings.VAULT_BATCH_SIZE)
+
+
+class VaultPostBatch(BaseModel):
+    post_ids: list[int] = Field(
+        ..., min_length=1, max_length=settings.VAULT_BATCH_SIZE
+    )
+
+
 class VaultCreate(BaseModel):
     title: str = Field(..., min_length=1, max_length=100)
     description: str = Field(..., min_length=0, max_length=100)
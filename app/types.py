@@ -18,6 +18,13 @@ class TargetType(Enum):
     VAULT = "vault"
 
 
+class CounterType(Enum):
+    LIKES = "likes"
+    DISLIKES = "dislikes"
+    SAVES = "saves"
+    COMMENT_COUNT = "comment_count"
+
+
 class PrivacyType(Enum):
     PRIVATE = "private"
     PUBLIC = "public"
@@ -0,0 +1,167 @@
+"""Filtered nearest neighbour pages from the HNSW index.
+
+Filters are applied while the index is walked: with pgvector's iterative
+scan the index keeps producing candidates until enough of them pass the
+WHERE clause, otherwise ef_search is widened up to MAX_EF_SEARCH until the
+page is full and, as a last resort, the page is computed exactly. An
+iterative scan that comes up short has run out of matches or of its scan
+budget, so there the exact pass is kept for selective title filters.
+
+Pages continue from the (distance, id) of the last row instead of an
+OFFSET, so they stay stable while posts are added. The cursor is only a
+filter though: every page walks the graph from the entry point again and
+discards the rows of the earlier pages, so those still count against the
+scan. A page reaches roughly HNSW_MAX_SCAN_TUPLES index tuples deep with
+an iterative scan, widened up to ANN_MAX_WIDENING times by 4x until
+ef_search reaches MAX_EF_SEARCH, or about ef_search rows without it.
+Past that depth a page comes up short and, unless it has a title query
+for the exact pass, returns no next cursor, which ends the feed.
+"""
+
+from fastapi import HTTPException
+from fastapi_pagination.api import create_page
+import numpy
+from sqlalchemy import and_, or_, Select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import text
+
+from app.config import settings
+from app.db import set_ef_search
+from app.models import Post
+from app.types import FileType, RatingType
+from app.utils import normalize_text
+from app.utils.search import post_filters
+
+CURSOR_PREFIX = "near"
+# pgvector rejects larger values
+MAX_EF_SEARCH = 1000
+
+scan_stmt = text(
+    "SELECT set_config('hnsw.iterative_scan', :mode, true), "
+    "set_config('hnsw.max_scan_tuples', :max_scan_tuples, true)"
+)
+
+
+def nearest_stmt(
+    embedding,
+    query: str | None,
+    type: FileType | None,
+    rating: RatingType,
+    filter_ai: bool,
+    after: tuple[float, int] | None = None,
+):
+    """Posts ordered by distance, starting after a (distance, id) cursor."""
+    vector = numpy.asarray(embedding).tolist()
+    normalized_query = normalize_text(query) if query else None
+    filters = post_filters(normalized_query, rating, type, filter_ai)
+    distance = Post.embedding.cosine_distance(vector)
+
+    if after:
+        last_distance, last_id = after
+        filters.append(
+            or_(
+                distance > last_distance,
+                and_(distance == last_distance, Post.id > last_id),
+            )
+        )
+
+    return (
+        Select(
+            Post.id,
+            Post.sample_url,
+            Post.preview_url,
+            Post.type,
+            distance.label("distance"),
+        )
+        .where(Post.embedding.is_not(None), and_(*filters))
+        .order_by(distance, Post.id)
+    )
+
+
+def exact_stmt(stmt: Select):
+    """The same page without the index, by sorting a materialized subquery."""
+    inner = stmt.order_by(None).offset(0).subquery()
+    return Select(inner).order_by(inner.c.distance, inner.c.id)
+
+
+def set_scan(db: Session, ef_search: int, max_scan_tuples: int):
+    set_ef_search(db, min(ef_search, MAX_EF_SEARCH))
+    if settings.HNSW_ITERATIVE_SCAN != "off":
+        db.execute(
+            scan_stmt,
+            {
+                "mode": settings.HNSW_ITERATIVE_SCAN,
+                "max_scan_tuples": str(max_scan_tuples),
+            },
+        )
+
+
+def encode_cursor(distance: float, id: int):
+    return f"{CURSOR_PREFIX}:{distance!r}:{id}"
+
+
+def decode_cursor(cursor: str):
+    try:
+        prefix, distance, id = cursor.split(":")
+        if prefix == CURSOR_PREFIX:
+            return float(distance), int(id)
+    except ValueError:
+        pass
+    return None
+
+
+def fetch_nearest(db: Session, stmt: Select, limit: int, selective: bool = False):
+    """Widen the scan until `limit` rows pass the filters.
+
+    `selective` filters match few enough posts that an iterative scan can
+    give up before finding them, only those fall back to the exact pass.
+    """
+    ef_search = min(settings.HNSW_EF_SEARCH, MAX_EF_SEARCH)
+    max_scan_tuples = settings.HNSW_MAX_SCAN_TUPLES
+
+    for _ in range(settings.ANN_MAX_WIDENING + 1):
+        set_scan(db, ef_search, max_scan_tuples)
+        rows = db.execute(stmt.limit(limit)).all()
+        if len(rows) >= limit or ef_search >= MAX_EF_SEARCH:
+            break
+        ef_search = min(ef_search * 4, MAX_EF_SEARCH)
+        max_scan_tuples *= 4
+
+    if len(rows) >= limit or not settings.ANN_EXACT_FALLBACK:
+        return rows
+    if settings.HNSW_ITERATIVE_SCAN != "off" and not selective:
+        return rows
+    return db.execute(exact_stmt(stmt).limit(limit)).all()
+
+
+def paginate_nearest(
+    db: Session,
+    params,
+    embedding,
+    query: str | None,
+    type: FileType | None,
+    rating: RatingType,
+    filter_ai: bool,
+):
+    raw_params = params.to_raw_params()
+    size = raw_params.size
+
+    after = None
+    if raw_params.cursor is not None:
+        after = decode_cursor(raw_params.cursor)
+        if after is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    stmt = nearest_stmt(embedding, query, type, rating, filter_ai, after)
+    rows = fetch_nearest(db, stmt, size + 1, selective=bool(query))
+    items = rows[:size]
+    has_next = len(rows) > size
+    last = items[-1] if items else None
+
+    return create_page(
+        [row._mapping for row in items],
+        params=params,
+        current=raw_params.cursor,
+        next_=encode_cursor(last.distance, last.id) if has_next else None,
+        previous=None,
+    )
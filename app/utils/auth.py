@@ -4,13 +4,18 @@ from typing import Annotated
 from argon2 import PasswordHasher
 from fastapi import Cookie, Depends
 import jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import object_session, Session
 
 from app.config import settings
-from app.db import get_db
+from app.db import get_db, get_async_db
 from app.models import User
+from app.schemas.user import CurrentUser
+from app.utils.cache import TTLCache
 
 ph = PasswordHasher()
+user_cache = TTLCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
 
 
 def hash_password(password: str):
@@ -57,26 +62,91 @@ def verify_token(v34_auth: Annotated[str | None, Cookie()] = None):
         return None
 
 
-def get_user(
-    v34_auth: Annotated[str | None, Cookie()] = None,
-    db: Session = Depends(get_db),
-):
+def decode_user_id(v34_auth: str | None):
     if not v34_auth:
         return None
     try:
         payload = jwt.decode(
             v34_auth, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        user_id = payload.get("id")
-        if not user_id or user_id is None:
-            return None
-
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user or user is None:
-            return None
-        return user
     except jwt.InvalidTokenError:
         return None
+    return payload.get("id")
+
+
+def cache_user(v34_auth: str, user: User):
+    current_user = CurrentUser(id=user.id, username=user.username, role=user.role)
+    user_cache.set((user.id, v34_auth), current_user)
+    return current_user
+
+
+def invalidate_user(user_id: int):
+    user_cache.delete_where(lambda key: key[0] == user_id)
+
+
+@event.listens_for(User, "after_update")
+def collect_changed_user(mapper, connection, target: User):
+    # flushed but not committed yet, a concurrent request could still
+    # read and cache the old row, so invalidate once it is committed
+    for attr in ("username", "role"):
+        if inspect(target).attrs[attr].history.has_changes():
+            session = object_session(target)
+            session.info.setdefault("changed_users", set()).add(target.id)
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_changed_users(session: Session):
+    for user_id in session.info.pop("changed_users", ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def discard_changed_users(session: Session, previous_transaction):
+    # savepoint rollbacks leave the outer transaction's changes alone
+    if previous_transaction.parent is None:
+        session.info.pop("changed_users", None)
+
+
+def get_user_id(v34_auth: Annotated[str | None, Cookie()] = None):
+    """Resolve the user id from the token alone, without touching the db."""
+    return decode_user_id(v34_auth)
+
+
+def get_user(
+    v34_auth: Annotated[str | None, Cookie()] = None,
+    db: Session = Depends(get_db),
+):
+    user_id = decode_user_id(v34_auth)
+    if not user_id:
+        return None
+
+    current_user = user_cache.get((user_id, v34_auth))
+    if current_user:
+        return current_user
+
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        return None
+    return cache_user(v34_auth, user)
+
+
+async def get_user_async(
+    v34_auth: Annotated[str | None, Cookie()] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    user_id = decode_user_id(v34_auth)
+    if not user_id:
+        return None
+
+    current_user = user_cache.get((user_id, v34_auth))
+    if current_user:
+        return current_user
+
+    user = await db.get(User, user_id)
+    if not user:
+        return None
+    return cache_user(v34_auth, user)
 
 
 def get_search_id(search_id: Annotated[str | None, Cookie()] = None):
@@ -0,0 +1,136 @@
+"""In-process prefix index over the search table for typeahead.
+
+Each worker keeps the most popular queries in a sorted array with the
+top suggestions precomputed for short prefixes. Longer prefixes bisect the
+array and pick the best few from the matching range. The index refreshes
+from rows whose `last_updated` moved, rebuilds from scratch now and then
+to pick up score changes, and lookups fall back to the database when the
+index cannot answer on its own.
+"""
+
+from bisect import bisect_left
+from datetime import timedelta
+import heapq
+import threading
+import time
+
+from sqlalchemy import desc, func, Select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models import Search
+from app.utils import normalize_text
+
+LIMIT = 8
+
+
+class PrefixIndex:
+    """Immutable snapshot of query scores, safe to read without a lock."""
+
+    def __init__(self, scores: dict[str, int], floor: int, depth: int):
+        self.scores = scores
+        # every query scoring above `floor` is loaded, 0 for the whole table
+        self.floor = floor
+        self.depth = depth
+        self.queries = sorted(scores)
+        self.top = {}
+
+        for query in sorted(scores, key=scores.get, reverse=True):
+            for length in range(min(depth, len(query)) + 1):
+                suggestions = self.top.setdefault(query[:length], [])
+                if len(suggestions) < LIMIT:
+                    suggestions.append(query)
+
+    def lookup(self, prefix: str, limit: int = LIMIT):
+        """Top queries starting with `prefix`, None if the db must answer."""
+        if len(prefix) <= self.depth:
+            queries = self.top.get(prefix, [])[:limit]
+        else:
+            lo = bisect_left(self.queries, prefix)
+            hi = bisect_left(self.queries, prefix + "\uffff", lo)
+            queries = heapq.nlargest(
+                limit, self.queries[lo:hi], key=self.scores.__getitem__
+            )
+
+        # past the floor there may be queries the index never loaded
+        if self.floor and (
+            len(queries) < limit or self.scores[queries[-1]] < self.floor
+        ):
+            return None
+        return [{"query": query, "score": self.scores[query]} for query in queries]
+
+
+class SearchIndex:
+    def __init__(self, size: int, depth: int, rebuild_interval: float):
+        self.size = size
+        self.depth = depth
+        self.rebuild_interval = rebuild_interval
+        self.index: PrefixIndex | None = None
+        self.watermark = None
+        self.rebuilt = 0.0
+        self._lock = threading.Lock()
+
+    def lookup(self, query: str | None, limit: int = LIMIT):
+        index = self.index
+        if index is None:
+            return None
+        return index.lookup(normalize_text(query) if query else "", limit)
+
+    def refresh(self, db: Session):
+        """Load changed rows, or everything when a rebuild is due."""
+        with self._lock:
+            if (
+                self.index is None
+                or time.monotonic() - self.rebuilt > self.rebuild_interval
+            ):
+                self.rebuild(db)
+            else:
+                self.update(db)
+
+    def rebuild(self, db: Session):
+        watermark = db.execute(Select(func.max(Search.last_updated))).scalar()
+        stmt = (
+            Select(Search.query, Search.score)
+            .order_by(desc(Search.score))
+            .limit(self.size + 1)
+        )
+        rows = db.execute(stmt).all()
+        floor = rows[-1].score if len(rows) > self.size else 0
+        scores = {row.query: row.score for row in rows[: self.size]}
+
+        self.index = PrefixIndex(scores, floor, self.depth)
+        self.watermark = watermark
+        self.rebuilt = time.monotonic()
+
+    def update(self, db: Session):
+        stmt = Select(Search.query, Search.score, Search.last_updated)
+        if self.watermark:
+            # rows committed late with an older timestamp are caught by the
+            # overlap, or by the next rebuild
+            since = self.watermark - timedelta(seconds=5)
+            stmt = stmt.where(Search.last_updated >= since)
+        rows = db.execute(stmt).all()
+        changed = {
+            row.query: row.score
+            for row in rows
+            if self.index.scores.get(row.query) != row.score
+        }
+        if not changed:
+            return
+
+        scores = {**self.index.scores, **changed}
+        self.index = PrefixIndex(scores, self.index.floor, self.depth)
+        self.watermark = max(row.last_updated for row in rows)
+
+
+search_index = SearchIndex(
+    settings.AUTOCOMPLETE_SIZE,
+    settings.AUTOCOMPLETE_PREFIX_DEPTH,
+    settings.AUTOCOMPLETE_REBUILD_INTERVAL,
+)
+
+
+def refresh_search_index():
+    with SessionLocal() as db:
+        search_index.refresh(db)
@@ -1,7 +1,5 @@
 import re
 
-from app.types import ReactionType
-
 
 def normalize_text(query: str):
     q = query
@@ -32,28 +30,3 @@ def calculate_trend_score(score: float, avg_score: float):
     avg = avg_score or 0
     s = score or 0
     return s - avg
-
-
-def update_reaction_count(
-    model,
-    db_reaction: ReactionType,
-    reaction: ReactionType,
-):
-    if db_reaction:
-        if db_reaction == reaction:
-            return
-
-        if db_reaction == ReactionType.LIKE:
-            model.likes -= 1
-        elif db_reaction == ReactionType.DISLIKE:
-            model.dislikes -= 1
-
-        if reaction == ReactionType.LIKE:
-            model.likes += 1
-        elif reaction == ReactionType.DISLIKE:
-            model.dislikes += 1
-    else:
-        if reaction == ReactionType.LIKE:
-            model.likes += 1
-        elif reaction == ReactionType.DISLIKE:
-            model.dislikes += 1
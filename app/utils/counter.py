@@ -0,0 +1,277 @@
+"""Write-behind buffer for the likes/dislikes/saves/comment_count counters.
+
+Requests append a CounterDelta row in their own transaction instead of
+updating the hot post/vault/comment row. After commit the delta ids are
+queued in-process and periodically flushed with one statement that
+deletes the journal rows and adds their sums to the counters, so every
+delta is applied exactly once. Rows left behind by a crashed process are
+replayed after COUNTER_ORPHAN_AGE seconds.
+
+Until a delta is flushed, `apply_pending` adds it to objects loaded in
+the same process so the acting user reads their own writes. Only this
+process's buffer is consulted: a request served by another worker sees
+the committed counters until the delta is flushed, at most
+COUNTER_MAX_STALENESS seconds later.
+"""
+
+from datetime import datetime, timezone, timedelta
+import threading
+import time
+
+from sqlalchemy import any_, event, func, insert, Integer, literal, Select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql import text
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models import Comment, CounterDelta, Post, Vault
+from app.types import CounterType, TargetType
+
+REPLAY_LOCK_ID = 3403
+
+COUNTER_MODELS = {
+    TargetType.POST: Post,
+    TargetType.VAULT: Vault,
+    TargetType.COMMENT: Comment,
+}
+
+FLUSH_SQL = """
+    WITH flushed AS (
+        DELETE FROM counter_delta WHERE {where}
+        RETURNING target_type, target_id, counter, delta
+    ), sums AS (
+        SELECT target_type, target_id,
+               coalesce(sum(delta) FILTER (WHERE counter = 'LIKES'), 0) AS likes,
+               coalesce(sum(delta) FILTER (WHERE counter = 'DISLIKES'), 0) AS dislikes,
+               coalesce(sum(delta) FILTER (WHERE counter = 'SAVES'), 0) AS saves,
+               coalesce(sum(delta) FILTER (WHERE counter = 'COMMENT_COUNT'), 0) AS comment_count
+        FROM flushed
+        GROUP BY target_type, target_id
+    ), posts AS (
+        UPDATE post SET
+            likes = post.likes + s.likes,
+            dislikes = post.dislikes + s.dislikes,
+            saves = post.saves + s.saves,
+            comment_count = post.comment_count + s.comment_count
+        FROM sums s
+        WHERE s.target_type = 'POST' AND post.id = s.target_id
+    ), vaults AS (
+        UPDATE vault SET
+            likes = vault.likes + s.likes,
+            dislikes = vault.dislikes + s.dislikes
+        FROM sums s
+        WHERE s.target_type = 'VAULT' AND vault.id = s.target_id
+    ), comments AS (
+        UPDATE comment SET
+            likes = comment.likes + s.likes,
+            dislikes = comment.dislikes + s.dislikes
+        FROM sums s
+        WHERE s.target_type = 'COMMENT' AND comment.id = s.target_id
+    )
+    SELECT count(*) FROM flushed
+"""
+
+
+class CounterBuffer:
+    def __init__(self):
+        self._pending = {}
+        # ids being flushed, their deltas may already be committed
+        self._inflight = set()
+        self._lock = threading.Lock()
+
+    def push(self, deltas: list[tuple]):
+        """Queue committed (id, target_type, target_id, counter, delta) rows."""
+        now = time.monotonic()
+        with self._lock:
+            for id, *delta in deltas:
+                self._pending[id] = (now, *delta)
+
+    def pending(self, target_type: TargetType, target_id: int):
+        counts = {}
+        with self._lock:
+            for id, (_, type, key, counter, delta) in self._pending.items():
+                if id in self._inflight:
+                    continue
+                if type == target_type and key == target_id:
+                    counts[counter] = counts.get(counter, 0) + delta
+        return counts
+
+    def due(self):
+        with self._lock:
+            if not self._pending:
+                return False
+            if len(self._pending) >= settings.COUNTER_FLUSH_SIZE:
+                return True
+            oldest = min(item[0] for item in self._pending.values())
+        return time.monotonic() - oldest >= settings.COUNTER_MAX_STALENESS
+
+    def flush(self, force: bool = False):
+        if not force and not self.due():
+            return 0
+        with self._lock:
+            ids = list(self._pending)
+            # apply_pending stops adding these before the commit can make
+            # them part of the counters, so they are never counted twice
+            self._inflight.update(ids)
+        if not ids:
+            return 0
+
+        stmt = text(FLUSH_SQL.format(where="id = ANY(:ids)"))
+        try:
+            with SessionLocal() as db:
+                flushed = db.execute(stmt, {"ids": ids}).scalar()
+                db.commit()
+        except Exception:
+            # not applied, keep them pending for the next flush
+            with self._lock:
+                self._inflight.difference_update(ids)
+            raise
+
+        # rows already replayed by another process were applied there
+        with self._lock:
+            self._inflight.difference_update(ids)
+            for id in ids:
+                self._pending.pop(id, None)
+        return flushed
+
+    def __len__(self):
+        return len(self._pending)
+
+
+counter_buffer = CounterBuffer()
+
+
+def replay_orphans():
+    """Apply journal rows whose process never flushed them."""
+    cutoff = datetime.now(timezone.utc) - timedelta(
+        seconds=settings.COUNTER_ORPHAN_AGE
+    )
+    stmt = text(FLUSH_SQL.format(where="date_created < :cutoff"))
+    with SessionLocal() as db:
+        lock = Select(func.pg_try_advisory_xact_lock(REPLAY_LOCK_ID))
+        if not db.execute(lock).scalar():
+            return 0
+        replayed = db.execute(stmt, {"cutoff": cutoff}).scalar()
+        db.commit()
+    return replayed
+
+
+def flush_counters():
+    counter_buffer.flush()
+    replay_orphans()
+
+
+def drain_counters():
+    counter_buffer.flush(force=True)
+
+
+def record_counter(
+    db: Session,
+    model,
+    target_type: TargetType,
+    counter: CounterType,
+    delta: int,
+    user_id: int = None,
+):
+    """Add `delta` to model.<counter>, buffered unless COUNTER_BUFFER is off."""
+    if not delta:
+        return
+    if not settings.COUNTER_BUFFER:
+        setattr(model, counter.value, getattr(model, counter.value) + delta)
+        return
+
+    entry = CounterDelta(
+        user_id=user_id,
+        target_type=target_type,
+        target_id=model.id,
+        counter=counter,
+        delta=delta,
+    )
+    db.add(entry)
+    db.info.setdefault("counter_entries", []).append(entry)
+
+
+def record_counters(
+    db: Session,
+    target_type: TargetType,
+    target_ids: list[int],
+    counter: CounterType,
+    delta: int,
+    user_id: int = None,
+):
+    """record_counter for many distinct targets with one statement."""
+    if not delta or not target_ids:
+        return
+    if not settings.COUNTER_BUFFER:
+        model = COUNTER_MODELS[target_type]
+        column = getattr(model, counter.value)
+        stmt = (
+            update(model)
+            .where(model.id == any_(literal(target_ids, ARRAY(Integer))))
+            .values({column: column + delta})
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(stmt)
+        return
+
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "date_created": now,
+            "user_id": user_id,
+            "target_type": target_type,
+            "target_id": target_id,
+            "counter": counter,
+            "delta": delta,
+        }
+        for target_id in target_ids
+    ]
+    stmt = (
+        insert(CounterDelta)
+        .values(rows)
+        .returning(CounterDelta.id, CounterDelta.target_id)
+    )
+    # already flushed, so they are pushed to the buffer on commit
+    db.info.setdefault("counter_flushed", []).extend(
+        (id, target_type, target_id, counter, delta)
+        for id, target_id in db.execute(stmt)
+    )
+
+
+def apply_pending(model, target_type: TargetType):
+    """Add this process's unflushed deltas to a loaded object.
+
+    Deltas buffered by other workers are not visible here, so reads are
+    only guaranteed to include the caller's own writes when they land on
+    the process that recorded them.
+    """
+    for counter, delta in counter_buffer.pending(target_type, model.id).items():
+        value = getattr(model, counter.value) + delta
+        set_committed_value(model, counter.value, value)
+    return model
+
+
+@event.listens_for(Session, "after_flush")
+def collect_counter_entries(session: Session, flush_context):
+    entries = session.info.pop("counter_entries", None)
+    if entries:
+        session.info.setdefault("counter_flushed", []).extend(
+            (e.id, e.target_type, e.target_id, e.counter, e.delta) for e in entries
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def push_counter_entries(session: Session):
+    deltas = session.info.pop("counter_flushed", None)
+    if deltas:
+        counter_buffer.push(deltas)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def discard_counter_entries(session: Session, previous_transaction):
+    # savepoint rollbacks leave the outer transaction's entries alone
+    if previous_transaction.parent is None:
+        session.info.pop("counter_entries", None)
+        session.info.pop("counter_flushed", None)
@@ -0,0 +1,222 @@
+"""Bulk post ingestion for scraper feeds.
+
+Posts arrive as NDJSON and are loaded batch by batch: each batch is
+validated in a worker thread, off the event loop, streamed with binary
+COPY into a temp table and moved into `post` with one INSERT ... ON
+CONFLICT (source_id) DO NOTHING, so duplicates are skipped set-based
+against the unique index. A failing batch is rolled back and reported
+without stopping the upload.
+"""
+
+import random
+import struct
+import time
+from typing import AsyncIterator
+
+from fastapi.concurrency import run_in_threadpool
+import numpy
+
+from app.db import async_engine
+from app.schemas.post import PostCreate
+from app.types import FileType, RatingType
+
+EMBEDDING_DIM = 512
+MAX_ERRORS = 100
+
+STAGING_SQL = """
+    CREATE TEMP TABLE post_ingest (
+        source_id integer,
+        title text,
+        preview_url text,
+        sample_url text,
+        file_url text,
+        rating text,
+        type text,
+        source text,
+        score integer,
+        ai_generated boolean,
+        top_tags text[],
+        embedding vector(512)
+    ) ON COMMIT DROP
+"""
+
+COPY_SQL = """
+    COPY post_ingest (
+        source_id, title, preview_url, sample_url, file_url, rating, type,
+        source, score, ai_generated, top_tags, embedding
+    ) FROM STDIN (FORMAT BINARY)
+"""
+
+# the embedding is written as pre-encoded pgvector binary, copy passes
+# bytea values through untouched and the column's recv function reads them
+COPY_TYPES = [
+    "int4",
+    "text",
+    "text",
+    "text",
+    "text",
+    "text",
+    "text",
+    "text",
+    "int4",
+    "bool",
+    "text[]",
+    "bytea",
+]
+
+INSERT_SQL = """
+    INSERT INTO post (
+        date_created, last_updated, source_id, title, preview_url,
+        sample_url, file_url, rating, type, source, top_tags, top_vaults,
+        top_vaults_updated,
+        likes, dislikes, saves, comment_count, ai_generated, embedding,
+        score, week_score, month_score, year_score, trend_score
+    )
+    SELECT now(), now(), source_id, title, preview_url, sample_url,
+           file_url, CAST(rating AS ratingtype), CAST(type AS filetype),
+           source, to_jsonb(top_tags), '[]'::jsonb, now(), score, 0, 0, 0,
+           ai_generated, embedding, score, score, score, score, 0
+    FROM post_ingest
+    ON CONFLICT (source_id) DO NOTHING
+"""
+
+
+def to_pgvector_binary(array: numpy.ndarray):
+    """Encode a float32 vector in pgvector's binary wire format."""
+    header = struct.pack(">HH", array.shape[-1], 0)
+    return header + numpy.ascontiguousarray(array, dtype=">f4").tobytes()
+
+
+def post_row(post: PostCreate):
+    embedding = numpy.asarray(post.embedding, dtype=numpy.float32)
+    if embedding.shape != (EMBEDDING_DIM,):
+        raise ValueError(f"embedding must have {EMBEDDING_DIM} dimensions")
+
+    rating = RatingType.EXPLICIT
+    if post.rating == RatingType.QUESTIONABLE.value:
+        rating = RatingType.QUESTIONABLE
+
+    type = FileType.IMAGE
+    if post.type == FileType.VIDEO.value:
+        type = FileType.VIDEO
+
+    split_tags = post.tags.split()
+    random_tags = split_tags
+    if len(split_tags) >= 5:
+        random_tags = random.sample(split_tags, 5)
+
+    return (
+        post.post_id,
+        post.tags,
+        post.preview_url,
+        post.sample_url,
+        post.file_url,
+        rating.name,
+        type.name,
+        post.source,
+        post.score or 0,
+        "ai_generated" in post.tags,
+        random_tags,
+        to_pgvector_binary(embedding),
+    )
+
+
+def parse_lines(lines: list[tuple[int, bytes]]):
+    """Validate and encode a batch of lines, return (rows, errors).
+
+    Rows are (line number, row) and errors (line number, detail).
+    """
+    rows = []
+    errors = []
+    for number, line in lines:
+        try:
+            rows.append((number, post_row(PostCreate.model_validate_json(line))))
+        except ValueError as e:
+            errors.append((number, str(e)))
+    return rows, errors
+
+
+async def ndjson_lines(chunks: AsyncIterator[bytes]):
+    """Yield (line number, line) from a byte stream, skipping blanks."""
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+    if buffer.strip():
+        yield number + 1, buffer
+
+
+async def load_batch(conn, rows: list[tuple]):
+    """Copy one batch in its own transaction, return the inserted count."""
+    async with conn.transaction():
+        async with conn.cursor() as cur:
+            await cur.execute(STAGING_SQL)
+            async with cur.copy(COPY_SQL) as copy:
+                copy.set_types(COPY_TYPES)
+                for row in rows:
+                    await copy.write_row(row)
+            await cur.execute(INSERT_SQL)
+            return cur.rowcount
+
+
+async def ingest_posts(chunks: AsyncIterator[bytes], batch_size: int):
+    report = {
+        "received": 0,
+        "inserted": 0,
+        "duplicates": 0,
+        "invalid": 0,
+        "failed": 0,
+        "batches": 0,
+        "errors": [],
+    }
+
+    def error(**detail):
+        if len(report["errors"]) < MAX_ERRORS:
+            report["errors"].append(detail)
+
+    start = time.monotonic()
+    async with async_engine.connect() as sa_conn:
+        raw = await sa_conn.get_raw_connection()
+        conn = raw.driver_connection
+        # sqlalchemy may have opened a transaction, batches manage their own
+        await conn.rollback()
+
+        async def flush(lines):
+            # validation and numpy packing are CPU bound, a large upload
+            # would otherwise stall every other request on this worker
+            rows, errors = await run_in_threadpool(parse_lines, lines)
+            for number, detail in errors:
+                report["invalid"] += 1
+                error(line=number, detail=detail)
+            if not rows:
+                return
+
+            report["batches"] += 1
+            try:
+                inserted = await load_batch(conn, [row for _, row in rows])
+            except Exception as e:
+                report["failed"] += len(rows)
+                error(batch=report["batches"], line=rows[0][0], detail=str(e))
+                return
+            report["inserted"] += inserted
+            report["duplicates"] += len(rows) - inserted
+
+        lines = []
+        async for number, line in ndjson_lines(chunks):
+            report["received"] += 1
+            lines.append((number, line))
+            if len(lines) >= batch_size:
+                await flush(lines)
+                lines = []
+        if lines:
+            await flush(lines)
+
+    elapsed = time.monotonic() - start
+    report["seconds"] = round(elapsed, 3)
+    report["rows_per_second"] = round(report["inserted"] / elapsed) if elapsed else 0
+    return report
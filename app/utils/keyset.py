@@ -0,0 +1,120 @@
+"""Keyset pagination ordered by (ranking columns..., id).
+
+Feeds are ordered descending by their ranking columns with the primary
+key as the last column, which makes the order total: rows with equal
+scores can no longer be skipped or repeated between pages. A page
+continues from the key of the previous page's last row with a row
+comparison, `(score, id) < (:score, :id)`, which a composite
+(score DESC, id DESC) index answers with one short range scan, so deep
+pages cost the same as the first one. Listings with a user defined
+order, like vault entries, page ascending with `>` instead.
+"""
+
+from datetime import datetime
+import json
+
+from fastapi import HTTPException
+from fastapi_pagination.api import create_page
+from sqlalchemy import asc, desc, Select, tuple_
+from sqlalchemy.orm import Session
+
+CURSOR_PREFIX = "key"
+
+
+def keyset_order(*keys, ascending: bool = False):
+    direction = asc if ascending else desc
+    return [direction(key) for key in keys]
+
+
+def keyset_stmt(
+    stmt: Select, keys, after: list | None = None, ascending: bool = False
+):
+    stmt = stmt.order_by(None).order_by(*keyset_order(*keys, ascending=ascending))
+    if after is not None:
+        types = [key.type for key in keys]
+        row, key = tuple_(*keys), tuple_(*after, types=types)
+        stmt = stmt.where(row > key if ascending else row < key)
+    return stmt
+
+
+def parse_value(key, value):
+    python_type = key.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values: list):
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return f"{CURSOR_PREFIX}:{json.dumps(values, separators=(',', ':'))}"
+
+
+def decode_cursor(cursor: str, keys):
+    prefix, _, payload = cursor.partition(":")
+    if prefix != CURSOR_PREFIX:
+        return None
+    try:
+        values = json.loads(payload)
+        if not isinstance(values, list) or len(values) != len(keys):
+            return None
+        return [parse_value(key, value) for key, value in zip(keys, values)]
+    except (TypeError, ValueError):
+        return None
+
+
+def selects_entity(stmt: Select):
+    """True for Select(Model), whose rows are returned as model instances."""
+    descriptions = stmt.column_descriptions
+    if len(descriptions) != 1:
+        return False
+    return descriptions[0]["expr"] is descriptions[0]["entity"]
+
+
+def paginate_keyset(
+    db: Session,
+    params,
+    stmt: Select,
+    *keys,
+    ascending: bool = False,
+    transformer=None,
+):
+    """Page `stmt` by `keys`, descending unless `ascending`; the last key
+    must be unique.
+
+    `transformer` maps the list of page items before they are validated,
+    like the argument of fastapi_pagination's own `paginate`.
+    """
+    raw_params = params.to_raw_params()
+    size = raw_params.size
+
+    after = None
+    if raw_params.cursor is not None:
+        after = decode_cursor(raw_params.cursor, keys)
+        if after is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    entity = selects_entity(stmt)
+    labels = [f"key_{i}" for i in range(len(keys))]
+    columns = [key.label(label) for key, label in zip(keys, labels)]
+    stmt = keyset_stmt(stmt, keys, after, ascending)
+    stmt = stmt.add_columns(*columns).limit(size + 1)
+    rows = db.execute(stmt).all()
+    has_next = len(rows) > size
+    rows = rows[:size]
+
+    next_ = None
+    if has_next:
+        last = rows[-1]._mapping
+        next_ = encode_cursor([last[label] for label in labels])
+
+    items = [row[0] if entity else row._mapping for row in rows]
+    if transformer:
+        items = transformer(items)
+
+    return create_page(
+        items,
+        params=params,
+        current=raw_params.cursor,
+        next_=next_,
+        previous=None,
+    )
@@ -0,0 +1,130 @@
+"""Set based recomputation of the trend/week/month/year scores.
+
+Each table is refreshed with one statement: entities whose latest metric
+row is more than a day old get a new metric row and have their scores
+recomputed from the metric rows that existed before it. This is the only
+place scores change, requests never log metrics themselves.
+"""
+
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from sqlalchemy import func, Select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import text
+
+from app.db import SessionLocal
+
+
+class MetricTable(NamedTuple):
+    entity: str
+    entity_key: str
+    metric: str
+    metric_key: str
+    log_columns: tuple[str, ...]
+    score: str | None = None
+
+
+POST_METRICS = MetricTable(
+    entity="post",
+    entity_key="id",
+    metric="post_metric",
+    metric_key="post_id",
+    log_columns=("score", "trend_score"),
+    score="likes + dislikes + comment_count * 2 + saves * 3",
+)
+VAULT_METRICS = MetricTable(
+    entity="vault",
+    entity_key="id",
+    metric="vault_metric",
+    metric_key="vault_id",
+    log_columns=("score",),
+    score="likes + dislikes",
+)
+SEARCH_METRICS = MetricTable(
+    entity="search",
+    entity_key="query",
+    metric="search_metric",
+    metric_key="query",
+    log_columns=("score",),
+)
+METRIC_TABLES = {
+    "post": POST_METRICS,
+    "vault": VAULT_METRICS,
+    "search": SEARCH_METRICS,
+}
+RECOMPUTE_LOCK_ID = 3402
+WINDOWS = (3, 7, 14, 30, 365)
+
+
+def window_columns(days: tuple[int, ...] = WINDOWS):
+    """sum_<n> and avg_<n> of m.score over the last n days, for each n."""
+    columns = []
+    for n in days:
+        recent = f"m.date_created >= :now - interval '{n} days'"
+        columns.append(f"sum(m.score) FILTER (WHERE {recent}) AS sum_{n}")
+        columns.append(f"avg(m.score) FILTER (WHERE {recent}) AS avg_{n}")
+    return ",\n                   ".join(columns)
+
+
+def recompute_stmt(table: MetricTable):
+    log_columns = ", ".join(table.log_columns)
+    entity_columns = ", ".join(f"e.{column}" for column in table.log_columns)
+    score = f", score = {table.score}" if table.score else ""
+    return text(
+        f"""
+        WITH due AS (
+            SELECT e.{table.entity_key} AS key,
+                   (SELECT max(m.date_created) FROM {table.metric} m
+                    WHERE m.{table.metric_key} = e.{table.entity_key}) AS last_log
+            FROM "{table.entity}" e
+        ), stale AS (
+            SELECT key, last_log FROM due
+            WHERE last_log IS NULL OR last_log < :now - interval '1 day'
+        ), logged AS (
+            INSERT INTO {table.metric} ({table.metric_key}, date_created, {log_columns})
+            SELECT e.{table.entity_key}, :now, {entity_columns}
+            FROM "{table.entity}" e
+            JOIN stale ON stale.key = e.{table.entity_key}
+            RETURNING 1
+        ), windows AS (
+            SELECT stale.key,
+                   {window_columns()}
+            FROM stale
+            LEFT JOIN {table.metric} m
+                ON m.{table.metric_key} = stale.key
+                AND m.date_created >= :now - interval '{max(WINDOWS)} days'
+            WHERE stale.last_log IS NOT NULL
+            GROUP BY stale.key
+        ), updated AS (
+            UPDATE "{table.entity}" e SET
+                trend_score = coalesce(w.avg_3, 0) - coalesce(w.avg_14, 0),
+                week_score = coalesce(w.sum_7, 0),
+                month_score = coalesce(w.sum_30, 0),
+                year_score = coalesce(w.sum_365, 0){score}
+            FROM windows w
+            WHERE e.{table.entity_key} = w.key
+            RETURNING 1
+        )
+        SELECT (SELECT count(*) FROM logged) AS logged,
+               (SELECT count(*) FROM updated) AS updated
+        """
+    )
+
+
+def recompute_metrics(db: Session, table: MetricTable, now: datetime = None):
+    """Log and rescore every stale row of `table`, return (logged, updated)."""
+    now = now or datetime.now(timezone.utc)
+    result = db.execute(recompute_stmt(table), {"now": now}).one()
+    return result.logged, result.updated
+
+
+def recompute_all_metrics():
+    """Run the recompute for every table, once across all processes."""
+    with SessionLocal() as db:
+        stmt = Select(func.pg_try_advisory_xact_lock(RECOMPUTE_LOCK_ID))
+        if not db.execute(stmt).scalar():
+            return
+        for table in METRIC_TABLES.values():
+            recompute_metrics(db, table)
+        db.commit()
@@ -0,0 +1,210 @@
+"""Cached neighbour lists for /posts/{post_id}/recommend.
+
+The first request for a post and filter combination asks the similarity
+engine for its NEIGHBOUR_CACHE_DEPTH nearest posts and stores ids and
+distances in `post_neighbours`; every later page of every visitor slices
+that list. Hot lists are also kept in a small in-process LRU. A trigger
+drops a post's rows when its embedding changes, lists older than
+NEIGHBOUR_CACHE_MAX_AGE are recomputed so they pick up newer posts, and
+the least recently used rows are evicted once the table grows past
+NEIGHBOUR_CACHE_MAX_ROWS.
+
+Past the end of a truncated list, the next cursor hands over to the
+distance cursor of the live pgvector query. The numpy engine's float32
+distances and tie order do not match pgvector's (distance, id) order, so
+the handoff distance is always recomputed in SQL.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from fastapi_pagination.api import create_page
+import numpy
+from sqlalchemy import event, inspect, Select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import text
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models import Post, PostNeighbours
+from app.types import FileType, RatingType
+from app.utils import ann
+from app.utils.cache import TTLCache
+from app.utils.similarity import Neighbours, get_engine, page_items
+
+CURSOR_PREFIX = "cached"
+# last_used is only rewritten this often so cache hits stay read-only
+TOUCH_INTERVAL = timedelta(hours=1)
+
+neighbour_cache = TTLCache(
+    settings.NEIGHBOUR_CACHE_SIZE, settings.NEIGHBOUR_CACHE_TTL
+)
+
+EXPIRE_SQL = text("DELETE FROM post_neighbours WHERE date_created < :expired")
+
+EVICT_SQL = text(
+    """
+    DELETE FROM post_neighbours
+    WHERE (post_id, key) IN (
+        SELECT post_id, key FROM post_neighbours
+        ORDER BY last_used
+        LIMIT greatest((SELECT count(*) FROM post_neighbours) - :max_rows, 0)
+    )
+    """
+)
+
+
+def filter_key(rating: RatingType, type: FileType | None, filter_ai: bool):
+    file_type = type.value if type else "any"
+    return f"{rating.value}:{file_type}:{int(filter_ai)}"
+
+
+def store_neighbours(
+    db: Session, post_id: int, key: str, neighbours: Neighbours, now: datetime
+):
+    values = {
+        "ids": neighbours.ids.tolist(),
+        "distances": neighbours.distances.tolist(),
+        "date_created": now,
+        "last_used": now,
+    }
+    stmt = (
+        insert(PostNeighbours)
+        .values(post_id=post_id, key=key, **values)
+        .on_conflict_do_update(
+            index_elements=[PostNeighbours.post_id, PostNeighbours.key],
+            set_=values,
+        )
+    )
+    db.execute(stmt)
+
+
+def get_neighbours(
+    db: Session,
+    post_id: int,
+    embedding,
+    rating: RatingType,
+    type: FileType | None,
+    filter_ai: bool,
+):
+    key = filter_key(rating, type, filter_ai)
+    neighbours = neighbour_cache.get((post_id, key))
+    if neighbours is not None:
+        return neighbours
+
+    now = datetime.now(timezone.utc)
+    expired = now - timedelta(seconds=settings.NEIGHBOUR_CACHE_MAX_AGE)
+    stmt = Select(
+        PostNeighbours.ids,
+        PostNeighbours.distances,
+        PostNeighbours.date_created,
+        PostNeighbours.last_used,
+    ).where(PostNeighbours.post_id == post_id, PostNeighbours.key == key)
+    row = db.execute(stmt).first()
+
+    # expired lists are recomputed and overwritten below
+    if row and row.date_created >= expired:
+        neighbours = Neighbours(
+            numpy.array(row.ids, dtype=numpy.int64),
+            numpy.array(row.distances, dtype=numpy.float64),
+        )
+        if row.last_used + TOUCH_INTERVAL < now:
+            stmt = (
+                update(PostNeighbours)
+                .where(PostNeighbours.post_id == post_id)
+                .where(PostNeighbours.key == key)
+                .values(last_used=now)
+            )
+            db.execute(stmt)
+            db.commit()
+    else:
+        engine = get_engine()
+        if not engine.ready():
+            engine = get_engine("pgvector")
+        depth = settings.NEIGHBOUR_CACHE_DEPTH
+        neighbours = engine.search(db, embedding, depth, rating, type, filter_ai)
+        store_neighbours(db, post_id, key, neighbours, now)
+        db.commit()
+
+    neighbour_cache.set((post_id, key), neighbours)
+    return neighbours
+
+
+@event.listens_for(Post, "after_update")
+def invalidate_changed_neighbours(mapper, connection, target: Post):
+    if inspect(target).attrs.embedding.history.has_changes():
+        neighbour_cache.delete_where(lambda key: key[0] == target.id)
+
+
+def evict_neighbours():
+    """Drop expired lists, then the least recently used past the size cap."""
+    now = datetime.now(timezone.utc)
+    expired = now - timedelta(seconds=settings.NEIGHBOUR_CACHE_MAX_AGE)
+    with SessionLocal() as db:
+        evicted = db.execute(EXPIRE_SQL, {"expired": expired}).rowcount
+        params = {"max_rows": settings.NEIGHBOUR_CACHE_MAX_ROWS}
+        evicted += db.execute(EVICT_SQL, params).rowcount
+        db.commit()
+    return evicted
+
+
+def handoff_cursor(db: Session, embedding, last_id: int):
+    """Live query cursor after `last_id`, None if the post is gone."""
+    vector = numpy.asarray(embedding).tolist()
+    stmt = Select(Post.embedding.cosine_distance(vector)).where(Post.id == last_id)
+    distance = db.execute(stmt).scalar()
+    if distance is None:
+        return None
+    return ann.encode_cursor(float(distance), last_id)
+
+
+def encode_cursor(offset: int):
+    return f"{CURSOR_PREFIX}:{offset}"
+
+
+def decode_cursor(cursor: str):
+    try:
+        prefix, offset = cursor.split(":")
+        if prefix == CURSOR_PREFIX:
+            return int(offset)
+    except ValueError:
+        pass
+    return None
+
+
+def paginate_neighbours(
+    db: Session,
+    params,
+    post_id: int,
+    embedding,
+    rating: RatingType,
+    type: FileType | None,
+    filter_ai: bool,
+):
+    """Serve a page from the cached list, None for cursors of other paths."""
+    raw_params = params.to_raw_params()
+    size = raw_params.size
+    offset = 0
+    if raw_params.cursor is not None:
+        offset = decode_cursor(raw_params.cursor)
+        if offset is None:
+            return None
+
+    neighbours = get_neighbours(db, post_id, embedding, rating, type, filter_ai)
+    ids = neighbours.ids
+    page_ids = ids[offset : offset + size].tolist()
+    end = offset + len(page_ids)
+
+    next_ = None
+    if end < len(ids):
+        next_ = encode_cursor(end)
+    elif len(ids) >= settings.NEIGHBOUR_CACHE_DEPTH:
+        next_ = handoff_cursor(db, embedding, int(ids[-1]))
+
+    return create_page(
+        page_items(db, page_ids),
+        params=params,
+        current=encode_cursor(offset),
+        next_=next_,
+        previous=encode_cursor(max(offset - size, 0)) if offset else None,
+    )
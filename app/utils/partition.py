@@ -0,0 +1,143 @@
+"""Monthly range partitions of the post, vault and search metric tables.
+
+Scores only ever aggregate the last 365 days of metric rows, so the
+metric tables are partitioned by month on date_created: window queries
+prune to the partitions they read, and expired months are removed with
+a DROP TABLE instead of a bulk DELETE. Partitions are created
+METRIC_PARTITIONS_AHEAD months in advance. A partition that ended more
+than METRIC_RETENTION_DAYS ago is first added to the per-year totals in
+metric_summary, unless METRIC_ROLLUP is off, and then dropped.
+"""
+
+from datetime import datetime, timezone, timedelta
+import re
+from typing import NamedTuple
+
+from sqlalchemy import func, Select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import text
+
+from app.config import settings
+from app.db import SessionLocal
+from app.utils.metric import METRIC_TABLES, MetricTable, WINDOWS
+
+MAINTAIN_LOCK_ID = 3404
+PARTITION_NAME = re.compile(r"_p(\d{4})_(\d{2})$")
+
+PARTITIONS_SQL = text(
+    """
+    SELECT c.relname FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = CAST(:table AS regclass)
+    """
+)
+
+ROLLUP_SQL = """
+    INSERT INTO metric_summary (metric, key, year, count, score)
+    SELECT :metric, CAST({key} AS text),
+           CAST(extract(year FROM date_created AT TIME ZONE 'UTC') AS integer),
+           count(*), coalesce(sum(score), 0)
+    FROM {partition}
+    GROUP BY 2, 3
+    ON CONFLICT (metric, key, year) DO UPDATE SET
+        count = metric_summary.count + EXCLUDED.count,
+        score = metric_summary.score + EXCLUDED.score
+"""
+
+
+class Partition(NamedTuple):
+    name: str
+    start: datetime
+    end: datetime
+
+
+def month_start(now: datetime):
+    now = now.astimezone(timezone.utc)
+    return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int):
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime):
+    return f"{table}_p{month:%Y_%m}"
+
+
+def list_partitions(db: Session, table: str):
+    """Monthly partitions of `table`, oldest first."""
+    partitions = []
+    for name in db.execute(PARTITIONS_SQL, {"table": table}).scalars():
+        match = PARTITION_NAME.search(name)
+        # partitions attached by hand are left alone
+        if match:
+            start = datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc)
+            partitions.append(Partition(name, start, add_months(start, 1)))
+    return sorted(partitions, key=lambda partition: partition.start)
+
+
+def create_partitions(
+    db: Session, table: str, now: datetime = None, ahead: int = None
+):
+    """Create the partitions from this month to `ahead` months on."""
+    now = now or datetime.now(timezone.utc)
+    ahead = settings.METRIC_PARTITIONS_AHEAD if ahead is None else ahead
+    existing = {partition.name for partition in list_partitions(db, table)}
+
+    created = []
+    month = month_start(now)
+    for n in range(ahead + 1):
+        start, end = add_months(month, n), add_months(month, n + 1)
+        name = partition_name(table, start)
+        if name in existing:
+            continue
+        db.execute(
+            text(
+                f"CREATE TABLE {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        )
+        created.append(name)
+    return created
+
+
+def drop_partitions(
+    db: Session,
+    table: MetricTable,
+    now: datetime = None,
+    retention_days: int = None,
+    rollup: bool = None,
+):
+    """Drop the partitions that ended more than `retention_days` ago."""
+    now = now or datetime.now(timezone.utc)
+    retention_days = retention_days or settings.METRIC_RETENTION_DAYS
+    rollup = settings.METRIC_ROLLUP if rollup is None else rollup
+    # the score windows must never lose rows
+    cutoff = now - timedelta(days=max(retention_days, max(WINDOWS)))
+
+    dropped = []
+    for partition in list_partitions(db, table.metric):
+        if partition.end > cutoff:
+            break
+        if rollup:
+            stmt = ROLLUP_SQL.format(key=table.metric_key, partition=partition.name)
+            db.execute(text(stmt), {"metric": table.metric})
+        db.execute(text(f"DROP TABLE {partition.name}"))
+        dropped.append(partition.name)
+    return dropped
+
+
+def maintain_partitions():
+    """Create upcoming and drop expired partitions, once across all processes."""
+    with SessionLocal() as db:
+        stmt = Select(func.pg_try_advisory_xact_lock(MAINTAIN_LOCK_ID))
+        if not db.execute(stmt).scalar():
+            return
+        # both need a short exclusive lock on the parent table, give up
+        # instead of queueing every metric write behind a long aggregate
+        db.execute(text("SET LOCAL lock_timeout = '5s'"))
+        for table in METRIC_TABLES.values():
+            create_partitions(db, table.metric)
+            drop_partitions(db, table)
+        db.commit()
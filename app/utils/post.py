@@ -1,34 +1,86 @@
-from datetime import datetime, timezone, timedelta
-import numpy
-import random
+from datetime import datetime, timezone
 
-from sqlalchemy import desc, func
+from sqlalchemy import exists, Select
 from sqlalchemy.orm import Session
-from sqlalchemy.orm.attributes import flag_modified
+from sqlalchemy.sql import text
 
-from app.models import Post, PostMetric
-from app.utils import calculate_trend_score, calculate_score
-from app.utils.vault import get_post_vaults
+from app.config import settings
+from app.db import SessionLocal, set_ef_search
+from app.models import Post
 
-
-def get_similar_post(db: Session, embed: list[float], size: int = 32):
-    """Return post ids of post most similar to input vector."""
-    vector = numpy.array(embed).tolist()
-    posts = (
-        db.query(Post.id)
-        .order_by(Post.embedding.cosine_distance(vector), desc(Post.score))
-        .limit(100)
+# Posts become due when a view bumps last_updated, or a new embedding moves
+# embedding_updated, past their last refresh.
+# For each due post take :neighbours nearest posts, sample :sample of them
+# and keep the :size most liked public vaults holding any of those.
+TOP_VAULTS_SQL = text(
+    """
+    WITH due AS (
+        SELECT id, embedding FROM post
+        WHERE top_vaults_updated IS NULL OR top_vaults_updated < last_updated
+            OR top_vaults_updated < embedding_updated
+        ORDER BY last_updated DESC
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    ), similar AS (
+        SELECT due.id AS post_id, s.id AS similar_id,
+               row_number() OVER (PARTITION BY due.id ORDER BY random()) AS n
+        FROM due
+        CROSS JOIN LATERAL (
+            SELECT p.id FROM post p
+            ORDER BY p.embedding <=> due.embedding
+            LIMIT :neighbours
+        ) AS s
+        WHERE due.embedding IS NOT NULL
+    ), ranked AS (
+        SELECT s.post_id, v.id AS vault_id,
+               row_number() OVER (
+                   PARTITION BY s.post_id ORDER BY v.likes DESC, v.id
+               ) AS n
+        FROM similar s
+        JOIN vault_post vp ON vp.post_id = s.similar_id
+        JOIN vault v ON v.id = vp.vault_id
+        WHERE s.n <= :sample AND v.privacy = 'PUBLIC'
+        GROUP BY s.post_id, v.id
+    ), picked AS (
+        SELECT post_id, jsonb_agg(vault_id ORDER BY n) AS vault_ids
+        FROM ranked
+        WHERE n <= :size
+        GROUP BY post_id
     )
-    postIds = [post.id for post in posts]
-    results = random.sample(postIds, size)
-    return results
+    UPDATE post SET
+        top_vaults = coalesce(picked.vault_ids, '[]'::jsonb),
+        top_vaults_updated = :now
+    FROM due
+    LEFT JOIN picked ON picked.post_id = due.id
+    WHERE post.id = due.id
+    """
+)
+
+
+def post_exists_stmt(post_id: int):
+    return Select(exists().where(Post.id == post_id))
+
 
+def refresh_top_vaults(
+    db: Session, batch_size: int = None, now: datetime = None, size: int = 4
+):
+    """Recompute top_vaults for the most recently viewed due posts."""
+    set_ef_search(db)
+    params = {
+        "batch_size": batch_size or settings.TOP_VAULTS_BATCH_SIZE,
+        "now": now or datetime.now(timezone.utc),
+        "neighbours": 100,
+        "sample": 32,
+        "size": size,
+    }
+    return db.execute(TOP_VAULTS_SQL, params).rowcount
 
-def update_top_vaults(db: Session, post: Post):
-    similarIds = get_similar_post(db, post.embedding)
-    vaultIds = get_post_vaults(db, similarIds, 4)
-    post.top_vaults = vaultIds
-    flag_modified(post, "top_vaults")
+
+def refresh_due_top_vaults():
+    with SessionLocal() as db:
+        refreshed = refresh_top_vaults(db)
+        db.commit()
+    return refreshed
 
 
 def update_top_tags(post):
@@ -40,75 +92,3 @@ def update_top_tags(post):
     combined = list(set(new_tags + current_tags))
     post.top_tags = combined[:5]
     """
-
-
-""" metric functions """
-
-
-def create_post_log(post: Post):
-    post_metric = PostMetric(
-        post_id=post.id,
-        score=post.score,
-        trend_score=post.trend_score,
-    )
-    return post_metric
-
-
-def popularity_score(db: Session, post_id: int, days: int = 7):
-    now = datetime.now(timezone.utc)
-    start_time = now - timedelta(days=days)
-
-    result = (
-        db.query(func.sum(PostMetric.score).label("total_score"))
-        .filter(
-            PostMetric.post_id == post_id,
-            PostMetric.date_created >= start_time,
-        )
-        .first()
-    )
-    return result.total_score or 0
-
-
-def average_post_score(db: Session, post_id: int, days: int = 7):
-    now = datetime.now(timezone.utc)
-    start_time = now - timedelta(days=days)
-
-    result = (
-        db.query(func.avg(PostMetric.score).label("avg_score"))
-        .filter(
-            PostMetric.post_id == post_id,
-            PostMetric.date_created >= start_time,
-        )
-        .first()
-    )
-    return result.avg_score or 0
-
-
-def log_post_metric(db: Session, post: Post, now: datetime):
-    prev_log = (
-        db.query(PostMetric)
-        .filter(PostMetric.post_id == post.id)
-        .order_by(desc(PostMetric.date_created))
-        .first()
-    )
-    if prev_log:
-        if prev_log.date_created + timedelta(days=1) < now:
-            log = create_post_log(post)
-            avg_score = average_post_score(db, post.id, 14)
-            avg_score_3 = average_post_score(db, post.id, 3)
-            trend_score = calculate_trend_score(avg_score_3, avg_score)
-            week_score = popularity_score(db, post.id, 7)
-            month_score = popularity_score(db, post.id, 30)
-            year_score = popularity_score(db, post.id, 365)
-
-            post.trend_score = trend_score
-            post.week_score = week_score
-            post.month_score = month_score
-            post.year_score = year_score
-            post.score = calculate_score(
-                post.likes, post.dislikes, post.saves, post.comment_count
-            )
-            db.add(log)
-    else:
-        log = create_post_log(post)
-        db.add(log)
@@ -0,0 +1,52 @@
+"""Count the SQL statements sent while a block of code runs.
+
+Meant for tests and benchmark scripts: listeners are attached to the
+whole engine, so statements from other threads using the same engine in
+the meantime are counted too.
+
+    with assert_max_queries(2):
+        client.get(f"/posts/{post_id}/comments")
+"""
+
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.db import async_engine, engine
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(*engines):
+    """Record statements on `engines`, by default the sync and async engine."""
+    targets = engines or (engine, async_engine.sync_engine)
+    counter = QueryCounter()
+    for target in targets:
+        event.listen(target, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        for target in targets:
+            event.remove(target, "before_cursor_execute", counter)
+
+
+@contextmanager
+def assert_max_queries(limit: int, *engines):
+    with count_queries(*engines) as counter:
+        yield counter
+    if counter.count > limit:
+        statements = "\n\n".join(counter.statements)
+        raise AssertionError(
+            f"{counter.count} queries, expected at most {limit}:\n\n{statements}"
+        )
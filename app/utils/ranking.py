@@ -0,0 +1,194 @@
+"""Precomputed ranking snapshots for the unfiltered /posts feeds.
+
+Every (order, rating, type, filter_ai) combination gets an ordered list of
+post ids stored in `ranking_snapshot`. Feed pages slice that list instead
+of sorting the live post table, and cursors point at a fixed snapshot so
+paging stays stable while newer snapshots are written.
+"""
+
+from datetime import datetime, timezone, timedelta
+import itertools
+
+from fastapi_pagination.api import create_page
+import numpy
+from sqlalchemy import delete, desc, func, Select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models import Post, RankingSnapshot
+from app.types import OrderType, RatingType, FileType
+from app.utils.cache import TTLCache
+from app.utils.search import post_feed_stmt
+
+CURSOR_PREFIX = "snapshot"
+REFRESH_LOCK_ID = 3401
+
+snapshot_cache = TTLCache(maxsize=512, ttl=settings.RANKING_SNAPSHOT_RETENTION)
+latest_cache = TTLCache(maxsize=512, ttl=30)
+
+
+def snapshot_key(
+    order: OrderType, rating: RatingType, type: FileType | None, filter_ai: bool
+):
+    if order == OrderType.RELEVANCE:
+        order = OrderType.TRENDING
+    file_type = type.value if type else "any"
+    return f"{order.value}:{rating.value}:{file_type}:{int(filter_ai)}"
+
+
+def snapshot_combinations():
+    orders = [order for order in OrderType if order != OrderType.RELEVANCE]
+    return itertools.product(orders, RatingType, [None, *FileType], [False, True])
+
+
+def ranked_ids_stmt(
+    order: OrderType, rating: RatingType, type: FileType | None, filter_ai: bool
+):
+    stmt = post_feed_stmt(None, rating, order, type, filter_ai)
+    return stmt.with_only_columns(Post.id)
+
+
+def refresh_snapshots(db: Session, depth: int = settings.RANKING_SNAPSHOT_DEPTH):
+    """Write a new snapshot for every combination and drop expired ones."""
+    now = datetime.now(timezone.utc)
+    for combination in snapshot_combinations():
+        stmt = ranked_ids_stmt(*combination).limit(depth)
+        ids = db.execute(stmt).scalars().all()
+        db.add(
+            RankingSnapshot(
+                key=snapshot_key(*combination), post_ids=ids, date_created=now
+            )
+        )
+
+    expired = now - timedelta(seconds=settings.RANKING_SNAPSHOT_RETENTION)
+    db.execute(
+        delete(RankingSnapshot).where(RankingSnapshot.date_created < expired)
+    )
+    db.commit()
+
+
+def refresh_stale_snapshots():
+    """Refresh snapshots if they are older than the refresh interval.
+
+    Only one worker across all processes refreshes at a time.
+    """
+    now = datetime.now(timezone.utc)
+    with SessionLocal() as db:
+        stmt = Select(func.pg_try_advisory_xact_lock(REFRESH_LOCK_ID))
+        if not db.execute(stmt).scalar():
+            return
+
+        stmt = Select(func.max(RankingSnapshot.date_created))
+        latest = db.execute(stmt).scalar()
+        interval = timedelta(seconds=settings.RANKING_SNAPSHOT_INTERVAL)
+        if latest and latest + interval > now:
+            db.rollback()
+            return
+        refresh_snapshots(db)
+
+
+def get_latest_snapshot_id(db: Session, key: str):
+    snapshot_id = latest_cache.get(key)
+    if snapshot_id is None:
+        stmt = (
+            Select(RankingSnapshot.id)
+            .where(RankingSnapshot.key == key)
+            .order_by(desc(RankingSnapshot.date_created))
+            .limit(1)
+        )
+        snapshot_id = db.execute(stmt).scalar_one_or_none()
+        if snapshot_id is None:
+            return None
+        latest_cache.set(key, snapshot_id)
+    return snapshot_id
+
+
+def get_snapshot(db: Session, snapshot_id: int):
+    ids = snapshot_cache.get(snapshot_id)
+    if ids is None:
+        stmt = Select(RankingSnapshot.post_ids).where(
+            RankingSnapshot.id == snapshot_id
+        )
+        post_ids = db.execute(stmt).scalar_one_or_none()
+        if post_ids is None:
+            return None
+        ids = numpy.array(post_ids, dtype=numpy.int64)
+        snapshot_cache.set(snapshot_id, ids)
+    return ids
+
+
+def encode_cursor(snapshot_id: int, offset: int):
+    return f"{CURSOR_PREFIX}:{snapshot_id}:{offset}"
+
+
+def decode_cursor(cursor: str):
+    try:
+        prefix, snapshot_id, offset = cursor.split(":")
+        if prefix == CURSOR_PREFIX:
+            return int(snapshot_id), int(offset)
+    except ValueError:
+        pass
+    return None
+
+
+def paginate_snapshot(
+    db: Session,
+    params,
+    order: OrderType,
+    rating: RatingType,
+    type: FileType | None,
+    filter_ai: bool,
+):
+    """Serve a feed page from a snapshot, or None to use the live query."""
+    key = snapshot_key(order, rating, type, filter_ai)
+    raw_params = params.to_raw_params()
+    size = raw_params.size
+
+    if raw_params.cursor is None:
+        snapshot_id, offset = get_latest_snapshot_id(db, key), 0
+    else:
+        decoded = decode_cursor(raw_params.cursor)
+        if decoded is None:
+            return None
+        snapshot_id, offset = decoded
+    if snapshot_id is None:
+        return None
+
+    ids = get_snapshot(db, snapshot_id)
+    if ids is None:
+        # snapshot expired, continue at the same position in the latest one
+        snapshot_id = get_latest_snapshot_id(db, key)
+        if snapshot_id is None:
+            return None
+        ids = get_snapshot(db, snapshot_id)
+        if ids is None:
+            return None
+
+    columns = (Post.id, Post.sample_url, Post.preview_url, Post.type)
+    truncated = len(ids) >= settings.RANKING_SNAPSHOT_DEPTH
+    page_ids = ids[offset : offset + size].tolist()
+
+    if page_ids:
+        stmt = Select(*columns).where(Post.id.in_(page_ids))
+        rows = {row.id: row for row in db.execute(stmt).all()}
+        items = [rows[id] for id in page_ids if id in rows]
+        has_next = offset + size < len(ids) or truncated
+    elif truncated:
+        # past the end of a truncated snapshot, fall back to the live order
+        stmt = ranked_ids_stmt(order, rating, type, filter_ai)
+        stmt = stmt.with_only_columns(*columns).offset(offset).limit(size)
+        items = db.execute(stmt).all()
+        has_next = len(items) == size
+    else:
+        items, has_next = [], False
+
+    return create_page(
+        [row._mapping for row in items],
+        params=params,
+        current=encode_cursor(snapshot_id, offset),
+        next_=encode_cursor(snapshot_id, offset + size) if has_next else None,
+        previous=(
+            encode_cursor(snapshot_id, max(offset - size, 0)) if offset else None
+        ),
+    )
@@ -0,0 +1,161 @@
+"""Single statement reaction writes shared by posts, vaults and comments.
+
+One statement checks the target exists, locks and reads the previous
+reaction, upserts the new one on the (user_id, target_type, target_id)
+unique index and applies the like/dislike deltas, either to the
+counter_delta journal or directly to the target row when COUNTER_BUFFER
+is off.
+"""
+
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import text
+
+from app.config import settings
+from app.types import CounterType, ReactionType, TargetType
+from app.utils.counter import counter_buffer
+
+TARGET_TABLES = {
+    TargetType.POST: "post",
+    TargetType.VAULT: "vault",
+    TargetType.COMMENT: "comment",
+}
+
+UPSERT_SQL = """
+    WITH target AS (
+        SELECT id, likes, dislikes FROM "{table}" WHERE id = :target_id
+    ), prev AS (
+        SELECT r.type FROM reaction r
+        WHERE r.user_id = :user_id
+          AND r.target_type = CAST(:target_type AS targettype)
+          AND r.target_id = :target_id
+        FOR UPDATE
+    ), upsert AS (
+        INSERT INTO reaction (date_created, user_id, target_type, target_id, type)
+        SELECT :now, :user_id, CAST(:target_type AS targettype), target.id,
+               CAST(:type AS reactiontype)
+        FROM target
+        ON CONFLICT (user_id, target_type, target_id)
+        DO UPDATE SET type = EXCLUDED.type
+        RETURNING (xmax = 0) AS inserted
+    ), deltas AS (
+        SELECT
+            (CAST(:type AS text) = 'LIKE')::int
+                - (coalesce(prev.type::text, 'NONE') = 'LIKE')::int AS likes,
+            (CAST(:type AS text) = 'DISLIKE')::int
+                - (coalesce(prev.type::text, 'NONE') = 'DISLIKE')::int AS dislikes
+        FROM target
+        LEFT JOIN prev ON true
+    ), {apply}
+    SELECT target.likes, target.dislikes, prev.type AS prev_type,
+           upsert.inserted, deltas.likes AS delta_likes,
+           deltas.dislikes AS delta_dislikes, {returning}
+    FROM target
+    LEFT JOIN prev ON true
+    LEFT JOIN upsert ON true
+    CROSS JOIN deltas
+"""
+
+JOURNAL_SQL = """
+    journal AS (
+        INSERT INTO counter_delta
+            (date_created, user_id, target_type, target_id, counter, delta)
+        SELECT :now, :user_id, CAST(:target_type AS targettype), :target_id,
+               c.counter, c.delta
+        FROM deltas,
+        LATERAL (VALUES
+            (CAST('LIKES' AS countertype), deltas.likes),
+            (CAST('DISLIKES' AS countertype), deltas.dislikes)
+        ) AS c(counter, delta)
+        WHERE c.delta <> 0
+        RETURNING id, counter, delta
+    )
+"""
+
+COUNTERS_SQL = """
+    counted AS (
+        UPDATE "{table}" t SET
+            likes = t.likes + deltas.likes,
+            dislikes = t.dislikes + deltas.dislikes
+        FROM deltas
+        WHERE t.id = :target_id AND (deltas.likes <> 0 OR deltas.dislikes <> 0)
+    )
+"""
+
+
+class ReactionResult(NamedTuple):
+    prev_type: ReactionType
+    likes: int
+    dislikes: int
+
+
+class ReactionConflict(Exception):
+    """A concurrent first reaction won the insert, retry to read it."""
+
+
+def upsert_stmt(target_type: TargetType, buffered: bool):
+    table = TARGET_TABLES[target_type]
+    if buffered:
+        apply = JOURNAL_SQL
+        returning = (
+            "(SELECT json_agg(json_build_array(id, counter, delta)) "
+            "FROM journal) AS journal"
+        )
+    else:
+        apply = COUNTERS_SQL.format(table=table)
+        returning = "NULL AS journal"
+    return text(UPSERT_SQL.format(table=table, apply=apply, returning=returning))
+
+
+def upsert_reaction(
+    db: Session,
+    target_type: TargetType,
+    target_id: int,
+    user_id: int,
+    reaction: ReactionType,
+    retries: int = 3,
+):
+    """Set the user's reaction on a target, None if the target is missing.
+
+    The returned counts include this change and any deltas this process
+    has not flushed yet.
+    """
+    buffered = settings.COUNTER_BUFFER
+    stmt = upsert_stmt(target_type, buffered)
+    params = {
+        "now": datetime.now(timezone.utc),
+        "user_id": user_id,
+        "target_type": target_type.name,
+        "target_id": target_id,
+        "type": reaction.name,
+    }
+
+    for attempt in range(retries):
+        try:
+            with db.begin_nested():
+                row = db.execute(stmt, params).first()
+                if row and row.prev_type is None and not row.inserted:
+                    raise ReactionConflict
+            break
+        except ReactionConflict:
+            if attempt == retries - 1:
+                raise
+    if not row:
+        return None
+
+    likes = row.likes + row.delta_likes
+    dislikes = row.dislikes + row.delta_dislikes
+    if buffered:
+        pending = counter_buffer.pending(target_type, target_id)
+        likes += pending.get(CounterType.LIKES, 0)
+        dislikes += pending.get(CounterType.DISLIKES, 0)
+
+        db.info.setdefault("counter_flushed", []).extend(
+            (id, target_type, target_id, CounterType[counter], delta)
+            for id, counter, delta in row.journal or []
+        )
+
+    prev_type = ReactionType[row.prev_type] if row.prev_type else ReactionType.NONE
+    return ReactionResult(prev_type, likes, dislikes)
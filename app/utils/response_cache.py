@@ -0,0 +1,217 @@
+"""Shared response cache for anonymous read endpoints.
+
+Responses are keyed on the route path plus the sorted query string (which
+carries the pagination cursor), stored in an in-process LRU or a Redis
+compatible backend and served with an ETag and `Cache-Control` header.
+Concurrent misses for the same key wait on the first request instead of
+all querying the database.
+"""
+
+import asyncio
+from fnmatch import fnmatchcase
+import hashlib
+import re
+from typing import NamedTuple
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.config import settings
+from app.utils.cache import TTLCache
+
+
+class CachedRoute(NamedTuple):
+    path: str
+    ttl: int
+    # requests with any of these params have side effects and skip the cache
+    bypass_params: tuple = ()
+
+
+CACHED_ROUTES = (
+    CachedRoute("/posts/recommend", 60),
+    CachedRoute("/vaults/recommend", 60),
+    CachedRoute("/posts/{post_id}/recommend/vaults", 300),
+    CachedRoute("/searches", 30),
+    CachedRoute("/posts", 30, bypass_params=("query",)),
+    CachedRoute("/vaults", 30),
+)
+
+
+def path_pattern(path: str):
+    return re.compile("^" + re.sub(r"\{[^/]+\}", "[^/]+", path) + "$")
+
+
+ROUTE_PATTERNS = [(route, path_pattern(route.path)) for route in CACHED_ROUTES]
+
+# quoted entity tags of an If-None-Match list, a tag may itself hold commas
+ENTITY_TAG = re.compile(r'(?:W/)?("[\x21\x23-\x7e\x80-\xff]*")')
+
+
+def etag_matches(if_none_match: str, etag: str):
+    """Weak comparison of `etag` with every tag of an If-None-Match header."""
+    if if_none_match.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in ENTITY_TAG.findall(if_none_match)
+
+
+class MemoryBackend:
+    """In-process LRU, shared by every request of this worker."""
+
+    def __init__(self, maxsize: int = 1000):
+        self.cache = TTLCache(maxsize)
+
+    async def get(self, key: str):
+        return self.cache.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        self.cache.set(key, value, ttl)
+
+    async def clear(self):
+        self.cache.clear()
+
+
+class RedisBackend:
+    """Any client with the redis.asyncio get/set/scan_iter/delete API."""
+
+    def __init__(self, client, prefix: str = "response:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str):
+        if url.startswith("local://"):
+            return cls(LocalRedis())
+        try:
+            from redis.asyncio import Redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_URL requires the redis package")
+        return cls(Redis.from_url(url))
+
+    async def get(self, key: str):
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        await self.client.set(self.prefix + key, value, ex=ttl)
+
+    async def clear(self):
+        async for key in self.client.scan_iter(match=self.prefix + "*"):
+            await self.client.delete(key)
+
+
+class LocalRedis:
+    """In-process stand-in for the redis.asyncio client.
+
+    RESPONSE_CACHE_URL=local:// runs RedisBackend, key prefixing and
+    expiry included, without a server; benchmarks/response_cache.py
+    checks both backends against it.
+    """
+
+    def __init__(self, maxsize: int = 1000):
+        self.cache = TTLCache(maxsize)
+
+    async def get(self, key: str):
+        return self.cache.get(key.encode())
+
+    async def set(self, key: str, value: bytes, ex: int = None):
+        self.cache.set(key.encode(), value, float("inf") if ex is None else ex)
+
+    async def scan_iter(self, match: str = "*"):
+        for key in self.cache.keys():
+            if fnmatchcase(key.decode(), match):
+                yield key
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.cache.delete(key if isinstance(key, bytes) else key.encode())
+
+
+class CachedResponse(NamedTuple):
+    etag: str
+    media_type: str
+    body: bytes
+
+    def dumps(self):
+        return b"\n".join((self.etag.encode(), self.media_type.encode(), self.body))
+
+    @classmethod
+    def loads(cls, value: bytes):
+        etag, media_type, body = value.split(b"\n", 2)
+        return cls(etag.decode(), media_type.decode(), body)
+
+
+def create_backend():
+    if settings.RESPONSE_CACHE_URL:
+        return RedisBackend.from_url(settings.RESPONSE_CACHE_URL)
+    return MemoryBackend(settings.RESPONSE_CACHE_SIZE)
+
+
+def cache_key(path: str, query_string: str):
+    params = sorted(parse_qsl(query_string))
+    return f"{path}?{urlencode(params)}"
+
+
+def match_route(request: Request):
+    if request.method != "GET" or request.cookies.get("v34_auth"):
+        return None
+
+    for route, pattern in ROUTE_PATTERNS:
+        if pattern.match(request.url.path):
+            if any(param in request.query_params for param in route.bypass_params):
+                return None
+            return route
+    return None
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, backend=None):
+        super().__init__(app)
+        self.backend = backend or create_backend()
+        self.inflight: dict[str, asyncio.Future] = {}
+
+    async def dispatch(self, request: Request, call_next):
+        route = match_route(request)
+        if not route:
+            return await call_next(request)
+
+        key = cache_key(request.url.path, request.url.query)
+        value = await self.backend.get(key)
+        if value is not None:
+            return self.respond(request, route, CachedResponse.loads(value), "HIT")
+
+        waiting = self.inflight.get(key)
+        if waiting:
+            cached = await asyncio.shield(waiting)
+            if cached:
+                return self.respond(request, route, cached, "HIT")
+            return await call_next(request)
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        cached = None
+        try:
+            response = await call_next(request)
+            if response.status_code != 200:
+                return response
+
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            media_type = response.headers.get("content-type", "application/json")
+            cached = CachedResponse(etag, media_type, body)
+            await self.backend.set(key, cached.dumps(), route.ttl)
+            return self.respond(request, route, cached, "MISS")
+        finally:
+            del self.inflight[key]
+            future.set_result(cached)
+
+    def respond(self, request: Request, route: CachedRoute, cached, status: str):
+        headers = {
+            "ETag": cached.etag,
+            "Cache-Control": f"public, max-age={route.ttl}",
+            "Vary": "Cookie",
+            "X-Cache": status,
+        }
+        if etag_matches(request.headers.get("if-none-match", ""), cached.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(cached.body, media_type=cached.media_type, headers=headers)
@@ -1,10 +1,8 @@
-from datetime import datetime, timezone, timedelta
+from sqlalchemy import and_, or_, Select
 
-from sqlalchemy import desc, func, and_, or_
-from sqlalchemy.orm import Session
-
-from app.models import Search, SearchMetric, Post
-from app.utils import calculate_trend_score
+from app.models import Post
+from app.types import OrderType, RatingType, FileType
+from app.utils.keyset import keyset_order
 
 
 def query_posts(posts, query):
@@ -33,68 +31,61 @@ def create_post_title_filter(query: str):
     return filters
 
 
-""" metric functions """
+def get_post_rank(order: OrderType):
+    if order == OrderType.TRENDING:
+        return Post.trend_score
+    elif order == OrderType.POPULAR:
+        return Post.score
+    elif order == OrderType.POPULAR_WEEK:
+        return Post.week_score
+    elif order == OrderType.POPULAR_MONTH:
+        return Post.month_score
+    elif order == OrderType.POPULAR_YEAR:
+        return Post.year_score
+    elif order == OrderType.NEWEST:
+        return Post.date_created
+    else:
+        return Post.trend_score
 
 
-def create_search_log(search: Search):
-    search_metric = SearchMetric(query=search.query, score=search.score)
-    return search_metric
+def post_feed_keys(order: OrderType):
+    return get_post_rank(order), Post.id
 
 
-def search_popularity_score(db: Session, query: str, days: int = 7):
-    now = datetime.now(timezone.utc)
-    start_time = now - timedelta(days=days)
+def post_filters(
+    query: str | None,
+    rating: RatingType,
+    type: FileType | None,
+    filter_ai: bool,
+):
+    filters = []
 
-    result = (
-        db.query(func.sum(SearchMetric.score).label("total_score"))
-        .filter(
-            SearchMetric.query == query,
-            SearchMetric.date_created >= start_time,
-        )
-        .first()
-    )
-    return result.total_score or 0
+    if rating == RatingType.QUESTIONABLE:
+        filters.append(Post.rating == RatingType.QUESTIONABLE)
 
+    if type:
+        filters.append(Post.type == type)
 
-def average_search_score(db: Session, query: str, days: int = 7):
-    now = datetime.now(timezone.utc)
-    start_time = now - timedelta(days=days)
+    if filter_ai:
+        filters.append(Post.ai_generated.is_(False))
 
-    result = (
-        db.query(func.avg(SearchMetric.score).label("avg_score"))
-        .filter(
-            SearchMetric.query == query,
-            SearchMetric.date_created >= start_time,
-        )
-        .first()
-    )
-    return result.avg_score or 0
+    if query:
+        title_filters = create_post_title_filter(query)
+        for filter in title_filters:
+            filters.append(filter)
+    return filters
 
 
-def log_search_metric(db: Session, search: Search, now: datetime):
-    prev_log = (
-        db.query(SearchMetric)
-        .filter(SearchMetric.query == search.query)
-        .order_by(desc(SearchMetric.date_created))
-        .first()
+def post_feed_stmt(
+    query: str | None,
+    rating: RatingType,
+    order: OrderType,
+    type: FileType | None,
+    filter_ai: bool,
+):
+    filters = post_filters(query, rating, type, filter_ai)
+    return (
+        Select(Post.id, Post.sample_url, Post.preview_url, Post.type)
+        .where(and_(*filters))
+        .order_by(*keyset_order(*post_feed_keys(order)))
     )
-
-    if not prev_log:
-        log = create_search_log(search)
-        db.add(log)
-        return
-
-    if prev_log.date_created + timedelta(days=1) < now:
-        log = create_search_log(search)
-        avg_score_14 = average_search_score(db, search.query, 14)
-        avg_score_3 = average_search_score(db, search.query, 3)
-        trend_score = calculate_trend_score(avg_score_3, avg_score_14)
-        week_score = search_popularity_score(db, search.query, 7)
-        month_score = search_popularity_score(db, search.query, 30)
-        year_score = search_popularity_score(db, search.query, 365)
-
-        search.trend_score = trend_score
-        search.week_score = week_score
-        search.month_score = month_score
-        search.year_score = year_score
-        db.add(log)
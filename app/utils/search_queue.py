@@ -0,0 +1,154 @@
+"""Write-behind ingestion of search counts from GET /posts.
+
+The endpoint only puts the normalized query on a bounded in-process
+queue. A worker drains it, coalesces events per query and applies them
+with one multi-row upsert, so popular queries no longer serialize on
+their `search` row inside the request. When the queue is full events are
+dropped and counted rather than slowing the feed down. Depth, drops and
+the high-water mark are logged every SEARCH_QUEUE_STATS_INTERVAL.
+"""
+
+from collections import Counter
+from datetime import datetime, timezone
+import logging
+import queue
+import threading
+import time
+
+from sqlalchemy.sql import text
+
+from app.config import settings
+from app.db import SessionLocal
+from app.utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# sorted input keeps concurrent flushes from different workers locking
+# rows in the same order
+UPSERT_SQL = text(
+    """
+    INSERT INTO search AS s
+        (query, last_updated, score, week_score, month_score, year_score,
+         trend_score)
+    SELECT e.query, :now, e.n, 1, 1, 1, 0
+    FROM unnest(CAST(:queries AS varchar[]), CAST(:counts AS integer[]))
+        AS e(query, n)
+    ORDER BY e.query
+    ON CONFLICT (query) DO UPDATE SET
+        score = s.score + EXCLUDED.score,
+        last_updated = CASE
+            WHEN s.last_updated < :now - interval '1 day' THEN :now
+            ELSE s.last_updated
+        END
+    """
+)
+
+
+class SearchQueue:
+    def __init__(self, maxsize: int):
+        self._queue = queue.Queue(maxsize)
+        self._carry = Counter()
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.high_water = 0
+        self.last_flush = 0.0
+        self._reported_drops = 0
+
+    def push(self, query: str):
+        """Record one search, False if the queue is full and it was dropped."""
+        try:
+            self._queue.put_nowait(normalize_text(query))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+        with self._lock:
+            self.enqueued += 1
+            self.high_water = max(self.high_water, self._queue.qsize())
+        return True
+
+    def drain(self):
+        counts = Counter()
+        while True:
+            try:
+                counts[self._queue.get_nowait()] += 1
+            except queue.Empty:
+                return counts
+
+    def flush(self):
+        counts = self.drain()
+        with self._lock:
+            counts.update(self._carry)
+            self._carry.clear()
+        if not counts:
+            return 0
+
+        start = time.monotonic()
+        now = datetime.now(timezone.utc)
+        queries = sorted(counts)
+        params = {
+            "now": now,
+            "queries": queries,
+            "counts": [counts[query] for query in queries],
+        }
+        try:
+            with SessionLocal() as db:
+                db.execute(UPSERT_SQL, params)
+                db.commit()
+        except Exception:
+            # keep the counts for the next flush
+            with self._lock:
+                self._carry.update(counts)
+            raise
+
+        events = sum(counts.values())
+        with self._lock:
+            self.flushed += events
+            self.last_flush = time.monotonic() - start
+            dropped = self.dropped - self._reported_drops
+            self._reported_drops = self.dropped
+        if dropped:
+            logger.warning("search queue full, dropped %d searches", dropped)
+        return events
+
+    def stats(self, reset: bool = False):
+        """Counters since startup, the high-water mark since the last reset."""
+        with self._lock:
+            stats = {
+                "depth": self._queue.qsize(),
+                "maxsize": self._queue.maxsize,
+                "high_water": self.high_water,
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "flushed": self.flushed,
+                "last_flush": self.last_flush,
+            }
+            if reset:
+                self.high_water = stats["depth"]
+            return stats
+
+
+search_queue = SearchQueue(settings.SEARCH_QUEUE_SIZE)
+
+
+def flush_searches():
+    search_queue.flush()
+
+
+def log_search_queue_stats():
+    stats = search_queue.stats(reset=True)
+    logger.info(
+        "search queue depth=%(depth)d/%(maxsize)d high_water=%(high_water)d "
+        "enqueued=%(enqueued)d dropped=%(dropped)d flushed=%(flushed)d "
+        "last_flush=%(last_flush).3fs",
+        stats,
+    )
+
+
+def drain_searches():
+    """Flush until the queue is empty, used on shutdown."""
+    while search_queue.flush():
+        pass
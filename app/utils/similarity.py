@@ -0,0 +1,553 @@
+"""Pluggable nearest neighbour search over post embeddings.
+
+`PgvectorEngine` asks Postgres through the HNSW index. `NumpyEngine` keeps
+every normalized embedding in a memory-mapped float32 matrix on disk,
+shared through the page cache by all workers on the host, and answers
+exact top-k with blocked matrix-vector products. The rating/type/ai
+filters are applied with per-combination masks built from a flags array.
+
+One process at a time (whoever holds the writer file lock) writes the
+files of the current generation directory. A refresh appends posts
+whose embedding was added or changed since the last sync (tracked by
+post.embedding_updated), flags the rows they replace and the rows of
+deleted posts as deleted, then publishes the new row count and a bumped
+generation by atomically replacing meta.json. Readers remap when the
+generation changes and only map rows up to the published count, so a
+half written append is never seen. A rebuild writes a new generation
+directory and swaps it in with the same meta.json replace.
+"""
+
+from datetime import datetime, timedelta
+import fcntl
+import json
+import os
+from pathlib import Path
+import shutil
+from typing import NamedTuple
+
+from fastapi_pagination.api import create_page
+import numpy
+from sqlalchemy import func, Select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models import Post
+from app.types import FileType, RatingType
+from app.utils.ann import fetch_nearest, nearest_stmt
+
+DIM = 512
+CURSOR_PREFIX = "similar"
+
+FLAG_QUESTIONABLE = 1
+FLAG_VIDEO = 2
+FLAG_AI = 4
+FLAG_DELETED = 8
+
+FILES = {"vectors.f32": 4 * DIM, "ids.i64": 8, "flags.u8": 1}
+# compact with a rebuild once this share of the rows is deleted
+REBUILD_RATIO = 0.25
+
+
+class Neighbours(NamedTuple):
+    ids: numpy.ndarray
+    distances: numpy.ndarray
+
+
+class PgvectorEngine:
+    name = "pgvector"
+
+    def ready(self):
+        return True
+
+    def search(
+        self,
+        db: Session,
+        vector,
+        k: int,
+        rating: RatingType,
+        type: FileType | None,
+        filter_ai: bool,
+    ):
+        stmt = nearest_stmt(vector, None, type, rating, filter_ai)
+        rows = fetch_nearest(db, stmt, k)
+        return Neighbours(
+            numpy.array([row.id for row in rows], dtype=numpy.int64),
+            numpy.array([row.distance for row in rows], dtype=numpy.float64),
+        )
+
+
+class MatrixState(NamedTuple):
+    generation: int
+    count: int
+    vectors: numpy.ndarray
+    ids: numpy.ndarray
+    flags: numpy.ndarray
+    masks: dict
+
+
+EMPTY_STATE = MatrixState(
+    -1,
+    0,
+    numpy.empty((0, DIM), dtype=numpy.float32),
+    numpy.empty(0, dtype=numpy.int64),
+    numpy.empty(0, dtype=numpy.uint8),
+    {},
+)
+
+EMPTY_META = {
+    "generation": 0,
+    "directory": ".",
+    "count": 0,
+    "deleted": 0,
+    "max_id": 0,
+    "synced_at": None,
+    "reconciled_at": None,
+}
+
+
+def embedding_chunks(db: Session, chunk_size: int, after: int, *conditions):
+    """Yield the posts past id `after` matching `conditions`, in id order."""
+    columns = (Post.id, Post.embedding, Post.rating, Post.type, Post.ai_generated)
+    while True:
+        stmt = (
+            Select(*columns)
+            .where(Post.id > after, *conditions)
+            .order_by(Post.id)
+            .limit(chunk_size)
+        )
+        rows = db.execute(stmt).all()
+        db.rollback()
+        if not rows:
+            return
+        yield rows
+        after = rows[-1].id
+
+
+def row_arrays(rows):
+    """Normalized vectors, ids and flags of rows that have an embedding."""
+    rows = [row for row in rows if row.embedding is not None]
+    if not rows:
+        return None
+    vectors = numpy.stack([row.embedding for row in rows]).astype(numpy.float32)
+    norms = numpy.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= numpy.where(norms == 0, 1, norms)
+    ids = numpy.array([row.id for row in rows], dtype=numpy.int64)
+    flags = numpy.array(
+        [
+            (row.rating == RatingType.QUESTIONABLE) * FLAG_QUESTIONABLE
+            | (row.type == FileType.VIDEO) * FLAG_VIDEO
+            | row.ai_generated * FLAG_AI
+            for row in rows
+        ],
+        dtype=numpy.uint8,
+    )
+    return {"vectors.f32": vectors, "ids.i64": ids, "flags.u8": flags}
+
+
+class NumpyEngine:
+    name = "numpy"
+
+    def __init__(self, path: str, block_size: int = 65536):
+        self.path = Path(path)
+        self.block_size = block_size
+        self.state = EMPTY_STATE
+
+    def file(self, name: str):
+        return self.path / name
+
+    def ready(self):
+        return self.state.count > 0
+
+    def read_meta(self):
+        try:
+            return {**EMPTY_META, **json.loads(self.file("meta.json").read_text())}
+        except FileNotFoundError:
+            return dict(EMPTY_META)
+
+    def write_meta(self, meta: dict):
+        tmp = self.file("meta.json.tmp")
+        tmp.write_text(json.dumps(meta))
+        tmp.replace(self.file("meta.json"))
+
+    def load(self):
+        """Map the rows published in meta.json if its generation changed."""
+        meta = self.read_meta()
+        if meta["generation"] == self.state.generation:
+            return
+        count = meta["count"]
+        if not count:
+            self.state = EMPTY_STATE._replace(generation=meta["generation"], masks={})
+            return
+
+        directory = self.path / meta["directory"]
+
+        def mmap(name, dtype, shape):
+            return numpy.memmap(directory / name, dtype=dtype, mode="r", shape=shape)
+
+        try:
+            self.state = MatrixState(
+                meta["generation"],
+                count,
+                mmap("vectors.f32", numpy.float32, (count, DIM)),
+                mmap("ids.i64", numpy.int64, (count,)),
+                mmap("flags.u8", numpy.uint8, (count,)),
+                {},
+            )
+        except FileNotFoundError:
+            # superseded by a rebuild after meta.json was read, keep serving
+            # the current state until the next load
+            pass
+
+    def refresh(self, db: Session, chunk_size: int = 10000):
+        """Sync embeddings changed since the last refresh, then remap."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.file("writer.lock"), "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # another process is writing, just pick up its rows
+                self.load()
+                return 0
+            meta = self.read_meta()
+            # the first build, or files written before changes were tracked
+            if meta["synced_at"] is None:
+                changed = self.build(db, meta, chunk_size)
+            else:
+                changed = self.sync(db, meta, chunk_size)
+                meta = self.read_meta()
+                if meta["deleted"] > meta["count"] * REBUILD_RATIO:
+                    self.build(db, meta, chunk_size)
+        self.load()
+        return changed
+
+    def rebuild(self, db: Session, chunk_size: int = 10000):
+        """Build a fresh generation and swap it in for every worker."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.file("writer.lock"), "w") as lock:
+            # waits for a running refresh instead of racing it
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            count = self.build(db, self.read_meta(), chunk_size)
+        self.load()
+        return count
+
+    def append(self, directory: Path, rows):
+        arrays = row_arrays(rows)
+        if arrays is None:
+            return 0
+        for name, array in arrays.items():
+            with open(directory / name, "ab") as f:
+                f.write(array.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        return len(arrays["ids.i64"])
+
+    def live_rows(self, directory: Path, count: int, post_ids, invert=False):
+        """Positions of undeleted rows whose id is (not) in `post_ids`."""
+        if not count:
+            return numpy.empty(0, dtype=numpy.int64)
+        ids = numpy.memmap(
+            directory / "ids.i64", dtype=numpy.int64, mode="r", shape=(count,)
+        )
+        flags = numpy.memmap(
+            directory / "flags.u8", dtype=numpy.uint8, mode="r", shape=(count,)
+        )
+        rows = numpy.isin(ids, post_ids, invert=invert)
+        rows &= (flags & FLAG_DELETED) == 0
+        return numpy.flatnonzero(rows)
+
+    def delete_rows(self, directory: Path, count: int, positions):
+        """Flag rows deleted in place, a one byte write per row."""
+        if not len(positions):
+            return 0
+        flags = numpy.memmap(
+            directory / "flags.u8", dtype=numpy.uint8, mode="r+", shape=(count,)
+        )
+        flags[positions] |= FLAG_DELETED
+        flags.flush()
+        return len(positions)
+
+    def apply_changes(self, directory: Path, count: int, rows):
+        """Replace the rows of posts whose embedding changed.
+
+        Rows re-read inside the sync slack that still match what is
+        stored are skipped, the others are deleted and appended again.
+        Returns (appended, deleted).
+        """
+        arrays = row_arrays(rows)
+        ids = [row.id for row in rows]
+        positions = self.live_rows(directory, count, ids)
+        if arrays is not None and len(positions):
+            stored_ids = numpy.memmap(
+                directory / "ids.i64", dtype=numpy.int64, mode="r", shape=(count,)
+            )
+            vectors = numpy.memmap(
+                directory / "vectors.f32",
+                dtype=numpy.float32,
+                mode="r",
+                shape=(count, DIM),
+            )
+            flags = numpy.memmap(
+                directory / "flags.u8", dtype=numpy.uint8, mode="r", shape=(count,)
+            )
+            stored = {int(stored_ids[p]): p for p in positions}
+            unchanged = set()
+            for i, id in enumerate(arrays["ids.i64"].tolist()):
+                p = stored.get(id)
+                if (
+                    p is not None
+                    and flags[p] == arrays["flags.u8"][i]
+                    and numpy.array_equal(vectors[p], arrays["vectors.f32"][i])
+                ):
+                    unchanged.add(id)
+            if unchanged:
+                positions = [p for id, p in stored.items() if id not in unchanged]
+                rows = [row for row in rows if row.id not in unchanged]
+        deleted = self.delete_rows(directory, count, positions)
+        return self.append(directory, rows), deleted
+
+    def sync(self, db: Session, meta: dict, chunk_size: int):
+        """Apply changed, new and deleted embeddings, then publish."""
+        directory = self.path / meta["directory"]
+        count, deleted, max_id = meta["count"], meta["deleted"], meta["max_id"]
+        # drop anything a crashed writer appended past the published count
+        for name, row_size in FILES.items():
+            with open(directory / name, "ab") as f:
+                f.truncate(count * row_size)
+
+        now = db.execute(Select(func.now())).scalar()
+        # embedding_updated is the writer's transaction time, so look back
+        # far enough to catch transactions that committed after the last sync
+        since = datetime.fromisoformat(meta["synced_at"]) - timedelta(
+            seconds=settings.SIMILARITY_SYNC_SLACK
+        )
+        changed = 0
+        # changed, backfilled and cleared embeddings of existing ids
+        for rows in embedding_chunks(
+            db, chunk_size, 0, Post.id <= max_id, Post.embedding_updated >= since
+        ):
+            appended, removed = self.apply_changes(directory, count, rows)
+            count += appended
+            deleted += removed
+            changed += appended + removed
+
+        for rows in embedding_chunks(
+            db, chunk_size, max_id, Post.embedding.is_not(None)
+        ):
+            appended = self.append(directory, rows)
+            count += appended
+            changed += appended
+            max_id = rows[-1].id
+
+        # posts deleted outright leave no change behind, compare ids now
+        # and then
+        reconciled_at = datetime.fromisoformat(meta["reconciled_at"])
+        interval = timedelta(seconds=settings.SIMILARITY_RECONCILE_INTERVAL)
+        if now - reconciled_at >= interval:
+            stmt = Select(Post.id).where(Post.embedding.is_not(None))
+            live = numpy.array(db.execute(stmt).scalars().all(), dtype=numpy.int64)
+            db.rollback()
+            positions = self.live_rows(directory, count, live, invert=True)
+            removed = self.delete_rows(directory, count, positions)
+            deleted += removed
+            changed += removed
+            reconciled_at = now
+
+        # readers remap when the generation moves, only bump it for changes
+        self.write_meta(
+            {
+                **meta,
+                "generation": meta["generation"] + bool(changed),
+                "count": count,
+                "deleted": deleted,
+                "max_id": max_id,
+                "synced_at": now.isoformat(),
+                "reconciled_at": reconciled_at.isoformat(),
+            }
+        )
+        return changed
+
+    def build(self, db: Session, meta: dict, chunk_size: int):
+        """Write every embedding into a new generation and publish it."""
+        generation = meta["generation"] + 1
+        name = f"gen-{generation}"
+        directory = self.path / name
+        shutil.rmtree(directory, ignore_errors=True)
+        directory.mkdir(parents=True)
+        for file in FILES:
+            (directory / file).touch()
+
+        now = db.execute(Select(func.now())).scalar()
+        count = max_id = 0
+        for rows in embedding_chunks(db, chunk_size, 0, Post.embedding.is_not(None)):
+            count += self.append(directory, rows)
+            max_id = rows[-1].id
+
+        # one atomic replace moves every worker to the new generation
+        self.write_meta(
+            {
+                "generation": generation,
+                "directory": name,
+                "count": count,
+                "deleted": 0,
+                "max_id": max_id,
+                "synced_at": now.isoformat(),
+                "reconciled_at": now.isoformat(),
+            }
+        )
+
+        # workers that have not remapped yet may still open the previous
+        # generation, older ones are only held by existing mappings
+        keep = {name, meta["directory"]}
+        for old in self.path.glob("gen-*"):
+            if old.name not in keep:
+                shutil.rmtree(old, ignore_errors=True)
+        if "." not in keep:
+            for file in FILES:
+                self.file(file).unlink(missing_ok=True)
+        return count
+
+    def mask(
+        self,
+        state: MatrixState,
+        rating: RatingType,
+        type: FileType | None,
+        filter_ai: bool,
+    ):
+        key = (rating, type, filter_ai)
+        allowed = state.masks.get(key)
+        if allowed is not None:
+            return allowed
+
+        flags = numpy.asarray(state.flags)
+        allowed = (flags & FLAG_DELETED) == 0
+        if rating == RatingType.QUESTIONABLE:
+            allowed &= (flags & FLAG_QUESTIONABLE) != 0
+        if type:
+            allowed &= ((flags & FLAG_VIDEO) != 0) == (type == FileType.VIDEO)
+        if filter_ai:
+            allowed &= (flags & FLAG_AI) == 0
+        state.masks[key] = allowed
+        return allowed
+
+    def search(
+        self,
+        db: Session,
+        vector,
+        k: int,
+        rating: RatingType,
+        type: FileType | None,
+        filter_ai: bool,
+    ):
+        state = self.state
+        query = numpy.asarray(vector, dtype=numpy.float32)
+        query = query / (numpy.linalg.norm(query) or 1)
+        allowed = self.mask(state, rating, type, filter_ai)
+
+        candidates, scores = [], []
+        for start in range(0, state.count, self.block_size):
+            end = min(start + self.block_size, state.count)
+            block = state.vectors[start:end] @ query
+            block[~allowed[start:end]] = -numpy.inf
+            if len(block) > k:
+                top = numpy.argpartition(block, -k)[-k:]
+            else:
+                top = numpy.arange(len(block))
+            candidates.append(top + start)
+            scores.append(block[top])
+
+        if not candidates:
+            empty = numpy.empty(0)
+            return Neighbours(empty.astype(numpy.int64), empty.astype(numpy.float32))
+
+        candidates = numpy.concatenate(candidates)
+        scores = numpy.concatenate(scores)
+        order = numpy.argsort(-scores, kind="stable")[:k]
+        order = order[numpy.isfinite(scores[order])]
+        return Neighbours(
+            numpy.asarray(state.ids[candidates[order]]),
+            (1 - scores[order]).astype(numpy.float32),
+        )
+
+
+engines = {
+    "pgvector": PgvectorEngine(),
+    "numpy": NumpyEngine(settings.SIMILARITY_INDEX_DIR),
+}
+
+
+def get_engine(name: str = None):
+    engine = engines[name or settings.SIMILARITY_ENGINE]
+    if isinstance(engine, NumpyEngine) and not engine.ready():
+        engine.load()
+    return engine
+
+
+def refresh_similarity_index():
+    engine = engines["numpy"]
+    with SessionLocal() as db:
+        engine.refresh(db)
+
+
+def page_items(db: Session, page_ids: list[int]):
+    """PostBase rows for `page_ids`, in that order, skipping deleted posts."""
+    if not page_ids:
+        return []
+    columns = (Post.id, Post.sample_url, Post.preview_url, Post.type)
+    stmt = Select(*columns).where(Post.id.in_(page_ids))
+    rows = {row.id: row for row in db.execute(stmt).all()}
+    return [rows[id]._mapping for id in page_ids if id in rows]
+
+
+def encode_cursor(offset: int):
+    return f"{CURSOR_PREFIX}:{offset}"
+
+
+def decode_cursor(cursor: str):
+    try:
+        prefix, offset = cursor.split(":")
+        if prefix == CURSOR_PREFIX:
+            return int(offset)
+    except ValueError:
+        pass
+    return None
+
+
+def paginate_similar(
+    db: Session,
+    params,
+    embedding,
+    rating: RatingType,
+    type: FileType | None,
+    filter_ai: bool,
+):
+    """Serve a recommendation page from the configured engine.
+
+    Returns None when the engine is not loaded yet so the caller can use
+    the pgvector query.
+    """
+    engine = get_engine()
+    if not engine.ready():
+        return None
+
+    raw_params = params.to_raw_params()
+    size = raw_params.size
+    offset = 0
+    if raw_params.cursor is not None:
+        offset = decode_cursor(raw_params.cursor)
+        if offset is None:
+            return None
+
+    depth = settings.SIMILARITY_DEPTH
+    neighbours = engine.search(db, embedding, depth, rating, type, filter_ai)
+    page_ids = neighbours.ids[offset : offset + size].tolist()
+
+    items = page_items(db, page_ids)
+    has_next = offset + size < len(neighbours.ids)
+    return create_page(
+        items,
+        params=params,
+        current=encode_cursor(offset),
+        next_=encode_cursor(offset + size) if has_next else None,
+        previous=encode_cursor(max(offset - size, 0)) if offset else None,
+    )
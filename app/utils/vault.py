@@ -1,90 +1,184 @@
-from datetime import datetime, timezone, timedelta
-
-from sqlalchemy import desc, func
-from sqlalchemy.orm import Session
-
-from app.models import Vault, VaultMetric, VaultPost
-from app.utils import calculate_score, calculate_trend_score
-
-
-def get_post_vaults(db: Session, ids: list[int], size: int = 4):
-    vaults = (
-        db.query(Vault.id)
-        .join(VaultPost, VaultPost.vault_id == Vault.id)
-        .filter(VaultPost.post_id.in_(ids))
-        .order_by(desc(Vault.likes))
-        .limit(size)
-        .all()
+from collections import Counter
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    any_,
+    delete,
+    func,
+    insert,
+    Integer,
+    literal,
+    Select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import load_only, raiseload, Session
+from sqlalchemy.sql import text
+
+from app.models import Post, Vault, VaultPost
+from app.types import CounterType, TargetType
+from app.utils.counter import record_counters
+from app.utils.keyset import keyset_order
+
+# VaultBase listings only need these columns, and must not lazy load
+# relationships per row
+vault_base_options = (
+    load_only(Vault.id, Vault.title, Vault.post_count, Vault.previews, Vault.privacy),
+    raiseload("*"),
+)
+
+# Entries are ordered by (index, id). New entries are spaced INDEX_GAP
+# apart so an entry can be moved between two others by giving it the
+# midpoint of their indexes; only when two neighbours run out of room is
+# the vault renumbered. Appends and moves to the end advance next_index
+# by INDEX_GAP each, so a vault is also renumbered before that counter
+# would overflow the integer column.
+INDEX_GAP = 1024
+INDEX_LIMIT = 2**31 - 1
+
+RESPACE_SQL = text(
+    """
+    WITH ranked AS (
+        SELECT id, (row_number() OVER (ORDER BY index, id) - 1) * :gap AS index
+        FROM vault_post
+        WHERE vault_id = :vault_id
+    ), respaced AS (
+        UPDATE vault_post SET index = ranked.index
+        FROM ranked
+        WHERE vault_post.id = ranked.id
+        RETURNING 1
+    )
+    UPDATE vault SET next_index = (SELECT count(*) FROM respaced) * :gap
+    WHERE id = :vault_id
+    """
+)
+
+
+def reserve_indexes(db: Session, vault_id: int, count: int):
+    """Reserve `count` indexes at the end of a vault.
+
+    The UPDATE holds the vault row lock until commit, so concurrent adds
+    to the same vault never get the same index.
+    """
+    size = count * INDEX_GAP
+    stmt = (
+        update(Vault)
+        .where(Vault.id == vault_id, Vault.next_index <= INDEX_LIMIT - size)
+        .values(next_index=Vault.next_index + size)
+        .returning(Vault.next_index)
+        .execution_options(synchronize_session=False)
     )
-    return list(set([vault.id for vault in vaults]))
+    end = db.execute(stmt).scalar()
+    if end is None:
+        # renumbering compacts next_index down to entries * INDEX_GAP
+        respace_indexes(db, vault_id)
+        end = db.execute(stmt).scalar_one()
+    return list(range(end - size, end, INDEX_GAP))
 
 
-""" metric functions """
+def respace_indexes(db: Session, vault_id: int):
+    db.execute(RESPACE_SQL, {"vault_id": vault_id, "gap": INDEX_GAP})
 
 
-def create_vault_log(vault: Vault):
-    vault_metric = VaultMetric(
-        vault_id=vault.id,
-        score=vault.score,
+def index_before(db: Session, vault_id: int, entry_id: int, before_id: int):
+    """A free index right before `before_id`, None when there is no room."""
+    stmt = Select(VaultPost.index).where(
+        VaultPost.id == before_id, VaultPost.vault_id == vault_id
     )
-    return vault_metric
-
-
-def vault_popularity_score(db: Session, id: int, days: int = 7):
-    now = datetime.now(timezone.utc)
-    start_time = now - timedelta(days=days)
-
-    result = (
-        db.query(func.sum(VaultMetric.score).label("total_score"))
-        .filter(
-            VaultMetric.vault_id == id,
-            VaultMetric.date_created >= start_time,
-        )
-        .first()
+    upper = db.execute(stmt).scalar_one()
+    stmt = Select(func.max(VaultPost.index)).where(
+        VaultPost.vault_id == vault_id,
+        VaultPost.index < upper,
+        VaultPost.id != entry_id,
     )
-    return result.total_score or 0
+    lower = db.execute(stmt).scalar()
+    if lower is None:
+        return upper - INDEX_GAP
 
+    index = (lower + upper) // 2
+    return index if index > lower else None
 
-def average_vault_score(db: Session, id: int, days: int = 7):
-    now = datetime.now(timezone.utc)
-    start_time = now - timedelta(days=days)
 
-    result = (
-        db.query(func.avg(VaultMetric.score).label("avg_score"))
-        .filter(
-            VaultMetric.vault_id == id,
-            VaultMetric.date_created >= start_time,
-        )
-        .first()
+def move_entry(db: Session, vault_id: int, entry_id: int, before_id: int | None):
+    if entry_id == before_id:
+        return
+    if before_id is None:
+        [index] = reserve_indexes(db, vault_id, 1)
+    else:
+        index = index_before(db, vault_id, entry_id, before_id)
+        if index is None:
+            respace_indexes(db, vault_id)
+            index = index_before(db, vault_id, entry_id, before_id)
+
+    stmt = (
+        update(VaultPost)
+        .where(VaultPost.id == entry_id)
+        .values(index=index)
+        .execution_options(synchronize_session=False)
     )
-    return result.avg_score or 0
+    db.execute(stmt)
 
 
-def log_vault_metric(db: Session, vault: Vault, now: datetime):
-    prev_log = (
-        db.query(VaultMetric)
-        .filter(VaultMetric.vault_id == vault.id)
-        .order_by(desc(VaultMetric.date_created))
-        .first()
+def update_vault_summary(db: Session, vault_id: int, count_delta: int):
+    """Adjust post_count and rebuild previews from the last entries."""
+    latest = (
+        Select(VaultPost.preview_url)
+        .where(VaultPost.vault_id == vault_id)
+        .order_by(*keyset_order(VaultPost.index, VaultPost.id))
+        .limit(3)
     )
+    # previews are kept in entry order
+    previews = db.execute(latest).scalars().all()[::-1]
+    stmt = (
+        update(Vault)
+        .where(Vault.id == vault_id)
+        .values(post_count=Vault.post_count + count_delta, previews=previews)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(stmt)
 
-    if not prev_log:
-        log = create_vault_log(vault)
-        db.add(log)
-        return
 
-    if prev_log.date_created + timedelta(days=1) < now:
-        log = create_vault_log(vault)
-        avg_score_14 = average_vault_score(db, vault.id, 14)
-        avg_score_3 = average_vault_score(db, vault.id, 3)
-        trend_score = calculate_trend_score(avg_score_3, avg_score_14)
-        week_score = vault_popularity_score(db, vault.id, 7)
-        month_score = vault_popularity_score(db, vault.id, 30)
-        year_score = vault_popularity_score(db, vault.id, 365)
-
-        vault.trend_score = trend_score
-        vault.week_score = week_score
-        vault.month_score = month_score
-        vault.year_score = year_score
-        vault.score = calculate_score(vault.likes, vault.dislikes)
-        db.add(log)
+def add_entries(db: Session, vault_id: int, post_ids: list[int], user_id: int):
+    """Append posts to a vault, or return None if any of them is missing."""
+    post_ids = list(dict.fromkeys(post_ids))
+    if not post_ids:
+        return 0
+    ids = literal(post_ids, ARRAY(Integer))
+    found = db.execute(Select(Post.id).where(Post.id == any_(ids))).scalars().all()
+    if len(found) != len(post_ids):
+        return None
+
+    now = datetime.now(timezone.utc)
+    indexes = reserve_indexes(db, vault_id, len(post_ids))
+    rows = [
+        {"date_created": now, "vault_id": vault_id, "post_id": post_id, "index": index}
+        for post_id, index in zip(post_ids, indexes)
+    ]
+    db.execute(insert(VaultPost).values(rows))
+    record_counters(db, TargetType.POST, post_ids, CounterType.SAVES, 1, user_id)
+    update_vault_summary(db, vault_id, len(post_ids))
+    return len(post_ids)
+
+
+def remove_entries(db: Session, vault_id: int, user_id: int, *conditions):
+    """Delete the vault's entries matching `conditions`, return the count."""
+    stmt = (
+        delete(VaultPost)
+        .where(VaultPost.vault_id == vault_id, *conditions)
+        .returning(VaultPost.post_id)
+        .execution_options(synchronize_session=False)
+    )
+    removed = Counter(db.execute(stmt).scalars())
+    if not removed:
+        return 0
+
+    # a post can be in a vault more than once, group posts by entry count
+    by_count = {}
+    for post_id, count in removed.items():
+        by_count.setdefault(count, []).append(post_id)
+    for count, post_ids in by_count.items():
+        record_counters(
+            db, TargetType.POST, post_ids, CounterType.SAVES, -count, user_id
+        )
+    update_vault_summary(db, vault_id, -removed.total())
+    return removed.total()
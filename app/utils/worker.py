@@ -0,0 +1,38 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicWorker:
+    """Run `target` every `interval` seconds on a daemon thread."""
+
+    def __init__(self, name: str, interval: float, target, on_stop=None):
+        self.name = name
+        self.interval = interval
+        self.target = target
+        self.on_stop = on_stop
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+        if self.on_stop:
+            self.run_once(self.on_stop)
+
+    def run_once(self, target=None):
+        try:
+            (target or self.target)()
+        except Exception:
+            logger.exception("worker %s failed", self.name)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
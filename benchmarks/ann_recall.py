@@ -0,0 +1,119 @@
+"""Compare exact and hnsw cosine search on a synthetic corpus.
+
+Usage:
+    python -m benchmarks.ann_recall [--rows 100000] [--queries 100] [--k 32]
+"""
+
+import argparse
+import time
+
+import numpy
+from sqlalchemy.sql import text
+
+from app.config import settings
+from app.db import engine
+
+DIM = 512
+
+
+def synthetic_corpus(rows: int, clusters: int, seed: int = 0):
+    """Clustered unit vectors, closer to real embeddings than pure noise."""
+    rng = numpy.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, DIM), dtype=numpy.float32)
+    labels = rng.integers(0, clusters, rows)
+    vectors = centers[labels] + 0.5 * rng.standard_normal(
+        (rows, DIM), dtype=numpy.float32
+    )
+    vectors /= numpy.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def to_literal(vector):
+    return "[" + ",".join(f"{x:.6f}" for x in vector) + "]"
+
+
+def percentile(values: list[float], p: float):
+    return float(numpy.percentile(values, p)) * 1000
+
+
+def search(conn, queries: list[str], k: int):
+    stmt = text(
+        "SELECT id FROM bench_embedding "
+        "ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k"
+    )
+    results, timings = [], []
+    for q in queries:
+        start = time.perf_counter()
+        ids = conn.execute(stmt, {"q": q, "k": k}).scalars().all()
+        timings.append(time.perf_counter() - start)
+        results.append(ids)
+    return results, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--k", type=int, default=32)
+    parser.add_argument("--m", type=int, default=settings.HNSW_M)
+    parser.add_argument(
+        "--ef-construction", type=int, default=settings.HNSW_EF_CONSTRUCTION
+    )
+    parser.add_argument(
+        "--ef-search", type=int, nargs="+", default=[40, 100, 200, 400, 800]
+    )
+    args = parser.parse_args()
+
+    vectors = synthetic_corpus(args.rows + args.queries, args.clusters)
+    corpus, queries = vectors[: args.rows], vectors[args.rows :]
+    queries = [to_literal(q) for q in queries]
+
+    with engine.connect() as conn:
+        conn.execute(
+            text(
+                "CREATE TEMP TABLE bench_embedding "
+                f"(id serial PRIMARY KEY, embedding vector({DIM}))"
+            )
+        )
+        insert = text(
+            "INSERT INTO bench_embedding (embedding) VALUES (CAST(:e AS vector))"
+        )
+        for i in range(0, len(corpus), 1000):
+            conn.execute(insert, [{"e": to_literal(v)} for v in corpus[i : i + 1000]])
+        conn.execute(text("ANALYZE bench_embedding"))
+
+        exact, timings = search(conn, queries, args.k)
+        print(
+            f"exact          p50={percentile(timings, 50):8.2f}ms "
+            f"p99={percentile(timings, 99):8.2f}ms recall=1.000"
+        )
+
+        start = time.perf_counter()
+        conn.execute(
+            text(
+                "CREATE INDEX ON bench_embedding USING hnsw "
+                "(embedding vector_cosine_ops) "
+                f"WITH (m = {args.m}, ef_construction = {args.ef_construction})"
+            )
+        )
+        print(f"index build    {time.perf_counter() - start:.1f}s")
+
+        for ef_search in args.ef_search:
+            conn.execute(
+                text("SELECT set_config('hnsw.ef_search', :ef, true)"),
+                {"ef": str(ef_search)},
+            )
+            approx, timings = search(conn, queries, args.k)
+            recall = numpy.mean(
+                [len(set(a) & set(e)) / args.k for a, e in zip(approx, exact)]
+            )
+            print(
+                f"ef_search={ef_search:<4} p50={percentile(timings, 50):8.2f}ms "
+                f"p99={percentile(timings, 99):8.2f}ms recall={recall:.3f}"
+            )
+        conn.rollback()
+
+
+if __name__ == "__main__":
+    main()
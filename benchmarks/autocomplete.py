@@ -0,0 +1,107 @@
+"""Compare /searches typeahead from the prefix index with the db fallback.
+
+Builds a synthetic temp table of search queries with skewed scores, then
+times every prefix of sampled queries against the in-memory index, the
+ILIKE the endpoint used before and the prefix LIKE on a text_pattern_ops
+index.
+
+Usage:
+    python -m benchmarks.autocomplete [--rows 1000000] [--queries 200]
+"""
+
+import argparse
+import random
+import time
+
+import numpy
+from sqlalchemy import column, desc, Select, table
+from sqlalchemy.sql import text
+
+from app.db import engine
+from app.utils.autocomplete import PrefixIndex
+
+bench_search = table("bench_search", column("query"), column("score"))
+
+
+def ilike_stmt(prefix: str):
+    return (
+        Select(bench_search.c.query, bench_search.c.score)
+        .where(bench_search.c.query.ilike(f"{prefix}%"))
+        .order_by(desc(bench_search.c.score))
+        .limit(8)
+    )
+
+
+def like_stmt(prefix: str):
+    return (
+        Select(bench_search.c.query, bench_search.c.score)
+        .where(bench_search.c.query.startswith(prefix, autoescape=True))
+        .order_by(desc(bench_search.c.score))
+        .limit(8)
+    )
+
+
+def run(lookup, prefixes: list[str]):
+    timings = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        lookup(prefix)
+        timings.append(time.perf_counter() - start)
+    return numpy.array(timings) * 1_000_000
+
+
+def report(name: str, timings):
+    print(
+        f"{name:<10} p50={numpy.percentile(timings, 50):10.1f}us "
+        f"p99={numpy.percentile(timings, 99):10.1f}us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--depth", type=int, default=3)
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        conn.execute(
+            text(
+                """
+                CREATE TEMP TABLE bench_search AS
+                SELECT DISTINCT ON (query) query, score FROM (
+                    SELECT substr(md5(g::text), 1, 4 + g % 12) AS query,
+                           floor(power(random(), 4) * 100000)::int + 1 AS score
+                    FROM generate_series(1, :rows) AS g
+                ) AS s
+                """
+            ),
+            {"rows": args.rows},
+        )
+        conn.execute(text("ANALYZE bench_search"))
+
+        start = time.perf_counter()
+        rows = conn.execute(Select(bench_search.c.query, bench_search.c.score))
+        index = PrefixIndex({row.query: row.score for row in rows}, 0, args.depth)
+        print(f"index build {time.perf_counter() - start:.1f}s")
+
+        rng = random.Random(0)
+        prefixes = [
+            query[:length]
+            for query in rng.sample(index.queries, args.queries)
+            for length in range(1, len(query) + 1)
+        ]
+
+        report("index", run(index.lookup, prefixes))
+        report("ilike", run(lambda p: conn.execute(ilike_stmt(p)).all(), prefixes))
+
+        conn.execute(
+            text("CREATE INDEX ON bench_search (query text_pattern_ops)")
+        )
+        conn.execute(text("ANALYZE bench_search"))
+        report("like", run(lambda p: conn.execute(like_stmt(p)).all(), prefixes))
+        conn.rollback()
+
+
+if __name__ == "__main__":
+    main()
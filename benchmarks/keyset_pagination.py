@@ -0,0 +1,89 @@
+"""Compare OFFSET and keyset page latency at increasing depths.
+
+For every post feed order, the key of the row just before each measured
+page is looked up once, then the same page is timed both with OFFSET and
+with the keyset row comparison. Keyset pages should take the same time
+at page 1000 as at page 1.
+
+Runs against the configured database, so load it with data first.
+
+Usage:
+    python -m benchmarks.keyset_pagination [--pages 1 10 100 1000]
+        [--size 50] [--repeat 5]
+"""
+
+import argparse
+import time
+
+import numpy
+
+from app.db import SessionLocal
+from app.routers.search import vault_feed_keys, vault_feed_stmt
+from app.types import OrderType, RatingType
+from app.utils.keyset import keyset_stmt
+from app.utils.search import post_feed_keys, post_feed_stmt
+
+
+def feeds():
+    for order in OrderType:
+        if order == OrderType.RELEVANCE:
+            continue
+        stmt = post_feed_stmt(None, RatingType.EXPLICIT, order, None, False)
+        yield f"posts/{order.value}", stmt, post_feed_keys(order)
+    for order in (OrderType.POPULAR, OrderType.NEWEST):
+        stmt = vault_feed_stmt(None, order)
+        yield f"vaults/{order.value}", stmt, vault_feed_keys(order)
+
+
+def key_before(db, stmt, keys, offset: int):
+    """The key a client holds after paging to `offset`, None for page 1."""
+    if offset == 0:
+        return None
+    stmt = keyset_stmt(stmt, keys).with_only_columns(*keys)
+    row = db.execute(stmt.offset(offset - 1).limit(1)).first()
+    return list(row) if row else None
+
+
+def offset_page(db, stmt, keys, offset: int, after, size: int):
+    return db.execute(keyset_stmt(stmt, keys).offset(offset).limit(size)).all()
+
+
+def keyset_page(db, stmt, keys, offset: int, after, size: int):
+    return db.execute(keyset_stmt(stmt, keys, after).limit(size)).all()
+
+
+def measure(db, func, stmt, keys, offset, after, args):
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        func(db, stmt, keys, offset, after, args.size)
+        timings.append(time.perf_counter() - start)
+    return numpy.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        for name, stmt, keys in feeds():
+            print(name)
+            for page in args.pages:
+                offset = (page - 1) * args.size
+                after = key_before(db, stmt, keys, offset)
+                if offset and after is None:
+                    print(f"  page {page:>6} past the end")
+                    break
+                offset_ms = measure(db, offset_page, stmt, keys, offset, after, args)
+                keyset_ms = measure(db, keyset_page, stmt, keys, offset, after, args)
+                print(
+                    f"  page {page:>6} offset={offset_ms:8.2f}ms "
+                    f"keyset={keyset_ms:8.2f}ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Compare bytes fetched per post request with full and projected rows.
+
+For --posts sampled posts, runs the statement each hot endpoint used to
+send, a full Post row with every column, against the one it sends now,
+then prints the average bytes per request (the pg_column_size of the
+returned rows) and the median time to fetch and build the result,
+which for full rows includes parsing the embedding into a NumPy array.
+
+Runs against the configured database, so load it with posts first.
+
+Usage:
+    python -m benchmarks.post_row_bytes [--posts 200] [--repeat 5]
+"""
+
+import argparse
+import time
+
+import numpy
+from sqlalchemy import func, Select
+from sqlalchemy.orm import undefer
+
+from app.db import engine, SessionLocal
+from app.models import Post
+from app.routers.post import post_detail_stmt
+from app.utils.post import post_exists_stmt
+
+
+def full_stmt(post_id: int):
+    return Select(Post).where(Post.id == post_id).options(undefer("*"))
+
+
+def last_updated_stmt(post_id: int):
+    return Select(Post.last_updated).where(Post.id == post_id)
+
+
+def requests():
+    # name, endpoints, statement they send now
+    yield "detail", "get_post", post_detail_stmt
+    yield "exists", "get_comments, create_comment", post_exists_stmt
+    yield "last_updated", "update_post", last_updated_stmt
+
+
+def row_bytes(db, stmt):
+    compiled = stmt.compile(engine)
+    sql = f"SELECT coalesce(sum(pg_column_size(t.*)), 0) FROM ({compiled}) AS t"
+    return db.connection().exec_driver_sql(sql, compiled.params).scalar()
+
+
+def measure(db, build, post_ids, repeat):
+    sizes = [row_bytes(db, build(post_id)) for post_id in post_ids]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for post_id in post_ids:
+            db.execute(build(post_id)).all()
+            db.expunge_all()
+        timings.append((time.perf_counter() - start) / len(post_ids))
+    return numpy.mean(sizes), numpy.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        stmt = Select(Post.id).order_by(func.random()).limit(args.posts)
+        post_ids = db.execute(stmt).scalars().all()
+
+        full_bytes, full_ms = measure(db, full_stmt, post_ids, args.repeat)
+        print(f"{'full row':<14} {full_bytes:9.0f} B {full_ms:7.3f}ms")
+        for name, endpoints, build in requests():
+            size, ms = measure(db, build, post_ids, args.repeat)
+            print(
+                f"{name:<14} {size:9.0f} B {ms:7.3f}ms "
+                f"({full_bytes / max(size, 1):.0f}x fewer bytes) {endpoints}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Check that listing endpoints stay within a fixed number of queries.
+
+Requests the first two pages of every listing through the app and fails
+when one of them sends more statements than its budget, which is what a
+lazy loaded relationship per row (N+1) looks like.
+
+Runs against the configured database, so load it with data first.
+
+Usage:
+    python -m benchmarks.query_budget [--size 50]
+"""
+
+import argparse
+import sys
+
+from fastapi.testclient import TestClient
+from sqlalchemy import Select
+
+from app.db import SessionLocal
+from app.main import app
+from app.models import Comment, Reaction, Vault, VaultPost
+from app.types import PrivacyType, TargetType
+from app.utils.query_count import count_queries
+
+
+def sample_ids(db):
+    def first(stmt):
+        return db.execute(stmt.limit(1)).scalar()
+
+    vault_id = first(
+        Select(VaultPost.vault_id)
+        .join(Vault)
+        .where(Vault.privacy == PrivacyType.PUBLIC)
+    )
+    return {
+        "vault_id": vault_id,
+        "user_id": first(Select(Vault.user_id).where(Vault.id == vault_id)),
+        "post_id": first(Select(Comment.post_id)),
+        "reaction_user_id": first(
+            Select(Reaction.user_id).where(Reaction.target_type == TargetType.POST)
+        ),
+    }
+
+
+def listings(ids):
+    # path, query budget per page; a ranking snapshot page needs the
+    # snapshot id, its post ids and the posts
+    yield "/posts", 3
+    yield "/posts/recommend", 1
+    yield "/vaults", 1
+    yield "/vaults/recommend", 1
+    yield f"/vaults/{ids['vault_id']}/posts", 2
+    yield f"/posts/{ids['post_id']}/comments", 2
+    yield f"/users/{ids['user_id']}/vaults", 2
+    yield f"/users/{ids['reaction_user_id']}/reactions", 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=50)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        ids = sample_ids(db)
+
+    client = TestClient(app)
+    failed = False
+    for path, budget in listings(ids):
+        params = {"size": args.size}
+        for page in (1, 2):
+            with count_queries() as counter:
+                response = client.get(path, params=params)
+            response.raise_for_status()
+            ok = counter.count <= budget
+            failed |= not ok
+            print(
+                f"{'ok  ' if ok else 'FAIL'} {path} page {page}: "
+                f"{counter.count} queries (budget {budget})"
+            )
+            if not ok:
+                print("\n\n".join(counter.statements))
+            cursor = response.json().get("next_page")
+            if not cursor:
+                break
+            params["cursor"] = cursor
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare live /posts feed queries with ranking snapshot pages.
+
+Runs against the configured database, so load it with data first.
+
+Usage:
+    python -m benchmarks.ranking_feed [--pages 20] [--size 50] [--repeat 5]
+"""
+
+import argparse
+import random
+import time
+
+import numpy
+from sqlalchemy import Select
+
+from app.db import SessionLocal
+from app.models import Post
+from app.utils.ranking import (
+    get_latest_snapshot_id,
+    get_snapshot,
+    ranked_ids_stmt,
+    refresh_snapshots,
+    snapshot_combinations,
+    snapshot_key,
+)
+
+COLUMNS = (Post.id, Post.sample_url, Post.preview_url, Post.type)
+
+
+def live_page(db, combination, offset: int, size: int):
+    stmt = ranked_ids_stmt(*combination).with_only_columns(*COLUMNS)
+    return db.execute(stmt.offset(offset).limit(size)).all()
+
+
+def snapshot_page(db, combination, offset: int, size: int):
+    snapshot_id = get_latest_snapshot_id(db, snapshot_key(*combination))
+    page_ids = get_snapshot(db, snapshot_id)[offset : offset + size].tolist()
+    stmt = Select(*COLUMNS).where(Post.id.in_(page_ids))
+    rows = {row.id: row for row in db.execute(stmt).all()}
+    return [rows[id] for id in page_ids if id in rows]
+
+
+def measure(db, func, combinations, args):
+    timings = []
+    for _ in range(args.repeat):
+        for combination in combinations:
+            page = random.randrange(args.pages)
+            start = time.perf_counter()
+            func(db, combination, page * args.size, args.size)
+            timings.append(time.perf_counter() - start)
+    return numpy.array(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    combinations = list(snapshot_combinations())
+    with SessionLocal() as db:
+        start = time.perf_counter()
+        refresh_snapshots(db)
+        print(f"snapshot refresh {time.perf_counter() - start:.1f}s")
+
+        for name, func in (("live", live_page), ("snapshot", snapshot_page)):
+            timings = measure(db, func, combinations, args)
+            print(
+                f"{name:<9} p50={numpy.percentile(timings, 50):8.2f}ms "
+                f"p99={numpy.percentile(timings, 99):8.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Check and time ResponseCacheMiddleware on the memory and Redis backends.
+
+Drives the middleware over ASGI with a stub endpoint, no database: checks
+MISS then HIT, one upstream call for concurrent misses, If-None-Match
+handling and clear(), then times cached hits. The Redis backend runs
+against the in-process stand-in unless --url points at a server.
+
+Usage:
+    python -m benchmarks.response_cache [--url local://] [--requests 10000]
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy
+from starlette.responses import JSONResponse
+
+from app.utils.response_cache import (
+    MemoryBackend,
+    RedisBackend,
+    ResponseCacheMiddleware,
+)
+
+
+class Endpoint:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        await JSONResponse({"items": list(range(100))})(scope, receive, send)
+
+
+async def get(app, path: str, query: str = "", headers: dict = None):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": [
+            (name.lower().encode(), value.encode())
+            for name, value in (headers or {}).items()
+        ],
+        "http_version": "1.1",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "client": ("testclient", 50000),
+        "root_path": "",
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    response_headers = {
+        name.decode(): value.decode() for name, value in start["headers"]
+    }
+    return start["status"], response_headers
+
+
+async def check(name: str, backend, requests: int):
+    endpoint = Endpoint()
+    app = ResponseCacheMiddleware(endpoint, backend=backend)
+
+    status, headers = await get(app, "/vaults", "size=20")
+    assert (status, headers["x-cache"]) == (200, "MISS"), headers
+    status, headers = await get(app, "/vaults", "size=20")
+    assert (status, headers["x-cache"]) == (200, "HIT"), headers
+    etag = headers["etag"]
+
+    results = await asyncio.gather(
+        *(get(app, "/searches", "q=a") for _ in range(20))
+    )
+    assert all(status == 200 for status, _ in results)
+    assert endpoint.calls == 2, endpoint.calls
+
+    matching = (etag, f"W/{etag}", f'"other", {etag}', "*")
+    for value in matching:
+        status, _ = await get(app, "/vaults", "size=20", {"If-None-Match": value})
+        assert status == 304, value
+    for value in (etag[:-2] + '"', f'"x{etag[1:]}', '"other"'):
+        status, _ = await get(app, "/vaults", "size=20", {"If-None-Match": value})
+        assert status == 200, value
+
+    await backend.clear()
+    status, headers = await get(app, "/vaults", "size=20")
+    assert headers["x-cache"] == "MISS", headers
+
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await get(app, "/vaults", "size=20")
+        timings.append(time.perf_counter() - start)
+    timings = numpy.array(timings) * 1_000_000
+    print(
+        f"{name:<7} ok  hit p50={numpy.percentile(timings, 50):8.1f}us "
+        f"p99={numpy.percentile(timings, 99):8.1f}us"
+    )
+
+
+async def run(args):
+    await check("memory", MemoryBackend(), args.requests)
+    await check("redis", RedisBackend.from_url(args.url), args.requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="local://")
+    parser.add_argument("--requests", type=int, default=10000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare the pgvector and numpy similarity engines on the live posts.
+
+Loads (or refreshes) the numpy matrix, then runs the same post
+embeddings through both engines for each filter combination and reports
+latency and how many of the exact numpy neighbours pgvector returned.
+
+Usage:
+    python -m benchmarks.similarity_engines [--queries 100] [--k 100]
+"""
+
+import argparse
+import itertools
+import time
+
+import numpy
+from sqlalchemy import func, Select
+
+from app.db import SessionLocal
+from app.models import Post
+from app.types import FileType, RatingType
+from app.utils.similarity import engines
+
+
+def run(db, engine, embeddings, k: int, filters):
+    results, timings = [], []
+    for embedding in embeddings:
+        start = time.perf_counter()
+        neighbours = engine.search(db, embedding, k, *filters)
+        timings.append(time.perf_counter() - start)
+        results.append(set(neighbours.ids.tolist()))
+    return results, numpy.array(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=100)
+    args = parser.parse_args()
+
+    pgvector, in_memory = engines["pgvector"], engines["numpy"]
+    with SessionLocal() as db:
+        start = time.perf_counter()
+        in_memory.refresh(db)
+        print(
+            f"numpy matrix {in_memory.state.count} posts, "
+            f"refreshed in {time.perf_counter() - start:.1f}s"
+        )
+
+        stmt = (
+            Select(Post.embedding)
+            .where(Post.embedding.is_not(None))
+            .order_by(func.random())
+            .limit(args.queries)
+        )
+        embeddings = db.execute(stmt).scalars().all()
+
+        combinations = itertools.product(
+            RatingType, [None, *FileType], [False, True]
+        )
+        for filters in combinations:
+            exact, numpy_ms = run(db, in_memory, embeddings, args.k, filters)
+            approx, pg_ms = run(db, pgvector, embeddings, args.k, filters)
+            db.rollback()
+
+            recall = numpy.mean(
+                [len(a & e) / len(e) for a, e in zip(approx, exact) if e]
+                or [0]
+            )
+            name = "/".join(
+                [filters[0].value, filters[1].value if filters[1] else "any"]
+                + (["no-ai"] if filters[2] else [])
+            )
+            print(
+                f"{name:<24} numpy p50={numpy.percentile(numpy_ms, 50):7.2f}ms "
+                f"p99={numpy.percentile(numpy_ms, 99):7.2f}ms  "
+                f"pgvector p50={numpy.percentile(pg_ms, 50):7.2f}ms "
+                f"p99={numpy.percentile(pg_ms, 99):7.2f}ms  "
+                f"recall@{args.k}={recall:.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
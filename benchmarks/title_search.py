@@ -0,0 +1,102 @@
+"""Compare tag searches with and without the trigram index on post.title.
+
+Builds a synthetic temp table of tag strings with a skewed tag
+distribution, then times the same ILIKE filters used by /posts before and
+after creating the gin_trgm_ops index.
+
+Usage:
+    python -m benchmarks.title_search [--rows 3000000] [--tags 50000]
+"""
+
+import argparse
+import random
+import time
+
+import numpy
+from sqlalchemy import and_, column, desc, Select, table
+from sqlalchemy.sql import text
+
+from app.db import engine
+
+bench_post = table("bench_post", column("id"), column("title"), column("score"))
+
+
+def search_stmt(words: list[str], size: int):
+    filters = [bench_post.c.title.ilike(f"%{word}%") for word in words]
+    return (
+        Select(bench_post.c.id)
+        .where(and_(*filters))
+        .order_by(desc(bench_post.c.score))
+        .limit(size)
+    )
+
+
+def run(conn, queries: list[list[str]], size: int):
+    timings = []
+    for words in queries:
+        start = time.perf_counter()
+        conn.execute(search_stmt(words, size)).all()
+        timings.append(time.perf_counter() - start)
+    return numpy.array(timings) * 1000
+
+
+def report(name: str, timings):
+    print(
+        f"{name:<10} p50={numpy.percentile(timings, 50):9.2f}ms "
+        f"p99={numpy.percentile(timings, 99):9.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--tags", type=int, default=50_000)
+    parser.add_argument("--tags-per-post", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--size", type=int, default=50)
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(
+            text(
+                """
+                CREATE TEMP TABLE bench_post AS
+                SELECT g AS id,
+                       random() AS score,
+                       array_to_string(ARRAY(
+                           SELECT 'tag' || floor(power(random(), 3) * :tags)::int
+                           FROM generate_series(1, :per_post)
+                           WHERE g > 0
+                       ), ' ') AS title
+                FROM generate_series(1, :rows) AS g
+                """
+            ),
+            {"rows": args.rows, "tags": args.tags, "per_post": args.tags_per_post},
+        )
+        conn.execute(text("ANALYZE bench_post"))
+
+        rng = random.Random(0)
+        queries = [
+            [
+                f"tag{int(rng.random() ** 3 * args.tags)}"
+                for _ in range(rng.randint(1, 3))
+            ]
+            for _ in range(args.queries)
+        ]
+
+        report("seq scan", run(conn, queries, args.size))
+
+        start = time.perf_counter()
+        conn.execute(
+            text("CREATE INDEX ON bench_post USING gin (title gin_trgm_ops)")
+        )
+        conn.execute(text("ANALYZE bench_post"))
+        print(f"index build {time.perf_counter() - start:.1f}s")
+
+        report("trigram", run(conn, queries, args.size))
+        conn.rollback()
+
+
+if __name__ == "__main__":
+    main()
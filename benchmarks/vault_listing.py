@@ -0,0 +1,145 @@
+"""Compare vault entry pages joined to post with the denormalized listing.
+
+Creates a public vault with --entries entries spread over existing posts,
+vacuums vault_post so the listing can use an index-only scan, then times
+the first, middle and last page of both queries and prints the plan of
+the listing page. The vault is deleted afterwards unless --keep is given.
+
+Runs against the configured database, so load it with posts first.
+
+Usage:
+    python -m benchmarks.vault_listing [--entries 100000] [--size 50]
+        [--repeat 20] [--keep]
+"""
+
+import argparse
+import time
+
+import numpy
+from sqlalchemy import delete, func, Select
+from sqlalchemy.sql import text
+
+from app.db import engine, SessionLocal
+from app.models import Post, User, Vault, VaultPost
+from app.routers.vault import vault_posts_keys, vault_posts_stmt
+from app.types import PrivacyType
+from app.utils.keyset import keyset_stmt
+
+FILL_SQL = text(
+    """
+    INSERT INTO vault_post (date_created, index, vault_id, post_id)
+    SELECT now() - n * interval '1 second', n, :vault_id, post.id
+    FROM generate_series(1, :entries) AS n
+    CROSS JOIN LATERAL (
+        SELECT id FROM post WHERE id >= n % :max_id ORDER BY id LIMIT 1
+    ) AS post
+    """
+)
+
+
+def joined_stmt(vault_id: int):
+    return (
+        Select(
+            VaultPost.id,
+            VaultPost.vault_id,
+            VaultPost.index,
+            Post.id,
+            Post.sample_url,
+            Post.preview_url,
+            Post.type,
+        )
+        .join(Post, Post.id == VaultPost.post_id)
+        .where(VaultPost.vault_id == vault_id)
+    )
+
+
+def create_vault(db, entries: int):
+    user_id = db.execute(Select(User.id).limit(1)).scalar()
+    vault = Vault(
+        user_id=user_id,
+        title="benchmark",
+        description="",
+        privacy=PrivacyType.PUBLIC,
+        post_count=entries,
+    )
+    db.add(vault)
+    db.flush()
+    max_id = db.execute(Select(func.max(Post.id))).scalar()
+    params = {"vault_id": vault.id, "entries": entries, "max_id": max_id}
+    db.execute(FILL_SQL, params)
+    db.commit()
+    return vault.id
+
+
+def keys_at(db, vault_id: int, offsets: list[int]):
+    stmt = vault_posts_stmt(vault_id)
+    stmt = keyset_stmt(stmt, vault_posts_keys, ascending=True)
+    stmt = stmt.with_only_columns(*vault_posts_keys)
+    keys = []
+    for offset in offsets:
+        if offset == 0:
+            keys.append(None)
+            continue
+        row = db.execute(stmt.offset(offset - 1).limit(1)).first()
+        keys.append(list(row))
+    return keys
+
+
+def measure(db, stmt, after, args):
+    stmt = keyset_stmt(stmt, vault_posts_keys, after, ascending=True)
+    stmt = stmt.limit(args.size)
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        db.execute(stmt).all()
+        timings.append(time.perf_counter() - start)
+    return numpy.median(timings) * 1000, stmt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        start = time.perf_counter()
+        vault_id = create_vault(db, args.entries)
+        elapsed = time.perf_counter() - start
+        print(f"vault {vault_id}: {args.entries} entries in {elapsed:.1f}s")
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM (ANALYZE) vault_post"))
+
+    try:
+        with SessionLocal() as db:
+            offsets = [0, args.entries // 2, args.entries - args.size]
+            for offset, after in zip(offsets, keys_at(db, vault_id, offsets)):
+                joined = joined_stmt(vault_id)
+                listing = vault_posts_stmt(vault_id)
+                joined_ms, _ = measure(db, joined, after, args)
+                listing_ms, stmt = measure(db, listing, after, args)
+                print(
+                    f"offset {offset:>7} joined={joined_ms:7.2f}ms "
+                    f"listing={listing_ms:7.2f}ms"
+                )
+
+            # plan of the last page, it should be an Index Only Scan on
+            # ix_vault_post_listing with no heap fetches
+            compiled = stmt.compile(engine)
+            plan = db.connection().exec_driver_sql(
+                f"EXPLAIN (ANALYZE, BUFFERS) {compiled}", compiled.params
+            )
+            print("\n".join(row[0] for row in plan))
+    finally:
+        if not args.keep:
+            with SessionLocal() as db:
+                db.execute(delete(VaultPost).where(VaultPost.vault_id == vault_id))
+                db.execute(delete(Vault).where(Vault.id == vault_id))
+                db.commit()
+
+
+if __name__ == "__main__":
+    main()